@@ -0,0 +1,386 @@
+"""
+Mood and to-do analytics computed inside SQLite.
+
+The per-day figures are read from the ``daily_summary`` table (see summary.py), so the
+mood and completion trends cost one row per day however many entries there are; only
+the per-entry completion ranking scans the todos table. Aggregation is done with
+``GROUP BY`` and window functions, and only per-day rows reach Python, where they are
+rolled up into weeks/months and scanned for streaks.
+
+Dates are the calendar dates of the stored (UTC) timestamps. ``start``/``end`` accept
+ISO dates (``2024-01-31``) and are inclusive.
+"""
+from collections import deque
+from datetime import date, datetime, timedelta
+from sqlalchemy import text
+from init import session
+import summary
+
+# Period of a summary ``day`` ('YYYY-MM-DD')
+PERIODS = {
+    "day": "day",
+    # Monday of the day's week
+    "week": "date(day, 'weekday 0', '-6 days')",
+    "month": "substr(day, 1, 7)",
+    "year": "substr(day, 1, 4)",
+}
+
+
+def _where(start=None, end=None):
+    clauses, params = [], {}
+    if start:
+        clauses.append("e.timestamp >= :start")
+        params["start"] = str(start)
+    if end:
+        clauses.append("e.timestamp < :end")
+        params["end"] = str(date.fromisoformat(str(end)) + timedelta(days=1))
+    return (" WHERE " + " AND ".join(clauses) if clauses else ""), params
+
+
+def _day_where(start=None, end=None):
+    clauses, params = [], {}
+    if start:
+        clauses.append("day >= :start")
+        params["start"] = str(start)
+    if end:
+        clauses.append("day <= :end")
+        params["end"] = str(end)
+    return (" WHERE " + " AND ".join(clauses) if clauses else ""), params
+
+
+def _rows(sql, params):
+    return [dict(row._mapping) for row in session.execute(text(sql), params)]
+
+
+def mood_distribution(start=None, end=None):
+    """
+    :return: One row per mood (None for entries without one) with its count and share.
+    """
+    summary.ensure_table()
+    where, params = _day_where(start, end)
+    counts = _rows(
+        "SELECT SUM(entries - mood_count) AS none, "
+        + ", ".join(f"SUM(mood_{m}) AS mood_{m}" for m in range(1, 6))
+        + f" FROM {summary.SUMMARY_TABLE}{where}",
+        params,
+    )[0]
+    rows = [{"mood": None, "entries": counts["none"]}]
+    rows += [{"mood": m, "entries": counts[f"mood_{m}"]} for m in range(1, 6)]
+    rows = [row for row in rows if row["entries"]]
+    total = sum(row["entries"] for row in rows)
+    for row in rows:
+        row["share"] = round(row["entries"] / total, 4) if total else 0.0
+    return rows
+
+
+def daily_moods(window=7, start=None, end=None):
+    """
+    Per-day entry counts and moods, with the rolling average over the trailing ``window``
+    calendar days (days without entries are skipped, not counted as zero).
+
+    A single query over the per-day summary table: the min and max moods come from its
+    per-mood counts, and the rolling average is a window sum of ``mood_sum`` over
+    ``mood_count``. The trend and streak figures are built on these rows.
+
+    :return: One row per day with entries: day, entries, rated (entries with a mood),
+        mood_sum, min_mood, max_mood, avg_mood, rolling_avg -- oldest first.
+    """
+    summary.ensure_table()
+    where, params = _day_where(start, end)
+    params["preceding"] = window - 1
+    return _rows(
+        "SELECT day, entries, mood_count AS rated, mood_sum, "
+        "CASE " + " ".join(f"WHEN mood_{m} THEN {m}" for m in range(1, 6)) + " END AS min_mood, "
+        "CASE " + " ".join(f"WHEN mood_{m} THEN {m}" for m in range(5, 0, -1)) + " END AS max_mood, "
+        "ROUND(mood_sum * 1.0 / mood_count, 3) AS avg_mood, "
+        "ROUND(SUM(mood_sum) OVER w * 1.0 / SUM(mood_count) OVER w, 3) AS rolling_avg "
+        f"FROM {summary.SUMMARY_TABLE}{where} "
+        "WINDOW w AS (ORDER BY julianday(day) RANGE BETWEEN :preceding PRECEDING AND CURRENT ROW) "
+        "ORDER BY day",
+        params,
+    )
+
+
+def _period_of(day, period):
+    if period == "day":
+        return day
+    if period == "week":
+        d = date.fromisoformat(day)
+        return (d - timedelta(days=d.weekday())).isoformat()
+    if period == "month":
+        return day[:7]
+    return day[:4]
+
+
+def mood_trend(period="week", start=None, end=None, days=None):
+    """
+    :param period: ``day``, ``week`` (starting Monday), ``month`` or ``year``.
+    :param days: Rows from ``daily_moods`` to roll up, if already fetched.
+    :return: Entry count and average/min/max mood per period, oldest first.
+    """
+    if period not in PERIODS:
+        raise ValueError(f"Unknown period: {period}")
+    trend = {}
+    for row in days if days is not None else daily_moods(start=start, end=end):
+        key = _period_of(row["day"], period)
+        bucket = trend.setdefault(key, {"period": key, "entries": 0, "rated": 0, "mood_sum": 0,
+                                        "min_mood": None, "max_mood": None})
+        bucket["entries"] += row["entries"]
+        bucket["rated"] += row["rated"]
+        bucket["mood_sum"] += row["mood_sum"] or 0
+        if row["min_mood"] is not None:
+            if bucket["min_mood"] is None:
+                bucket["min_mood"], bucket["max_mood"] = row["min_mood"], row["max_mood"]
+            else:
+                bucket["min_mood"] = min(bucket["min_mood"], row["min_mood"])
+                bucket["max_mood"] = max(bucket["max_mood"], row["max_mood"])
+    return [
+        {
+            "period": b["period"],
+            "entries": b["entries"],
+            "avg_mood": round(b["mood_sum"] / b["rated"], 3) if b["rated"] else None,
+            "min_mood": b["min_mood"],
+            "max_mood": b["max_mood"],
+        }
+        for b in trend.values()
+    ]
+
+
+def _longest_run(days):
+    """
+    :param days: Sorted list of dates.
+    :return: (longest run, the run ending at the last date) as dicts, or None.
+    """
+    best = current = None
+    for day in days:
+        if current and day - current["end"] == timedelta(days=1):
+            current["end"], current["days"] = day, current["days"] + 1
+        else:
+            current = {"start": day, "end": day, "days": 1}
+        if best is None or current["days"] > best["days"]:
+            best = dict(current)
+    return best, current
+
+
+def _run_to_dict(run):
+    if run is None:
+        return {"days": 0, "start": None, "end": None}
+    return {"days": run["days"], "start": run["start"].isoformat(), "end": run["end"].isoformat()}
+
+
+def streaks(good_mood=4, start=None, end=None, days=None, today=None):
+    """
+    Runs of consecutive days with at least one entry, and with a daily average mood of
+    at least ``good_mood``.
+
+    :param days: Rows from ``daily_moods``, if already fetched.
+    :param today: The day runs are current up to (default: today in UTC).
+    :return: The longest and the current run of each kind. A run is current if it
+        reaches today or yesterday.
+    """
+    days = days if days is not None else daily_moods(start=start, end=end)
+    today = today or datetime.utcnow().date()  # the days are UTC dates
+
+    result = {}
+    for name, selected in (
+        ("journaling", [date.fromisoformat(row["day"]) for row in days]),
+        ("good_mood", [date.fromisoformat(row["day"]) for row in days
+                       if row["avg_mood"] is not None and row["avg_mood"] >= good_mood]),
+    ):
+        longest, last = _longest_run(selected)
+        current = last if last and (today - last["end"]).days <= 1 else None
+        result[name] = {"longest": _run_to_dict(longest), "current": _run_to_dict(current)}
+    return result
+
+
+# Per-entry to-do counts; an index-only scan of ix_todos_entry_id_status.
+PER_ENTRY = "SELECT entry_id, COUNT(*) AS todos, SUM(status = 'done') AS done FROM todos GROUP BY entry_id"
+
+
+def todo_completion(period="month", start=None, end=None):
+    """
+    To-do completion over time, attributing each to-do to the period of its entry.
+
+    :return: Per period with to-dos: entries, to-dos, done and completion rate.
+    """
+    if period not in PERIODS:
+        raise ValueError(f"Unknown period: {period}")
+    summary.ensure_table()
+    where, params = _day_where(start, end)
+    rows = _rows(
+        f"SELECT {PERIODS[period]} AS period, SUM(entries) AS entries, SUM(todos_created) AS todos, "
+        f"SUM(todos_done) AS done FROM {summary.SUMMARY_TABLE}{where} "
+        "GROUP BY period HAVING SUM(todos_created) > 0 ORDER BY period",
+        params,
+    )
+    for row in rows:
+        row["rate"] = round(row["done"] / row["todos"], 4) if row["todos"] else None
+    return rows
+
+
+def todo_completion_by_entry(limit=20, start=None, end=None, lowest=True):
+    """
+    Per-entry completion rates, least complete first (or most complete with ``lowest=False``).
+
+    :return: Up to ``limit`` rows of entry id, title, to-dos, done and rate.
+    """
+    where, params = _where(start, end)
+    params["limit"] = limit
+    order = f"ORDER BY t.done * 1.0 / t.todos {'ASC' if lowest else 'DESC'}, t.todos DESC, t.entry_id LIMIT :limit"
+    if not where:
+        # Rank on the to-do counts alone, then look up titles for just the top rows.
+        ranked = f"SELECT * FROM ({PER_ENTRY}) t {order}"
+        sql = f"SELECT t.entry_id, e.title, t.todos, t.done FROM ({ranked}) t JOIN entries e ON e.id = t.entry_id"
+    else:
+        sql = f"SELECT t.entry_id, e.title, t.todos, t.done FROM ({PER_ENTRY}) t JOIN entries e ON e.id = t.entry_id{where} {order}"
+    rows = _rows(sql, params)
+    for row in rows:
+        row["rate"] = round(row["done"] / row["todos"], 4)
+    return rows
+
+
+def report(period="week", window=7, start=None, end=None, limit=10):
+    """
+    All analytics in one JSON-serialisable dict.
+    """
+    days = daily_moods(window, start, end)
+    return {
+        "mood_distribution": mood_distribution(start, end),
+        "mood_trend": mood_trend(period, days=days),
+        "rolling_mood": [
+            {key: row[key] for key in ("day", "entries", "avg_mood", "rolling_avg")} for row in days
+        ],
+        "streaks": streaks(days=days),
+        "todo_completion": todo_completion(period, start, end),
+        "todo_completion_by_entry": todo_completion_by_entry(limit, start, end),
+    }
+
+
+def shard_totals(start=None, end=None, limit=10):
+    """
+    The per-day figures of this database that ``merge_reports`` combines across shards.
+    """
+    return {
+        "days": daily_moods(1, start, end),
+        "mood_distribution": mood_distribution(start, end),
+        "todo_completion": todo_completion("day", start, end),
+        "todo_completion_by_entry": todo_completion_by_entry(limit, start, end),
+    }
+
+
+def _sql_round(value, digits):
+    """
+    Round like SQLite's ROUND (halves away from zero) for non-negative values.
+    """
+    scale = 10 ** digits
+    return int(value * scale + 0.5) / scale
+
+
+def merge_reports(totals, period="week", window=7, limit=10):
+    """
+    Build one ``report`` from the ``shard_totals`` of several databases.
+
+    Days are summed across shards before the averages, rolling averages, trends and
+    streaks are worked out, so the result is what a single database would report.
+
+    :param totals: A dict of shard name -> ``shard_totals`` result.
+    """
+    if period not in PERIODS:
+        raise ValueError(f"Unknown period: {period}")
+    days = {}
+    for part in totals.values():
+        for row in part["days"]:
+            day = days.setdefault(row["day"], {"day": row["day"], "entries": 0, "rated": 0, "mood_sum": 0,
+                                               "min_mood": None, "max_mood": None})
+            day["entries"] += row["entries"]
+            day["rated"] += row["rated"]
+            day["mood_sum"] += row["mood_sum"] or 0
+            if row["min_mood"] is not None:
+                day["min_mood"] = min(filter(None, (day["min_mood"], row["min_mood"])))
+                day["max_mood"] = max(filter(None, (day["max_mood"], row["max_mood"])))
+    days = [days[key] for key in sorted(days)]
+
+    # The rolling average over the trailing ``window`` calendar days, as daily_moods computes it
+    trailing = deque()
+    mood_sum = rated = 0
+    for row in days:
+        current = date.fromisoformat(row["day"])
+        row["avg_mood"] = _sql_round(row["mood_sum"] / row["rated"], 3) if row["rated"] else None
+        trailing.append((current, row))
+        mood_sum += row["mood_sum"]
+        rated += row["rated"]
+        while (current - trailing[0][0]).days >= window:
+            _, old = trailing.popleft()
+            mood_sum -= old["mood_sum"]
+            rated -= old["rated"]
+        row["rolling_avg"] = _sql_round(mood_sum / rated, 3) if rated else None
+
+    moods = {}
+    for part in totals.values():
+        for row in part["mood_distribution"]:
+            moods[row["mood"]] = moods.get(row["mood"], 0) + row["entries"]
+    total = sum(moods.values())
+    distribution = [{"mood": mood, "entries": moods[mood], "share": round(moods[mood] / total, 4)}
+                    for mood in sorted(moods, key=lambda mood: (mood is not None, mood))]
+
+    # Entries count every day of a period, to-dos only the days that have them
+    completion = {}
+    for row in days:
+        key = _period_of(row["day"], period)
+        bucket = completion.setdefault(key, {"period": key, "entries": 0, "todos": 0, "done": 0})
+        bucket["entries"] += row["entries"]
+    for part in totals.values():
+        for row in part["todo_completion"]:
+            bucket = completion[_period_of(row["period"], period)]
+            bucket["todos"] += row["todos"]
+            bucket["done"] += row["done"]
+    completion = {key: bucket for key, bucket in completion.items() if bucket["todos"]}
+    for bucket in completion.values():
+        bucket["rate"] = round(bucket["done"] / bucket["todos"], 4)
+
+    by_entry = [dict(row, shard=name) for name, part in totals.items() for row in part["todo_completion_by_entry"]]
+    by_entry.sort(key=lambda row: (row["rate"], -row["todos"], row["shard"], row["entry_id"]))
+
+    return {
+        "mood_distribution": distribution,
+        "mood_trend": mood_trend(period, days=days),
+        "rolling_mood": [
+            {key: row[key] for key in ("day", "entries", "avg_mood", "rolling_avg")} for row in days
+        ],
+        "streaks": streaks(days=days),
+        "todo_completion": [completion[key] for key in sorted(completion)],
+        "todo_completion_by_entry": by_entry[:limit],
+    }
+
+
+def format_table(rows, columns=None):
+    """
+    Render a list of dicts as a plain-text table.
+    """
+    if not rows:
+        return "  (no data)"
+    columns = columns or list(rows[0])
+    cells = [[("" if row[c] is None else str(row[c])) for c in columns] for row in rows]
+    widths = [max(len(c), *(len(r[i]) for r in cells)) for i, c in enumerate(columns)]
+    lines = ["  " + "  ".join(c.ljust(w) for c, w in zip(columns, widths))]
+    lines.append("  " + "  ".join("-" * w for w in widths))
+    lines += ["  " + "  ".join(v.rjust(w) for v, w in zip(r, widths)) for r in cells]
+    return "\n".join(lines)
+
+
+def format_report(result, max_rows=30):
+    """
+    Render ``report()`` output as text tables. Long time series show their last ``max_rows`` rows.
+    """
+    sections = []
+    for name, value in result.items():
+        heading = name.replace("_", " ").capitalize()
+        if name == "streaks":
+            rows = [dict(kind=kind, **{f"{which}_{k}": v for which, run in runs.items() for k, v in run.items()})
+                    for kind, runs in value.items()]
+            sections.append(f"{heading}\n{format_table(rows)}")
+            continue
+        shown = value[-max_rows:] if name in ("mood_trend", "rolling_mood", "todo_completion") else value
+        note = f" (last {len(shown)} of {len(value)})" if len(shown) < len(value) else ""
+        sections.append(f"{heading}{note}\n{format_table(shown)}")
+    return "\n\n".join(sections)
@@ -0,0 +1,191 @@
+"""
+Asyncio facade over the journal models, for embedding the journal in an async service.
+
+``AsyncEntryRepository`` and ``AsyncTodoRepository`` mirror the ``Entry`` and ``Todo``
+class methods. Each call gets its own ``AsyncSession`` on an aiosqlite engine, binds it
+as the shared ``init.session`` for the current context and runs the very same model
+code, so the semantics (validation, search index updates, crash-safe file writes,
+cache invalidation) are identical. Database I/O is awaited through aiosqlite and
+entry-file I/O is handed to worker threads, so concurrent calls do not block the loop::
+
+    journal = AsyncJournal()
+    entry = await journal.entries.add_entry("Morning", "Went for a run", mood=4)
+    await journal.todos.add_todo("Stretch", entry.id)
+    text = await journal.entries.get_content(entry.id)
+    await journal.close()
+
+Returned objects are detached: their columns are loaded, but relationships are not
+lazy-loaded -- use ``get_todos``/``get_todos_with_entries``/``get_entries_with_todos``.
+
+Requires the ``aiosqlite`` and ``greenlet`` packages (``pip install sqlalchemy[asyncio] aiosqlite``).
+"""
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from init import db_url, engine_options, is_sqlite_file, session, session_scope, set_sqlite_pragmas
+from models.entry import Entry, UNCHANGED
+from models.todo import Todo
+
+
+def async_url(url=db_url):
+    """
+    Turn a sync SQLite URL (``sqlite:///...``) into its aiosqlite equivalent.
+    """
+    if url.startswith("sqlite:"):
+        return "sqlite+aiosqlite:" + url[len("sqlite:"):]
+    return url
+
+
+class AsyncJournal:
+    """
+    An async engine plus the entry and to-do repositories that share it.
+    """
+
+    def __init__(self, url=None, **options):
+        url = url or async_url()
+        self.engine = create_async_engine(url, **dict(engine_options(url), **options))
+        if is_sqlite_file(url):
+            event.listen(self.engine.sync_engine, "connect", set_sqlite_pragmas)
+        self.sessionmaker = async_sessionmaker(self.engine, expire_on_commit=False)
+        self.entries = AsyncEntryRepository(self)
+        self.todos = AsyncTodoRepository(self)
+
+    async def run(self, fn, *args, **kwargs):
+        """
+        Run synchronous model code against a fresh async session.
+
+        Inside ``fn`` the module-level ``session`` is this call's session; each statement
+        is awaited on the event loop and file I/O is offloaded (see ``storage.offload``).
+        """
+        async with self.sessionmaker() as async_session:
+            async_session.sync_session.info["offload_io"] = True
+
+            def call(sync_session):
+                token = session_scope.set(object())
+                session.registry.set(sync_session)
+                try:
+                    return fn(*args, **kwargs)
+                finally:
+                    session.registry.clear()
+                    session_scope.reset(token)
+
+            return await async_session.run_sync(call)
+
+    async def close(self):
+        await self.engine.dispose()
+
+
+class AsyncEntryRepository:
+    """
+    Async counterparts of the ``Entry`` class methods.
+    """
+
+    def __init__(self, journal):
+        self.journal = journal
+
+    async def add_entry(self, title, content, mood=None):
+        return await self.journal.run(Entry.add_entry, title, content, mood)
+
+    async def get_all_entries(self):
+        return await self.journal.run(Entry.get_all_entries)
+
+    async def get_entries_with_todos(self, limit=None):
+        return await self.journal.run(Entry.get_entries_with_todos, limit)
+
+    async def page_entries(self, limit=20, after=None, before=None):
+        return await self.journal.run(Entry.page_entries, limit, after, before)
+
+    async def iter_entries(self, batch_size=100, after=None):
+        """
+        Stream entries newest first, one keyset page (and one short session) at a time.
+        """
+        while True:
+            page = await self.page_entries(limit=batch_size, after=after)
+            for entry in page:
+                yield entry
+            if len(page) < batch_size:
+                return
+            after = page[-1].cursor
+
+    async def find_by_id(self, entry_id):
+        return await self.journal.run(Entry.find_by_id, entry_id)
+
+    async def exists(self, entry_id):
+        return await self.journal.run(Entry.exists, entry_id)
+
+    async def find_by_title(self, title):
+        return await self.journal.run(Entry.find_by_title, title)
+
+    async def find_by_mood(self, mood):
+        return await self.journal.run(Entry.find_by_mood, mood)
+
+    async def search(self, query, limit=20):
+        return await self.journal.run(Entry.search, query, limit)
+
+    async def get_content(self, entry_id):
+        """
+        Return the text of an entry, or None if the entry or its content is missing.
+        """
+        def load():
+            info = Entry.info(entry_id)
+            return Entry.get_content(info) if info else None
+        return await self.journal.run(load)
+
+    async def get_todos(self, entry_id):
+        def load():
+            entry = Entry.find_by_id(entry_id)
+            return list(entry.get_todos()) if entry else []
+        return await self.journal.run(load)
+
+    async def update_entry(self, entry_id, title=None, content=None, mood=UNCHANGED):
+        return await self.journal.run(Entry.update_entry, entry_id, title, content, mood)
+
+    async def delete_entry(self, entry_id):
+        return await self.journal.run(Entry.delete_entry, entry_id)
+
+    async def rebuild_search_index(self):
+        return await self.journal.run(Entry.rebuild_search_index)
+
+
+class AsyncTodoRepository:
+    """
+    Async counterparts of the ``Todo`` class methods.
+    """
+
+    def __init__(self, journal):
+        self.journal = journal
+
+    async def add_todo(self, task, entry_id, status='pending'):
+        return await self.journal.run(Todo.add_todo, task, entry_id, status)
+
+    async def get_all_todos(self):
+        return await self.journal.run(Todo.get_all_todos)
+
+    async def get_todos_with_entries(self):
+        return await self.journal.run(Todo.get_todos_with_entries)
+
+    async def page_todos(self, limit=20, after=None, before=None):
+        return await self.journal.run(Todo.page_todos, limit, after, before)
+
+    async def iter_todos(self, batch_size=100, after=None):
+        """
+        Stream to-dos in ID order, one keyset page (and one short session) at a time.
+        """
+        while True:
+            page = await self.page_todos(limit=batch_size, after=after)
+            for todo in page:
+                yield todo
+            if len(page) < batch_size:
+                return
+            after = page[-1].cursor
+
+    async def find_by_id(self, todo_id):
+        return await self.journal.run(Todo.find_by_id, todo_id)
+
+    async def find_by_task(self, task):
+        return await self.journal.run(Todo.find_by_task, task)
+
+    async def update_todo(self, todo_id, task=None, status=None, entry_id=None):
+        return await self.journal.run(Todo.update_todo, todo_id, task, status, entry_id)
+
+    async def delete_todo(self, todo_id):
+        return await self.journal.run(Todo.delete_todo, todo_id)
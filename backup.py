@@ -0,0 +1,323 @@
+"""
+Hot snapshots of a journal, and restoring them.
+
+``backup`` writes one zip archive per snapshot into the backup directory
+(``backups/`` by default). The database is copied with SQLite's online backup API a
+thousand pages at a time, so the journal stays usable while it runs and the copy
+is still a consistent view of one moment. It is taken before the entry files are
+listed, so every file the copy refers to is either in the snapshot or was deleted
+while it ran (``fsck --repair`` after a restore tidies up either way).
+
+Entry files are backed up incrementally. Each snapshot has a manifest listing every
+file under ``entries/`` with its size, mtime, SHA-256 and the archive member holding
+its content. A file whose size and mtime match the previous manifest is not read at
+all, and one whose content is already in an earlier archive (e.g. a renamed entry) is
+not stored again. A snapshot therefore needs the earlier archives it refers to: keep
+the backup directory together.
+
+``restore`` extracts a snapshot's files with a pool of threads, each reading its own
+handle on the archive, into a staging directory that replaces the journal only once
+everything is in place. The journal being replaced is renamed aside first and deleted
+only once the restored one is in its place, so a failure part way leaves the old one.
+Restoring into the current journal writes the database the journal is configured to
+use (``JOURNAL_DB_URL``); restoring elsewhere writes it under the name it had when it
+was backed up.
+"""
+import hashlib
+import json
+import os
+import re
+import shutil
+import sqlite3
+import time
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from init import busy_timeout, engine, is_sqlite_file
+from fsck import ENTRIES_DIR
+from shards import DB_FILE
+
+BACKUP_DIR = "backups"
+MANIFEST = "manifest.json"
+DB_MEMBER = "database/" + DB_FILE
+# Pages copied per step of the online backup; writers can get in between steps
+BACKUP_PAGES = 1024
+# Fast deflate: the database dominates a snapshot, and level 1 compresses it nearly as well
+COMPRESS_LEVEL = 1
+CHUNK_SIZE = 200
+DEFAULT_WORKERS = 8
+SNAPSHOT_PATTERN = re.compile(r"snapshot-(\d+)-\d{8}T\d{6}\.zip$")
+
+
+def list_snapshots(directory=None):
+    """
+    :return: The snapshot archives in ``directory``, oldest first.
+    """
+    directory = directory or BACKUP_DIR
+    if not os.path.isdir(directory):
+        return []
+    found = [(int(match.group(1)), name) for name in os.listdir(directory)
+             for match in [SNAPSHOT_PATTERN.match(name)] if match]
+    return [os.path.join(directory, name) for _, name in sorted(found)]
+
+
+def read_manifest(path):
+    with zipfile.ZipFile(path) as archive:
+        return json.loads(archive.read(MANIFEST))
+
+
+def _sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _hash_files(paths):
+    return [(path, _sha256(path)) for path in paths]
+
+
+def _scan_entries():
+    """
+    :return: {path: (size, mtime_ns)} of every file under ``entries/``.
+    """
+    files = {}
+    for root, _, names in os.walk(ENTRIES_DIR):
+        for name in names:
+            path = os.path.join(root, name)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue  # removed while scanning
+            files[path] = (stat.st_size, stat.st_mtime_ns)
+    return files
+
+
+def _copy_database(target):
+    """
+    Copy the journal database to ``target`` with the online backup API.
+
+    :return: The size of the copy in bytes.
+    """
+    if engine.url.get_backend_name() != "sqlite" or not is_sqlite_file(str(engine.url)):
+        raise ValueError("Backups need the journal in a SQLite database file.")
+    source = sqlite3.connect(engine.url.database, timeout=busy_timeout)
+    try:
+        copy = sqlite3.connect(target)
+        try:
+            source.backup(copy, pages=BACKUP_PAGES)
+            # A self-contained file: no -wal next to it when it is restored
+            copy.execute("PRAGMA journal_mode=DELETE")
+        finally:
+            copy.close()
+    finally:
+        source.close()
+    return os.path.getsize(target)
+
+
+def backup(directory=None, workers=DEFAULT_WORKERS):
+    """
+    Take a snapshot of the database and the entry files changed since the last one.
+
+    :param directory: The backup directory (default: ``backups/``).
+    :param workers: Threads hashing changed files.
+    :return: A dict with the snapshot path, file counts, bytes read and stored,
+        elapsed seconds and MB/sec read.
+    """
+    directory = directory or BACKUP_DIR
+    os.makedirs(directory, exist_ok=True)
+    start = time.perf_counter()
+    snapshots = list_snapshots(directory)
+    previous = read_manifest(snapshots[-1])["files"] if snapshots else {}
+    number = int(SNAPSHOT_PATTERN.match(os.path.basename(snapshots[-1])).group(1)) + 1 if snapshots else 1
+    name = f"snapshot-{number:04d}-{datetime.utcnow():%Y%m%dT%H%M%S}.zip"
+    path = os.path.join(directory, name)
+    tmp = path + ".tmp"
+
+    stats = {"snapshot": path, "files": 0, "stored": 0, "unchanged": 0, "db_bytes": 0, "bytes_read": 0,
+             "bytes_stored": 0}
+    try:
+        with zipfile.ZipFile(tmp, "w", zipfile.ZIP_DEFLATED, compresslevel=COMPRESS_LEVEL) as archive:
+            db_copy = tmp + ".db"
+            try:
+                stats["db_bytes"] = _copy_database(db_copy)
+                archive.write(db_copy, DB_MEMBER)
+            finally:
+                if os.path.exists(db_copy):
+                    os.remove(db_copy)
+
+            files = _scan_entries()
+            stored = {record[2]: record[3:] for record in previous.values()}  # sha256 -> (archive, member)
+            manifest = {}
+            changed = []
+            for file_path, (size, mtime_ns) in files.items():
+                record = previous.get(file_path)
+                if record and record[0] == size and record[1] == mtime_ns:
+                    manifest[file_path] = record
+                else:
+                    changed.append(file_path)
+
+            chunks = [changed[i:i + CHUNK_SIZE] for i in range(0, len(changed), CHUNK_SIZE)]
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                for hashed in pool.map(_hash_files, chunks):
+                    for file_path, digest in hashed:
+                        size, mtime_ns = files[file_path]
+                        stats["bytes_read"] += size
+                        if digest not in stored:
+                            archive.write(file_path, file_path)
+                            stored[digest] = (name, file_path)
+                            stats["stored"] += 1
+                            stats["bytes_stored"] += size
+                        manifest[file_path] = [size, mtime_ns, digest, *stored[digest]]
+
+            archive.writestr(MANIFEST, json.dumps({
+                "created": datetime.utcnow().isoformat(),
+                "database": os.path.basename(engine.url.database),
+                "previous": os.path.basename(snapshots[-1]) if snapshots else None,
+                "files": manifest,
+            }))
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+    stats["files"] = len(manifest)
+    stats["unchanged"] = stats["files"] - stats["stored"]
+    stats["archive_bytes"] = os.path.getsize(path)
+    stats["seconds"] = time.perf_counter() - start
+    read = stats["db_bytes"] + stats["bytes_read"]
+    stats["mb_per_sec"] = read / 1e6 / stats["seconds"] if stats["seconds"] else 0.0
+    return stats
+
+
+def _extract(archive_path, items, target):
+    """
+    Extract files from one archive (runs in a worker, with its own handle on the archive).
+
+    :param items: (member, path, mtime_ns) tuples.
+    :return: The number of bytes written.
+    """
+    written = 0
+    with zipfile.ZipFile(archive_path) as archive:
+        for member, path, mtime_ns in items:
+            destination = os.path.join(target, path)
+            with archive.open(member) as source, open(destination, "wb") as f:
+                shutil.copyfileobj(source, f, 1024 * 1024)
+                written += f.tell()
+            os.utime(destination, ns=(mtime_ns, mtime_ns))
+    return written
+
+
+def _database_path(target, manifest):
+    """
+    Where to restore the database: the configured database for the current journal,
+    otherwise a file in ``target`` named like the one backed up.
+    """
+    url = str(engine.url)
+    if target is None and engine.url.get_backend_name() == "sqlite" and is_sqlite_file(url):
+        return engine.url.database
+    return os.path.join(target or ".", manifest.get("database", DB_FILE))
+
+
+def _swap_in(replacements):
+    """
+    Move restored files into place, keeping the replaced ones until all have moved.
+
+    :param replacements: (restored path, destination) pairs.
+    """
+    aside = []  # (destination, where its old version went)
+    placed = []
+    try:
+        for _, destination in replacements:
+            # A database's -wal and -shm files belong to the old version too
+            for path in (destination, destination + "-wal", destination + "-shm"):
+                if os.path.exists(path):
+                    os.replace(path, path + ".restore-old")
+                    aside.append((path, path + ".restore-old"))
+        for restored, destination in replacements:
+            os.replace(restored, destination)
+            placed.append(destination)
+    except BaseException:
+        for destination in placed:
+            if os.path.isdir(destination):
+                shutil.rmtree(destination)
+            else:
+                os.remove(destination)
+        for path, old in aside:
+            os.replace(old, path)
+        raise
+    for _, old in aside:
+        if os.path.isdir(old):
+            shutil.rmtree(old)
+        else:
+            os.remove(old)
+
+
+def restore(snapshot=None, directory=None, target=None, workers=DEFAULT_WORKERS, force=False):
+    """
+    Rebuild a journal (its database and ``entries/``) from a snapshot.
+
+    :param snapshot: The snapshot archive (default: the latest one in ``directory``).
+    :param target: The journal directory to restore into (default: the current one).
+    :param workers: Threads extracting files.
+    :param force: Replace the journal already in ``target``.
+    :return: A dict with the snapshot, file count, bytes written, elapsed seconds and MB/sec.
+    """
+    start = time.perf_counter()
+    if snapshot is None:
+        snapshots = list_snapshots(directory)
+        if not snapshots:
+            raise ValueError(f"No snapshots in {directory or BACKUP_DIR}.")
+        snapshot = snapshots[-1]
+    manifest = read_manifest(snapshot)
+    db_path = _database_path(target, manifest)
+    live = target is None
+    target = target or "."
+    entries_dir = os.path.join(target, ENTRIES_DIR)
+    if not force and (os.path.exists(db_path) or os.path.exists(entries_dir)):
+        raise ValueError(f"{os.path.abspath(target)} already has a journal; restore elsewhere or use --force.")
+
+    files = manifest["files"]
+    backup_dir = os.path.dirname(snapshot)
+    by_archive = {}
+    for path, (_, mtime_ns, _, archive_name, member) in files.items():
+        by_archive.setdefault(archive_name, []).append((member, path, mtime_ns))
+    for archive_name in by_archive:
+        if not os.path.exists(os.path.join(backup_dir, archive_name)):
+            raise FileNotFoundError(f"{archive_name}, which {os.path.basename(snapshot)} builds on, is missing.")
+
+    staging = os.path.join(target, ".restore")
+    # Next to the database, which need not be in ``target``, so it can be renamed into place
+    staged_db = db_path + ".restore"
+    shutil.rmtree(staging, ignore_errors=True)
+    stats = {"snapshot": snapshot, "target": os.path.abspath(target), "files": len(files), "bytes": 0}
+    try:
+        os.makedirs(os.path.join(staging, ENTRIES_DIR))
+        for parent in {os.path.dirname(path) for path in files}:
+            os.makedirs(os.path.join(staging, parent), exist_ok=True)
+        with zipfile.ZipFile(snapshot) as archive:
+            with archive.open(DB_MEMBER) as source, open(staged_db, "wb") as f:
+                shutil.copyfileobj(source, f, 1024 * 1024)
+                stats["bytes"] += f.tell()
+
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = [
+                pool.submit(_extract, os.path.join(backup_dir, archive_name), items[i:i + CHUNK_SIZE], staging)
+                for archive_name, items in by_archive.items()
+                for i in range(0, len(items), CHUNK_SIZE)
+            ]
+            stats["bytes"] += sum(future.result() for future in futures)
+
+        if live:
+            engine.dispose()  # no pooled connection may keep the old database open
+        _swap_in([(os.path.join(staging, ENTRIES_DIR), entries_dir), (staged_db, db_path)])
+    finally:
+        shutil.rmtree(staging, ignore_errors=True)
+        if os.path.exists(staged_db):
+            os.remove(staged_db)
+
+    stats["seconds"] = time.perf_counter() - start
+    stats["mb_per_sec"] = stats["bytes"] / 1e6 / stats["seconds"] if stats["seconds"] else 0.0
+    return stats
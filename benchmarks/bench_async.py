@@ -0,0 +1,150 @@
+"""
+Concurrency benchmark for the async repositories.
+
+Seeds a scratch journal, then serves the same mix of requests (entry views, searches,
+new entries, new to-dos) two ways:
+
+* sync      -- one after another through the synchronous models;
+* async     -- ``--concurrency`` requests in flight at once through ``AsyncJournal``.
+
+It reports throughput, per-request latency and the worst event-loop stall, measured by a
+ticker task that should wake every millisecond -- blocking file or database I/O on the
+loop shows up there.
+
+Usage: python benchmarks/bench_async.py --entries 2000 --requests 2000 --concurrency 50
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+# The database and entries/ folder are relative paths, so run in a scratch directory.
+os.chdir(tempfile.mkdtemp(prefix="journal-bench-"))
+
+from init import Base, engine  # noqa: E402
+from models.entry import Entry  # noqa: E402
+from models.todo import Todo  # noqa: E402
+from async_repository import AsyncJournal  # noqa: E402
+import cache  # noqa: E402
+
+WORDS = "walk garden work family code gym read travel cook music rain coffee".split()
+
+
+def seed(n):
+    Base.metadata.create_all(engine)
+    for i in range(n):
+        Entry.add_entry(f"{random.choice(WORDS)} {i}", " ".join(random.choices(WORDS, k=120)), random.randint(1, 5))
+    return n
+
+
+def make_requests(n, n_entries, write_ratio):
+    requests = []
+    for _ in range(n):
+        if random.random() < write_ratio:
+            requests.append(random.choice([("add_entry",), ("add_todo", random.randint(1, n_entries))]))
+        else:
+            requests.append(random.choice([("view", random.randint(1, n_entries)), ("search", random.choice(WORDS))]))
+    return requests
+
+
+def run_sync(request):
+    kind = request[0]
+    if kind == "view":
+        info = Entry.info(request[1])
+        return Entry.get_content(info) if info else None
+    if kind == "search":
+        return Entry.search(request[1], limit=10)
+    if kind == "add_entry":
+        return Entry.add_entry("bench", " ".join(random.choices(WORDS, k=120)), 3)
+    return Todo.add_todo("bench task", request[1])
+
+
+async def run_async(journal, request):
+    kind = request[0]
+    if kind == "view":
+        return await journal.entries.get_content(request[1])
+    if kind == "search":
+        return await journal.entries.search(request[1], limit=10)
+    if kind == "add_entry":
+        return await journal.entries.add_entry("bench", " ".join(random.choices(WORDS, k=120)), 3)
+    return await journal.todos.add_todo("bench task", request[1])
+
+
+def report(name, seconds, latencies, stall=None):
+    latencies = sorted(latencies)
+    line = (f"{name:<6} {len(latencies) / seconds:8.0f} req/s  "
+            f"p50 {statistics.median(latencies) * 1e3:7.2f} ms  "
+            f"p95 {latencies[int(len(latencies) * 0.95)] * 1e3:7.2f} ms")
+    if stall is not None:
+        line += f"  worst loop stall {stall * 1e3:7.2f} ms"
+    print(line)
+
+
+def bench_sync(requests):
+    cache.content_cache.clear()
+    latencies = []
+    start = time.perf_counter()
+    for request in requests:
+        t = time.perf_counter()
+        run_sync(request)
+        latencies.append(time.perf_counter() - t)
+    report("sync", time.perf_counter() - start, latencies)
+
+
+async def bench_async(requests, concurrency):
+    cache.content_cache.clear()
+    journal = AsyncJournal(pool_size=concurrency, max_overflow=0)
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+    worst_stall = 0.0
+    done = asyncio.Event()
+
+    async def ticker():
+        nonlocal worst_stall
+        while not done.is_set():
+            t = time.perf_counter()
+            await asyncio.sleep(0.001)
+            worst_stall = max(worst_stall, time.perf_counter() - t - 0.001)
+
+    async def one(request):
+        async with semaphore:
+            t = time.perf_counter()
+            await run_async(journal, request)
+            latencies.append(time.perf_counter() - t)
+
+    tick = asyncio.create_task(ticker())
+    start = time.perf_counter()
+    await asyncio.gather(*(one(request) for request in requests))
+    seconds = time.perf_counter() - start
+    done.set()
+    await tick
+    await journal.close()
+    report("async", seconds, latencies, worst_stall)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--entries", type=int, default=2000)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--writes", type=float, default=0.1, help="Fraction of write requests")
+    args = parser.parse_args()
+
+    random.seed(1)
+    seed(args.entries)
+    requests = make_requests(args.requests, args.entries, args.writes)
+    print(f"{args.requests} requests ({args.writes:.0%} writes) over {args.entries} entries, "
+          f"concurrency {args.concurrency}")
+    bench_sync(requests)
+    asyncio.run(bench_async(requests, args.concurrency))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,190 @@
+"""
+Benchmark every Entry/Todo query and mutator on a generated dataset (pytest-benchmark).
+
+Builds a scratch journal with ``generate.py`` (``--entries`` entries, Poisson to-do
+fan-out, log-normal content size, skewed moods) once per run, then times each model
+method on a fresh identity map. pytest-benchmark reports the statistics and saves and
+compares runs; ``--benchmark-compare-fail`` fails the run when a method got slower::
+
+    python -m pytest benchmarks/bench_models.py --entries 20000 --benchmark-save=baseline
+    python -m pytest benchmarks/bench_models.py --entries 20000 \\
+        --benchmark-compare=0001 --benchmark-compare-fail=median:25%
+"""
+import argparse
+import contextlib
+import io
+import os
+import random
+import sys
+import tempfile
+from collections import deque
+from datetime import datetime, timedelta
+
+import pytest
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+# The database and entries/ folder are relative paths, so run in a scratch directory.
+os.chdir(tempfile.mkdtemp(prefix="journal-bench-"))
+# One pack file instead of one file per entry keeps seeding large datasets fast
+os.environ.setdefault("JOURNAL_STORAGE", "cas")
+
+from init import session, storage_backend  # noqa: E402
+from models.entry import Entry  # noqa: E402
+from models.todo import Todo  # noqa: E402
+import generate  # noqa: E402
+import importer  # noqa: E402
+import migrate  # noqa: E402
+
+ENTRY_QUERIES = [
+    "Entry.get_all_entries", "Entry.get_entries_with_todos", "Entry.page_entries", "Entry.iter_entries[1000]",
+    "Entry.find_by_id", "Entry.info", "Entry.exists", "Entry.find_by_title", "Entry.find_by_title_fuzzy",
+    "Entry.find_by_mood", "Entry.find_between[day]", "Entry.on_this_day", "Entry.page_timeline[around]",
+    "Entry.search", "Entry.get_content",
+]
+ENTRY_MUTATORS = ["Entry.add_entry", "Entry.update_entry", "Entry.delete_entry"]
+TODO_QUERIES = [
+    "Todo.get_all_todos", "Todo.get_todos_with_entries", "Todo.page_todos", "Todo.iter_todos[1000]",
+    "Todo.find_by_id", "Todo.find_by_task", "Todo.find_by_task_fuzzy",
+]
+TODO_MUTATORS = ["Todo.add_todo", "Todo.update_todo", "Todo.delete_todo", "Todo.bulk_update_status",
+                 "Todo.bulk_delete"]
+
+# Methods that return every row are timed fewer times
+FULL_SCANS = {"Entry.get_all_entries", "Entry.get_entries_with_todos", "Todo.get_all_todos",
+              "Todo.get_todos_with_entries"}
+
+
+@pytest.fixture(scope="module")
+def dataset(request):
+    """
+    Generate and import the journal the benchmarks run on.
+    """
+    options = request.config.option
+    migrate.upgrade()
+    spec = generate.build_spec(argparse.Namespace(
+        entries=options.entries, todos=options.todos, done=0.5, words=options.words, sigma=0.8,
+        mood_weights="1,2,4,3,2", no_mood=0.1, days=3650, end=datetime(2025, 1, 1), seed=options.dataset_seed,
+    ))
+    importer.import_entries(generate.generate(spec, processes=options.processes), batch_size=5000)
+    return {"entries": options.entries, "todos": options.todos, "words": options.words,
+            "seed": options.dataset_seed, "storage": storage_backend}
+
+
+@pytest.fixture(scope="module")
+def cases(dataset, request):
+    """
+    Map each method name to (function, argument source).
+
+    Mutators that remove rows take their target from an argument source, a deque with
+    its own slice of IDs, so that no round finds its target already gone.
+    """
+    entry_ids = [id_ for (id_,) in session.query(Entry.id).order_by(Entry.id)]
+    todo_ids = [id_ for (id_,) in session.query(Todo.id).order_by(Todo.id)]
+    session.commit()
+    runs = request.config.option.repeat + 2  # including the warm-up round and pytest-benchmark's extra call
+    if len(entry_ids) < 4 * runs:
+        pytest.exit(f"Need at least {4 * runs} entries for {runs - 2} rounds; use more --entries.")
+
+    deletable_entries = deque(entry_ids[-runs:])
+    bulk_entries = deque(entry_ids[-2 * runs:-runs])
+    lookup_ids = entry_ids[:-2 * runs]
+    deletable_todos = deque(todo_ids[:len(todo_ids) // 2][-runs:])
+    lookup_todos = todo_ids[:len(todo_ids) // 2 - runs]
+    words = [todo.task.split()[0] for todo in Todo.page_todos(limit=50)] or ["task"]
+    first_page = Entry.page_entries(limit=20)
+    cursor = first_page[-1].cursor if first_page else None
+
+    def entry_id():
+        return random.choice(lookup_ids)
+
+    first_day = Entry.find_between(limit=1)[0].timestamp.date()
+    span = (datetime(2025, 1, 1).date() - first_day).days
+
+    def random_day():
+        return first_day + timedelta(days=random.randint(0, span))
+
+    def one_day():
+        day = random_day()
+        return Entry.find_between(day, day)
+
+    def todo_id():
+        return random.choice(lookup_todos)
+
+    def typo(word):
+        i = random.randrange(len(word))
+        return word[:i] + random.choice("aeiou") + word[i + 1:]
+
+    return {
+        "Entry.add_entry": (lambda: Entry.add_entry("Benchmark entry", "Some words. " * 60, random.randint(1, 5)),
+                            None),
+        "Entry.get_all_entries": (lambda: Entry.get_all_entries(), None),
+        "Entry.get_entries_with_todos": (lambda: Entry.get_entries_with_todos(), None),
+        "Entry.page_entries": (lambda: Entry.page_entries(limit=20, after=cursor), None),
+        "Entry.iter_entries[1000]": (
+            lambda: sum(1 for _, _ in zip(range(1000), Entry.iter_entries(batch_size=500))), None),
+        "Entry.find_by_id": (lambda: Entry.find_by_id(entry_id()), None),
+        "Entry.info": (lambda: Entry.info(entry_id()), None),
+        "Entry.exists": (lambda: Entry.exists(entry_id()), None),
+        "Entry.find_by_title": (lambda: Entry.find_by_title(random.choice(words)), None),
+        "Entry.find_by_title_fuzzy": (lambda: Entry.find_by_title_fuzzy(typo(random.choice(words))), None),
+        "Entry.find_by_mood": (lambda: Entry.find_by_mood(random.randint(1, 5)), None),
+        "Entry.find_between[day]": (one_day, None),
+        "Entry.on_this_day": (lambda: Entry.on_this_day(random_day()), None),
+        "Entry.page_timeline[around]": (lambda: Entry.page_timeline(limit=20, around=random_day()), None),
+        "Entry.search": (lambda: Entry.search(random.choice(words)), None),
+        "Entry.get_content": (lambda: Entry.get_content(Entry.info(entry_id())), None),
+        "Entry.update_entry": (lambda: Entry.update_entry(entry_id(), mood=random.randint(1, 5)), None),
+        "Entry.delete_entry": (Entry.delete_entry, deletable_entries),
+        "Todo.add_todo": (lambda: Todo.add_todo("Benchmark task", entry_id()), None),
+        "Todo.get_all_todos": (lambda: Todo.get_all_todos(), None),
+        "Todo.get_todos_with_entries": (lambda: Todo.get_todos_with_entries(), None),
+        "Todo.page_todos": (lambda: Todo.page_todos(limit=20, after=todo_id()), None),
+        "Todo.iter_todos[1000]": (lambda: sum(1 for _, _ in zip(range(1000), Todo.iter_todos(batch_size=500))), None),
+        "Todo.find_by_id": (lambda: Todo.find_by_id(todo_id()), None),
+        "Todo.find_by_task": (lambda: Todo.find_by_task(random.choice(words)), None),
+        "Todo.find_by_task_fuzzy": (lambda: Todo.find_by_task_fuzzy(typo(random.choice(words))), None),
+        "Todo.update_todo": (lambda: Todo.update_todo(todo_id(), status=random.choice(("pending", "done"))), None),
+        "Todo.delete_todo": (Todo.delete_todo, deletable_todos),
+        "Todo.bulk_update_status": (
+            lambda: Todo.bulk_update_status(random.choice(("pending", "done")), entry_id=entry_id()), None),
+        "Todo.bulk_delete": (lambda entry_id: Todo.bulk_delete(entry_id=entry_id), bulk_entries),
+    }
+
+
+def time_case(benchmark, cases, dataset, name, repeat):
+    """
+    Time one method: a warm-up round, then ``repeat`` rounds, each on a fresh identity map.
+    """
+    fn, targets = cases[name]
+
+    def setup():
+        session.expunge_all()
+        if targets is not None:
+            return (targets.popleft(),), {}
+
+    benchmark.extra_info["dataset"] = dataset
+    rounds = max(3, repeat // 10) if name in FULL_SCANS else repeat
+    with contextlib.redirect_stdout(io.StringIO()):  # the mutators report misses by printing
+        benchmark.pedantic(fn, setup=setup, rounds=rounds, warmup_rounds=1)
+
+
+@pytest.mark.parametrize("name", ENTRY_QUERIES)
+def test_entry_queries(benchmark, cases, dataset, request, name):
+    time_case(benchmark, cases, dataset, name, request.config.option.repeat)
+
+
+@pytest.mark.parametrize("name", ENTRY_MUTATORS)
+def test_entry_mutators(benchmark, cases, dataset, request, name):
+    time_case(benchmark, cases, dataset, name, request.config.option.repeat)
+
+
+@pytest.mark.parametrize("name", TODO_QUERIES)
+def test_todo_queries(benchmark, cases, dataset, request, name):
+    time_case(benchmark, cases, dataset, name, request.config.option.repeat)
+
+
+@pytest.mark.parametrize("name", TODO_MUTATORS)
+def test_todo_mutators(benchmark, cases, dataset, request, name):
+    time_case(benchmark, cases, dataset, name, request.config.option.repeat)
@@ -0,0 +1,167 @@
+"""
+Benchmark the Entry/Todo query methods with and without the lookup indexes.
+
+Seeds a throwaway database with N entries, times every query method with the
+indexes dropped ("before") and after running the schema migration ("after"),
+and prints the EXPLAIN QUERY PLAN of each statement.
+
+Usage: python benchmarks/bench_queries.py --entries 50000 --todos 3
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+# The database and entries/ folder are relative paths, so run in a scratch directory.
+os.chdir(tempfile.mkdtemp(prefix="journal-bench-"))
+
+from sqlalchemy import event, insert  # noqa: E402
+from init import Base, engine, session  # noqa: E402
+from models.entry import Entry  # noqa: E402
+from models.todo import Todo  # noqa: E402
+import migrate  # noqa: E402
+
+
+def seed(n_entries, todos_per_entry):
+    Base.metadata.create_all(engine)
+    start = datetime(2015, 1, 1)
+    words = ["walk", "garden", "work", "family", "code", "gym", "read", "travel", "cook", "music"]
+
+    entries = [
+        {
+            "id": i,
+            "title": f"{random.choice(words)} {random.choice(words)} {i}",
+            "mood": random.randint(1, 5),
+            "timestamp": start + timedelta(minutes=random.randint(0, 5_000_000)),
+            "content_path": f"entries/bench_{i}.txt",
+        }
+        for i in range(1, n_entries + 1)
+    ]
+    todos = [
+        {
+            "task": f"{random.choice(words)} task {i}-{j}",
+            "status": random.choice(("pending", "done")),
+            "entry_id": i,
+        }
+        for i in range(1, n_entries + 1)
+        for j in range(todos_per_entry)
+    ]
+    session.execute(insert(Entry), entries)
+    session.execute(insert(Todo), todos)
+    session.commit()
+    return n_entries, len(todos)
+
+
+def drop_indexes():
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.drop(engine, checkfirst=True)
+    with engine.begin() as conn:
+        conn.exec_driver_sql("DROP TABLE IF EXISTS sqlite_stat1")
+
+
+def query_cases(n_entries):
+    ids = [random.randint(1, n_entries) for _ in range(64)]
+
+    def get_todos():
+        entry = session.get(Entry, random.choice(ids))
+        session.expire(entry, ["todos"])
+        return entry.get_todos()
+
+    return [
+        ("Entry.get_all_entries", lambda: Entry.get_all_entries()),
+        ("Entry.find_by_id", lambda: Entry.find_by_id(random.choice(ids))),
+        ("Entry.find_by_title", lambda: Entry.find_by_title("garden walk")),
+        ("Entry.find_by_mood", lambda: Entry.find_by_mood(random.randint(1, 5))),
+        ("Entry.get_todos", get_todos),
+        ("Todo.get_all_todos", lambda: Todo.get_all_todos()),
+        ("Todo.find_by_id", lambda: Todo.find_by_id(random.choice(ids))),
+        ("Todo.find_by_task", lambda: Todo.find_by_task("gym task 1")),
+    ]
+
+
+def time_case(fn, repeat):
+    fn()  # warm up
+    samples = []
+    for _ in range(repeat):
+        session.expunge_all()
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    samples.sort()
+    return samples[len(samples) // 2] * 1000
+
+
+def capture_plans(cases):
+    """
+    Run each case once, recording the SQL it issues, and return its query plan.
+    """
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append((statement, parameters))
+
+    plans = {}
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        for name, fn in cases:
+            statements.clear()
+            session.expunge_all()
+            fn()
+            plans[name] = list(statements)
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+
+    raw = engine.raw_connection()
+    try:
+        for name, stmts in plans.items():
+            lines = []
+            for statement, parameters in stmts:
+                for row in raw.execute("EXPLAIN QUERY PLAN " + statement, parameters):
+                    lines.append(row[-1])
+            plans[name] = lines
+    finally:
+        raw.close()
+    return plans
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--entries", type=int, default=50000, help="Number of entries to seed")
+    parser.add_argument("--todos", type=int, default=3, help="To-dos per entry")
+    parser.add_argument("--repeat", type=int, default=15, help="Timed runs per query (median is reported)")
+    args = parser.parse_args()
+
+    n_entries, n_todos = seed(args.entries, args.todos)
+    print(f"Seeded {n_entries} entries and {n_todos} to-dos in {os.getcwd()}\n")
+
+    cases = query_cases(n_entries)
+
+    drop_indexes()
+    before = {name: time_case(fn, args.repeat) for name, fn in cases}
+    plans_before = capture_plans(cases)
+
+    migrate.upgrade()
+    after = {name: time_case(fn, args.repeat) for name, fn in cases}
+    plans_after = capture_plans(cases)
+
+    print(f"{'query':<24}{'before ms':>12}{'after ms':>12}{'speedup':>10}")
+    for name, _ in cases:
+        speedup = before[name] / after[name] if after[name] else float("inf")
+        print(f"{name:<24}{before[name]:>12.3f}{after[name]:>12.3f}{speedup:>9.1f}x")
+
+    print("\nEXPLAIN QUERY PLAN")
+    for name, _ in cases:
+        print(f"\n{name}")
+        print("  before: " + "; ".join(plans_before[name]))
+        print("  after : " + "; ".join(plans_after[name]))
+
+
+if __name__ == "__main__":
+    main()
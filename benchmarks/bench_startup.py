@@ -0,0 +1,65 @@
+"""
+Measure the start-up time of the journal command line.
+
+Runs each command in a fresh interpreter several times and reports the median and
+best wall time, so lazy-import regressions show up as a jump in ``--help``/``version``.
+
+Usage: python benchmarks/bench_startup.py --runs 20
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CLI = os.path.join(REPO_ROOT, "cli.py")
+
+COMMANDS = [
+    ["--help"],
+    ["version"],
+    ["list", "--limit", "1"],
+    ["search", "anything", "--limit", "1"],
+]
+
+
+def time_command(args, runs, cwd):
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, CLI] + args, cwd=cwd, stdout=subprocess.DEVNULL, check=True)
+        samples.append(time.perf_counter() - start)
+    samples.sort()
+    return samples[len(samples) // 2] * 1000, samples[0] * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=20, help="Runs per command")
+    args = parser.parse_args()
+
+    # Use an empty scratch journal so the database commands have something to open.
+    cwd = tempfile.mkdtemp(prefix="journal-startup-")
+    subprocess.run([sys.executable, CLI, "migrate"], cwd=cwd, stdout=subprocess.DEVNULL, check=True)
+
+    print(f"{'command':<36}{'median ms':>12}{'best ms':>12}")
+    median, best = time_bare_interpreter(args.runs)
+    print(f"{'(bare interpreter)':<36}{median:>12.1f}{best:>12.1f}")
+    for command in COMMANDS:
+        median, best = time_command(command, args.runs, cwd)
+        print(f"{'journal ' + ' '.join(command):<36}{median:>12.1f}{best:>12.1f}")
+
+
+def time_bare_interpreter(runs):
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "-c", "pass"], check=True)
+        samples.append(time.perf_counter() - start)
+    samples.sort()
+    return samples[len(samples) // 2] * 1000, samples[0] * 1000
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""
+Compare the entry storage backends on disk usage, write throughput and read latency.
+
+Writes the same N entries with each backend (file, log, cas) in a scratch directory,
+then reports the files/inodes and bytes used on disk and the latency of random
+``read`` (full rendered text) and ``read_body`` calls.
+
+Usage: python benchmarks/bench_storage.py --entries 20000 --duplicates 0.1
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+# The database and entries/ folder are relative paths, so run in a scratch directory.
+os.chdir(tempfile.mkdtemp(prefix="journal-bench-"))
+
+from init import Base, engine, session  # noqa: E402
+import storage  # noqa: E402
+
+WORDS = ("today I went for a walk in the garden and later worked on the code then cooked "
+         "dinner with family read a book listened to music and planned the next trip").split()
+
+
+def make_bodies(n, duplicates):
+    """
+    Generate ``n`` entry bodies of a few hundred words; a ``duplicates`` fraction of them
+    repeat an earlier body (templates, copied entries).
+    """
+    bodies = []
+    for i in range(n):
+        if bodies and random.random() < duplicates:
+            bodies.append(random.choice(bodies))
+        else:
+            bodies.append(" ".join(random.choices(WORDS, k=random.randint(80, 400))))
+    return bodies
+
+
+def disk_usage(name):
+    """
+    Files and bytes used by one backend: entries/*.txt, entries/log/ or entries/cas/.
+    """
+    if name == "file":
+        paths = [os.path.join("entries", f) for f in os.listdir("entries") if f.endswith(".txt")]
+    else:
+        paths = [os.path.join(root, f) for root, _, names in os.walk(os.path.join("entries", name)) for f in names]
+    files = blocks = apparent = 0
+    for path in paths:
+        st = os.stat(path)
+        files += 1
+        apparent += st.st_size
+        blocks += getattr(st, "st_blocks", 0) * 512
+    return files, apparent, blocks
+
+
+def percentile(samples, pct):
+    return sorted(samples)[min(len(samples) - 1, int(len(samples) * pct))]
+
+
+def bench(name, bodies, reads, batch_size=1000):
+    backend = {
+        "file": storage.FileStorage(),
+        "log": storage.LogStorage(fsync=False),
+        "cas": storage.CasStorage(),
+    }[name]
+
+    start = datetime(2020, 1, 1)
+    keys = []
+    t0 = time.perf_counter()
+    for i, body in enumerate(bodies):
+        keys.append(backend.create(f"Entry {i}", body, random.randint(1, 5), start + timedelta(minutes=i)))
+        if (i + 1) % batch_size == 0:
+            session.commit()
+    session.commit()
+    write_seconds = time.perf_counter() - t0
+
+    files, apparent, blocks = disk_usage(name)
+    sample = random.choices(keys, k=reads)
+    read_latency, body_latency = [], []
+    for key in sample:
+        t = time.perf_counter()
+        backend.read(key)
+        read_latency.append(time.perf_counter() - t)
+        t = time.perf_counter()
+        backend.read_body(key)
+        body_latency.append(time.perf_counter() - t)
+    session.expunge_all()
+
+    print(f"{name:<5} files {files:>7}  apparent {apparent / 2**20:8.2f} MiB  on disk {blocks / 2**20:8.2f} MiB  "
+          f"write {len(bodies) / write_seconds:8.0f}/s  "
+          f"read p50 {statistics.median(read_latency) * 1e6:7.1f} us  p95 {percentile(read_latency, 0.95) * 1e6:7.1f} us  "
+          f"body p50 {statistics.median(body_latency) * 1e6:7.1f} us")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--entries", type=int, default=20000)
+    parser.add_argument("--duplicates", type=float, default=0.1, help="Fraction of repeated bodies")
+    parser.add_argument("--reads", type=int, default=2000)
+    parser.add_argument("--backends", nargs="+", default=["file", "log", "cas"])
+    args = parser.parse_args()
+
+    Base.metadata.create_all(engine)
+    random.seed(1)
+    bodies = make_bodies(args.entries, args.duplicates)
+    print(f"{args.entries} entries, {args.duplicates:.0%} duplicate bodies, "
+          f"cas codec {storage.CasStorage().codec}")
+    for name in args.backends:
+        bench(name, bodies, args.reads)
+
+
+if __name__ == "__main__":
+    main()
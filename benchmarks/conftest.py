@@ -0,0 +1,13 @@
+"""
+Options of the generated dataset that ``bench_models.py`` runs on.
+"""
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup("journal", "journal benchmark dataset")
+    group.addoption("--entries", type=int, default=20000, help="Number of entries to generate")
+    group.addoption("--todos", type=float, default=2.0, help="Mean to-dos per entry")
+    group.addoption("--words", type=int, default=150, help="Median words per entry")
+    group.addoption("--dataset-seed", type=int, default=1, help="Seed of the generated dataset")
+    group.addoption("--processes", type=int, help="Generator processes (default: CPU count)")
+    group.addoption("--repeat", type=int, default=30, help="Timed rounds per method")
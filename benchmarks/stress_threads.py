@@ -0,0 +1,99 @@
+"""
+Multi-threaded stress test for session handling and the connection pool.
+
+Runs ``--threads`` workers against a scratch journal; each performs ``--ops`` operations,
+a mix of ``Entry.add_entry`` and ``Entry.find_by_id`` (``--writes`` is the share of
+adds), each inside its own ``unit_of_work()``. Reports throughput, latency per
+operation kind and any errors, then checks that every successful add is in the database.
+
+Usage: python benchmarks/stress_threads.py --threads 8 --ops 500 --writes 0.2
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+# The database and entries/ folder are relative paths, so run in a scratch directory.
+os.chdir(tempfile.mkdtemp(prefix="journal-stress-"))
+
+from init import Base, engine, session, unit_of_work  # noqa: E402
+from models.entry import Entry  # noqa: E402
+from models.todo import Todo  # noqa: F401,E402
+import cache  # noqa: E402
+
+
+def worker(n_ops, write_ratio, seed_ids, results, lock):
+    rng = random.Random()
+    latencies = {"add_entry": [], "find_by_id": []}
+    added, errors = 0, []
+    for i in range(n_ops):
+        kind = "add_entry" if rng.random() < write_ratio else "find_by_id"
+        start = time.perf_counter()
+        try:
+            with unit_of_work():
+                if kind == "add_entry":
+                    Entry.add_entry(f"stress {threading.get_ident()} {i}", "lorem ipsum " * 20, rng.randint(1, 5))
+                    added += 1
+                else:
+                    entry = Entry.find_by_id(rng.choice(seed_ids))
+                    assert entry is not None and entry.title
+        except Exception as e:
+            errors.append(f"{kind}: {type(e).__name__}: {e}")
+        latencies[kind].append(time.perf_counter() - start)
+    with lock:
+        results.append((latencies, added, errors))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--ops", type=int, default=500, help="Operations per thread")
+    parser.add_argument("--writes", type=float, default=0.2, help="Fraction of add_entry calls")
+    parser.add_argument("--seed-entries", type=int, default=200)
+    args = parser.parse_args()
+
+    Base.metadata.create_all(engine)
+    seed_ids = [Entry.add_entry(f"seed {i}", "seed body", 3).id for i in range(args.seed_entries)]
+    session.remove()
+    cache.entry_cache.clear()  # make find_by_id reach the database
+
+    results, lock = [], threading.Lock()
+    threads = [
+        threading.Thread(target=worker, args=(args.ops, args.writes, seed_ids, results, lock))
+        for _ in range(args.threads)
+    ]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    seconds = time.perf_counter() - start
+
+    total = args.threads * args.ops
+    added = sum(r[1] for r in results)
+    errors = [e for r in results for e in r[2]]
+    print(f"{args.threads} threads x {args.ops} ops ({args.writes:.0%} add_entry), pool size {engine.pool.size()}")
+    print(f"throughput {total / seconds:8.0f} ops/s over {seconds:.2f} s")
+    for kind in ("add_entry", "find_by_id"):
+        samples = sorted(s for r in results for s in r[0][kind])
+        if samples:
+            print(f"  {kind:<11} n={len(samples):<6} p50 {statistics.median(samples) * 1e3:7.2f} ms  "
+                  f"p95 {samples[int(len(samples) * 0.95)] * 1e3:7.2f} ms")
+
+    with unit_of_work():
+        stored = session.query(Entry).count() - args.seed_entries
+    print(f"errors: {len(errors)}; entries added: {added}, found in database: {stored}")
+    for error in errors[:10]:
+        print("  " + error)
+    return 0 if not errors and stored == added else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,136 @@
+"""
+Bounded in-process LRU caches for entry metadata and entry content.
+
+The models fill these on reads and invalidate them in their mutator methods. They are
+per process: a change made by another process (another CLI run, ``fsck --repair``) is
+not seen until the entry is next changed here or the cache is cleared.
+"""
+import sys
+import threading
+from collections import OrderedDict
+from init import cache_bytes
+
+
+def sizeof(value):
+    """
+    Approximate the memory an entry occupies: encoded length for text, shallow size otherwise.
+    """
+    if isinstance(value, str):
+        return len(value.encode("utf-8"))
+    if isinstance(value, tuple):
+        return sys.getsizeof(value) + sum(sizeof(item) for item in value)
+    return sys.getsizeof(value)
+
+
+class LRUCache:
+    """
+    A least-recently-used cache bounded by total size and by number of items.
+    """
+
+    def __init__(self, name, max_bytes, max_items=None, size=sizeof):
+        self.name = name
+        self.max_bytes = max_bytes
+        self.max_items = max_items
+        self._size = size
+        self._items = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.evictions = self.invalidations = 0
+
+    def get(self, key, default=None):
+        """
+        Return the cached value for ``key`` and mark it as recently used.
+        """
+        with self._lock:
+            try:
+                value, _ = self._items[key]
+            except KeyError:
+                self.misses += 1
+                return default
+            self._items.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        """
+        Cache ``value``, evicting least recently used items to stay within the bounds.
+        Values larger than the whole cache are not stored.
+        """
+        size = self._size(value)
+        with self._lock:
+            if key in self._items:
+                self._bytes -= self._items.pop(key)[1]
+            if size > self.max_bytes:
+                return
+            self._items[key] = (value, size)
+            self._bytes += size
+            while self._bytes > self.max_bytes or (self.max_items and len(self._items) > self.max_items):
+                _, (_, evicted) = self._items.popitem(last=False)
+                self._bytes -= evicted
+                self.evictions += 1
+
+    def invalidate(self, key):
+        with self._lock:
+            item = self._items.pop(key, None)
+            if item is not None:
+                self._bytes -= item[1]
+                self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+            self._bytes = 0
+
+    def stats(self):
+        """
+        :return: A dict with hit/miss/eviction counters and the current fill.
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else None,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "items": len(self._items),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+            }
+
+
+# Entry metadata (EntryInfo tuples) keyed by entry ID; small, so mostly bounded by count.
+entry_cache = LRUCache("entries", max_bytes=cache_bytes // 4, max_items=10_000)
+
+# Rendered entry text keyed by entry ID.
+content_cache = LRUCache("content", max_bytes=cache_bytes)
+
+
+def cache_key(entry_id):
+    """
+    Normalise an entry ID (menu input arrives as a string); None if it is not an ID.
+    """
+    try:
+        return int(entry_id)
+    except (TypeError, ValueError):
+        return None
+
+
+def invalidate_entry(entry_id):
+    """
+    Drop everything cached for an entry. Called by the Entry and Todo mutators.
+    """
+    key = cache_key(entry_id)
+    entry_cache.invalidate(key)
+    content_cache.invalidate(key)
+
+
+def invalidate_content(entry_id):
+    """
+    Drop an entry's cached text. Called by the Todo mutators, which append to it.
+    """
+    content_cache.invalidate(cache_key(entry_id))
+
+
+def stats():
+    return {cache.name: cache.stats() for cache in (entry_cache, content_cache)}
@@ -0,0 +1,142 @@
+"""
+The change feed: a log of every entry and to-do mutation, for incremental sync.
+
+The entry and to-do operations call ``record_entry``/``record_todo``/``record_many`` in
+the same transaction as their own changes, like the daily summary, so a change is in
+the log exactly when it is in the database. Rows are identified across journals by
+their ``uid``, and each change carries the full state of the row after it (or marks a
+deletion), so the newest change of a row is all another journal needs to reproduce it.
+
+Changes received from a peer are applied with ``replaying`` set, which keeps the
+operations from logging them a second time: sync.py logs them itself, with their
+original origin and time, so that they travel on to further peers.
+"""
+import json
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+from sqlalchemy import func, insert, select
+from init import session
+from models.change import Change, SyncState
+
+NODE_KEY = "node_id"
+
+_node_id = None
+
+
+def new_uid():
+    return uuid.uuid4().hex
+
+
+def node_id():
+    """
+    This journal's ID in the change feed, created on first use.
+    """
+    global _node_id
+    if _node_id is None:
+        state = session.get(SyncState, NODE_KEY)
+        if state is None:
+            state = SyncState(key=NODE_KEY, value=new_uid())
+            session.add(state)
+            session.flush()
+        _node_id = state.value
+    return _node_id
+
+
+def last_seq():
+    return session.scalar(select(func.max(Change.seq))) or 0
+
+
+@contextmanager
+def replaying():
+    """
+    Apply changes without logging them (they are logged by the caller).
+    """
+    session.info["replaying"] = True
+    try:
+        yield
+    finally:
+        session.info.pop("replaying", None)
+
+
+def entry_data(title, mood, timestamp, content, changed=None):
+    """
+    :param changed: For an update, the fields it changed (``title``, ``mood``,
+        ``content``); a peer that already has the entry applies only those.
+    """
+    data = {"title": title, "mood": mood, "timestamp": timestamp.isoformat(), "content": content}
+    if changed is not None:
+        data["changed"] = list(changed)
+    return data
+
+
+def todo_data(task, status, entry_uid):
+    return {"task": task, "status": status, "entry_uid": entry_uid}
+
+
+def record_many(changes):
+    """
+    Log changes made in the current transaction.
+
+    :param changes: (kind, uid, data) tuples; ``data`` is the row's state from
+        ``entry_data``/``todo_data``, or None for a deletion.
+    """
+    if session.info.get("replaying"):
+        return
+    origin, now = node_id(), datetime.utcnow()
+    rows = [
+        {"origin": origin, "kind": kind, "uid": uid, "op": "delete" if data is None else "put",
+         "changed_at": now, "data": json.dumps(data, ensure_ascii=False) if data is not None else None}
+        for kind, uid, data in changes
+    ]
+    if rows:
+        session.execute(insert(Change), rows)
+
+
+def record_entry(entry, content, changed=None):
+    """
+    Log the current state of an entry (its content as given, since the file may not be
+    written until commit).
+
+    :param changed: The fields an update changed (see ``entry_data``).
+    """
+    record_many([("entry", entry.uid, entry_data(entry.title, entry.mood, entry.timestamp, content, changed))])
+
+
+def record_todo(uid, task, status, entry_uid):
+    record_many([("todo", uid, todo_data(task, status, entry_uid))])
+
+
+def record_delete(kind, uid):
+    record_many([(kind, uid, None)])
+
+
+def snapshot():
+    """
+    Log every existing entry and to-do, so that rows from before the change feed
+    existed are shipped by the first sync.
+
+    :return: The number of changes logged.
+    """
+    from models.entry import Entry
+    from models.todo import Todo
+    from storage import get_storage
+
+    count = 0
+    entry_uids = {}
+    batch = []
+    for entry in session.query(Entry).order_by(Entry.id).yield_per(1000):
+        entry_uids[entry.id] = entry.uid
+        content = get_storage(entry.content_path).read_body(entry.content_path) or ""
+        batch.append(("entry", entry.uid, entry_data(entry.title, entry.mood, entry.timestamp, content)))
+        if len(batch) >= 1000:
+            record_many(batch)
+            count, batch = count + len(batch), []
+    for uid, task, status, entry_id in session.query(Todo.uid, Todo.task, Todo.status, Todo.entry_id).order_by(Todo.id):
+        batch.append(("todo", uid, todo_data(task, status, entry_uids.get(entry_id))))
+        if len(batch) >= 1000:
+            record_many(batch)
+            count, batch = count + len(batch), []
+    record_many(batch)
+    session.commit()
+    return count + len(batch)
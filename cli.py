@@ -1,95 +1,601 @@
-from helpers import (
-    exit_program,
-    list_entries,
-    find_entry_by_title,
-    find_entry_by_id,
-    find_entries_by_mood,
-    create_entry,
-    update_entry,
-    delete_entry,
-    view_entry_details,
-    list_todos,
-    get_entry_todos,
-    create_todo,
-    update_todo,
-    delete_todo,
-    find_todo_by_task,
-    find_todo_by_id
-)
-
-from colorama import init, Fore, Style
-
-init(autoreset=True)
-
-
-def show_menu():
-    print(Fore.GREEN + "\n📓 Welcome to Your Personal CLI Journal")
-    print(Fore.YELLOW + "======================================")
-    print(Fore.CYAN + " Journal Entries")
-    print(Fore.YELLOW + "--------------------------------------")
-    print(" 1.  📋  List all journal entries")
-    print(" 2.  🔍  Find a journal entry by title")
-    print(" 3.  🔍  Find a jornal entry by ID")
-    print(" 4.  😊  Find journal entries by mood")
-    print(" 5.  📖  View journal entry content")
-    print(" 6.  ✍️   Create a new journal entry")
-    print(" 7.  📝  Update a journal entry")
-    print(" 8.  ❌  Delete a journal entry")
-    print()
-    print(Fore.CYAN + " To-Dos (Linked to Entries)")
-    print(Fore.YELLOW + "--------------------------------------")
-    print(" 9.  📑  View a specific journal entry to-dos")
-    print("10.  📋  List all to-dos")
-    print("11.  ➕  Add a to-do to a journal entry")
-    print("12.  🛠️   Update a to-do")
-    print("13.  🗑️   Delete a to-do")
-    print("14.  🔎  Find a to-do by task")
-    print("15.  🔎  Find a to-do by ID")
-    print()
-    print(" 0.  🚪  Exit")
-    print(Fore.YELLOW + "======================================\n")
-
-
-def main():
-    while True:
-        show_menu()
-        choice = input(Fore.BLUE + "What would you like to do? " + Style.RESET_ALL).strip()
-
-        if choice == "1":
-            list_entries()
-        elif choice == "2":
-            find_entry_by_title()
-        elif choice == "3":
-            find_entry_by_id()
-        elif choice == "4":
-            find_entries_by_mood()
-        elif choice == "5":
-            view_entry_details()
-        elif choice == "6":
-            create_entry()
-        elif choice == "7":
-            update_entry()
-        elif choice == "8":
-            delete_entry()
-        elif choice == "9":
-            get_entry_todos()
-        elif choice == "10":
-            list_todos()
-        elif choice == "11":
-            create_todo()
-        elif choice == "12":
-            update_todo()
-        elif choice == "13":
-            delete_todo()
-        elif choice == "14":
-            find_todo_by_task()
-        elif choice == "15":
-            find_todo_by_id()
-        elif choice == "0":
-            exit_program()
+"""
+Entry point for the journal.
+
+Without arguments this starts the interactive menu. With a subcommand it runs a single
+non-interactive operation, e.g.::
+
+    python cli.py add --title "Morning" --mood 4 --content "Went for a run"
+    python cli.py search "run*" --json
+    python cli.py todo done 42
+
+Only argparse is imported up front; SQLAlchemy, colorama and the models are loaded on
+demand so that ``--help`` and ``version`` start instantly.
+"""
+import argparse
+import json
+import os
+import sys
+
+__version__ = "1.0.0"
+
+# In a sharded journal, the commands that run on every shard unless --shard is given,
+# with the field their merged results are ordered by and whether it is descending
+FAN_OUT = {
+    "list": ("timestamp", True),
+    "find": ("distance", False),
+    "between": ("timestamp", False),
+    "on-this-day": ("timestamp", True),
+    "timeline": ("timestamp", False),
+    "search": ("rank", False),
+    "analytics": (None, False),
+    "todo list": (None, False),
+    "todo report": (None, False),
+    "todo find": ("distance", False),
+}
+
+
+def _json_flag():
+    parent = argparse.ArgumentParser(add_help=False)
+    parent.add_argument("--json", action="store_true", default=argparse.SUPPRESS, help="Print results as JSON")
+    return parent
+
+
+def add_command(subparsers, name, help):
+    """
+    Add a subcommand that also accepts ``--json`` after its own arguments.
+    """
+    return subparsers.add_parser(name, help=help, parents=[_json_flag()])
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="journal", description="Personal CLI Journal")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    parser.add_argument("--metrics", metavar="FILE",
+                        help="Record per-action time, SQL, I/O and cache metrics and write them to FILE "
+                             "(JSON for .json, Prometheus text otherwise)")
+    parser.add_argument("--profile", metavar="FILE", help="Run under cProfile and write the pstats data to FILE")
+    parser.add_argument("--shard", help="In a sharded journal, the shard to work on (see shards.json)")
+    subparsers = parser.add_subparsers(dest="command")
+
+    add_command(subparsers, "menu", help="Start the interactive menu (default)")
+    add_command(subparsers, "version", help="Print the journal version")
+    add_command(subparsers, "shards", help="List the shards of a sharded journal")
+
+    # ======== ENTRY COMMANDS ========
+
+    list_parser = add_command(subparsers, "list", help="List journal entries, newest first")
+    list_parser.add_argument("--limit", type=int, help="Maximum number of entries")
+
+    show_parser = add_command(subparsers, "show", help="Show a journal entry with its content")
+    show_parser.add_argument("id", type=int)
+
+    find_parser = add_command(subparsers, "find", help="Find journal entries by title or mood")
+    find_group = find_parser.add_mutually_exclusive_group(required=True)
+    find_group.add_argument("--title", help="Case-insensitive title fragment")
+    find_group.add_argument("--mood", help="Mood from 1 to 5")
+    find_parser.add_argument("--fuzzy", action="store_true", help="Tolerate typos in the title")
+    find_parser.add_argument("--max-distance", type=int, help="Typos tolerated with --fuzzy "
+                             "(default: one per four characters, at most three)")
+
+    between_parser = add_command(subparsers, "between", help="List the entries in a date range, oldest first")
+    between_parser.add_argument("start", help="First day, month or year (YYYY-MM-DD, YYYY-MM or YYYY)")
+    between_parser.add_argument("end", nargs="?", help="Last day, month or year (default: the end of START)")
+    between_parser.add_argument("--limit", type=int, help="Maximum number of entries")
+
+    on_this_day_parser = add_command(subparsers, "on-this-day", help="List entries from this day in earlier years")
+    on_this_day_parser.add_argument("--date", help="Look back from this date instead of today (YYYY-MM-DD)")
+    on_this_day_parser.add_argument("--limit", type=int, help="Maximum number of entries")
+
+    timeline_parser = add_command(subparsers, "timeline", help="Page through entries in chronological order")
+    timeline_group = timeline_parser.add_mutually_exclusive_group()
+    timeline_group.add_argument("--around", help="Center the page on this date (YYYY-MM-DD, YYYY-MM or YYYY)")
+    timeline_group.add_argument("--after", metavar="ID", help="The page after this entry (SHARD:ID when sharded)")
+    timeline_group.add_argument("--before", metavar="ID", help="The page before this entry (SHARD:ID when sharded)")
+    timeline_parser.add_argument("--limit", type=int, default=20, help="Entries per page (default: 20)")
+
+    search_parser = add_command(subparsers, "search", help="Full-text search entries and to-dos")
+    search_parser.add_argument("query", help='Search terms; supports "exact phrase" and prefix*')
+    search_parser.add_argument("--limit", type=int, default=20, help="Maximum number of results (default: 20)")
+
+    add_parser = add_command(subparsers, "add", help="Create a journal entry")
+    add_parser.add_argument("--title", required=True)
+    add_parser.add_argument("--mood", help="Mood from 1 to 5")
+    add_parser.add_argument("--content", default="-", help="Entry text, or - to read it from stdin (default)")
+
+    update_parser = add_command(subparsers, "update", help="Update a journal entry")
+    update_parser.add_argument("id", type=int)
+    update_parser.add_argument("--title")
+    update_parser.add_argument("--mood", help="Mood from 1 to 5")
+    update_parser.add_argument("--content", help="New entry text, or - to read it from stdin")
+
+    delete_parser = add_command(subparsers, "delete", help="Delete a journal entry")
+    delete_parser.add_argument("id", type=int)
+
+    render_parser = add_command(subparsers, "render", help="Render an entry as its .txt text")
+    render_parser.add_argument("id", type=int)
+    render_parser.add_argument("-o", "--output", help="Write the text to this file instead of printing it")
+
+    analytics_parser = add_command(subparsers, "analytics", help="Mood and to-do completion statistics")
+    analytics_parser.add_argument("--period", choices=["day", "week", "month", "year"], default="week",
+                                  help="Bucket for trends (default: week)")
+    analytics_parser.add_argument("--window", type=int, default=7, help="Rolling average window in days (default: 7)")
+    analytics_parser.add_argument("--from", dest="start", help="First date to include (YYYY-MM-DD)")
+    analytics_parser.add_argument("--to", dest="end", help="Last date to include (YYYY-MM-DD)")
+    analytics_parser.add_argument("--limit", type=int, default=10, help="Entries in the per-entry completion table")
+
+    # ======== TODO COMMANDS ========
+
+    todo_parser = subparsers.add_parser("todo", help="Manage to-dos")
+    todo_commands = todo_parser.add_subparsers(dest="todo_command", required=True)
+
+    todo_list = add_command(todo_commands, "list", help="List to-dos")
+    todo_list.add_argument("--entry", type=int, help="Only to-dos of this entry")
+    todo_list.add_argument("--limit", type=int, help="Maximum number of to-dos")
+
+    todo_report = add_command(todo_commands, "report", help="List entries with their to-dos and completion")
+    todo_report.add_argument("--limit", type=int, help="Maximum number of entries")
+
+    todo_show = add_command(todo_commands, "show", help="Show a to-do")
+    todo_show.add_argument("id", type=int)
+
+    todo_find = add_command(todo_commands, "find", help="Find to-dos by task")
+    todo_find.add_argument("task")
+    todo_find.add_argument("--fuzzy", action="store_true", help="Tolerate typos, closest matches first")
+    todo_find.add_argument("--status", help="Only to-dos with this status")
+    todo_find.add_argument("--entry", type=int, help="Only to-dos of this entry")
+    todo_find.add_argument("--max-distance", type=int, help="Typos tolerated with --fuzzy "
+                           "(default: one per four characters, at most three)")
+    todo_find.add_argument("--limit", type=int, default=20, help="Maximum number of fuzzy matches")
+
+    todo_add = add_command(todo_commands, "add", help="Add a to-do to an entry")
+    todo_add.add_argument("entry_id", type=int)
+    todo_add.add_argument("task")
+    todo_add.add_argument("--status", default="pending", help="pending or done (default: pending)")
+
+    todo_done = add_command(todo_commands, "done", help="Mark a to-do as done")
+    todo_done.add_argument("id", type=int)
+
+    todo_update = add_command(todo_commands, "update", help="Update a to-do")
+    todo_update.add_argument("id", type=int)
+    todo_update.add_argument("--task")
+    todo_update.add_argument("--status")
+
+    todo_delete = add_command(todo_commands, "delete", help="Delete a to-do")
+    todo_delete.add_argument("id", type=int)
+
+    todo_bulk_done = add_command(todo_commands, "bulk-done", help="Mark many to-dos as done at once")
+    todo_bulk_delete = add_command(todo_commands, "bulk-delete", help="Delete many to-dos at once")
+    for bulk_parser in (todo_bulk_done, todo_bulk_delete):
+        bulk_parser.add_argument("ids", type=int, nargs="*", help="To-do IDs")
+        bulk_parser.add_argument("--entry", type=int, help="Only to-dos of this entry")
+        bulk_parser.add_argument("--task", help="Only to-dos whose task contains this text")
+    todo_bulk_delete.add_argument("--status", help="Only to-dos with this status")
+
+    # ======== DATA COMMANDS ========
+
+    import_parser = add_command(subparsers, "import", help="Bulk import entries and to-dos from JSONL or CSV")
+    import_parser.add_argument("path", help="Path to a .jsonl or .csv file")
+    import_parser.add_argument("--format", choices=["jsonl", "csv"], help="Input format (default: from extension)")
+    import_parser.add_argument("--batch-size", type=int, default=1000, help="Entries per transaction (default: 1000)")
+
+    export_parser = add_command(subparsers, "export", help="Export entries and to-dos to JSONL, CSV or Parquet")
+    export_parser.add_argument("path", help="Output .jsonl, .csv or .parquet file, or - for standard output")
+    export_parser.add_argument("--format", choices=["jsonl", "csv", "parquet"],
+                               help="Output format (default: from extension)")
+    export_parser.add_argument("--batch-size", type=int, default=1000, help="Entries fetched at a time (default: 1000)")
+    export_parser.add_argument("--workers", type=int, default=4, help="Threads reading entry content (default: 4)")
+
+    add_command(subparsers, "reindex", help="Rebuild the full-text search index")
+
+    add_command(subparsers, "rebuild-summary", help="Recompute the daily summary table")
+
+    add_command(subparsers, "check-summary", help="Check the daily summary against the entries and to-dos")
+
+    add_command(subparsers, "migrate", help="Upgrade an existing database to the current schema")
+
+    add_command(subparsers, "compact", help="Compact the append-only entry log")
+
+    convert_parser = add_command(subparsers, "convert-storage", help="Move all entries to another storage backend")
+    convert_parser.add_argument("backend", choices=["file", "log", "cas"])
+    convert_parser.add_argument("--batch-size", type=int, default=500, help="Entries per transaction (default: 500)")
+
+    fsck_parser = add_command(subparsers, "fsck", help="Check entry files against the database")
+    fsck_parser.add_argument("--repair", action="store_true", help="Fix the problems that are found")
+
+    verify_parser = add_command(subparsers, "verify", help="Scan all entry files in parallel against the database")
+    verify_parser.add_argument("--repair", action="store_true", help="Fix the problems that are found")
+    verify_parser.add_argument("--workers", type=int, default=8, help="Threads reading files (default: 8)")
+    verify_parser.add_argument("--processes", action="store_true", help="Use worker processes instead of threads")
+    verify_parser.add_argument("--checksums", metavar="FILE", help="Write a sha256sum listing of the entry files")
+
+    backup_parser = add_command(subparsers, "backup", help="Snapshot the database and changed entry files")
+    backup_parser.add_argument("--dir", dest="directory", help="Backup directory (default: backups)")
+    backup_parser.add_argument("--workers", type=int, default=8, help="Threads hashing files (default: 8)")
+
+    restore_parser = add_command(subparsers, "restore", help="Rebuild the journal from a snapshot")
+    restore_parser.add_argument("snapshot", nargs="?", help="Snapshot archive (default: the latest one)")
+    restore_parser.add_argument("--dir", dest="directory", help="Backup directory (default: backups)")
+    restore_parser.add_argument("--target", help="Journal directory to restore into (default: the current one)")
+    restore_parser.add_argument("--workers", type=int, default=8, help="Threads extracting files (default: 8)")
+    restore_parser.add_argument("--force", action="store_true", help="Replace the journal already in the target")
+
+    # ======== SYNC COMMANDS ========
+
+    sync_parser = subparsers.add_parser("sync", help="Exchange changes with other copies of this journal")
+    sync_commands = sync_parser.add_subparsers(dest="sync_command", required=True)
+
+    sync_status = add_command(sync_commands, "status", help="Show this journal's node ID and change feed position")
+    sync_status.add_argument("--peer", help="Also show how far this journal and the peer have synced")
+
+    sync_export = add_command(sync_commands, "export", help="Write unsynced changes to a bundle file")
+    sync_export.add_argument("path", help="Output bundle file")
+    sync_export.add_argument("--peer", help="Node ID of the journal the bundle is for (default: all changes)")
+
+    sync_import = add_command(sync_commands, "import", help="Apply a bundle file from another journal")
+    sync_import.add_argument("path", help="Bundle file written by sync export")
+
+    sync_serve = add_command(sync_commands, "serve", help="Wait for other journals to sync with this one")
+    sync_serve.add_argument("--host", default="127.0.0.1", help="Address to listen on (default: 127.0.0.1)")
+    sync_serve.add_argument("--port", type=int, help="Port to listen on (default: 8765)")
+    sync_serve.add_argument("--once", action="store_true", help="Stop after the first sync")
+
+    sync_connect = add_command(sync_commands, "connect", help="Sync both ways with a journal running sync serve")
+    sync_connect.add_argument("address", help="HOST:PORT of the other journal")
+
+    return parser
+
+
+def _read_content(value):
+    if value == "-":
+        return sys.stdin.read().rstrip("\n")
+    return value
+
+
+def _entry_id(value):
+    if value is None:
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        raise ValueError(f"Invalid entry ID: {value}")
+
+
+def run_command(args):
+    """
+    Run a parsed subcommand and return its JSON-serialisable result.
+    """
+    import commands
+
+    if args.command == "list":
+        return commands.list_entries(limit=args.limit)
+    if args.command == "show":
+        return commands.show_entry(args.id)
+    if args.command == "find":
+        return commands.find_entries(title=args.title, mood=args.mood, fuzzy=args.fuzzy,
+                                     max_distance=args.max_distance)
+    if args.command == "between":
+        return commands.entries_between(args.start, args.end, limit=args.limit)
+    if args.command == "on-this-day":
+        return commands.on_this_day(args.date, limit=args.limit)
+    if args.command == "timeline":
+        return commands.timeline(around=args.around, limit=args.limit,
+                                 after=_entry_id(args.after), before=_entry_id(args.before))
+    if args.command == "search":
+        return commands.search_entries(args.query, limit=args.limit)
+    if args.command == "add":
+        return commands.add_entry(args.title, _read_content(args.content), mood=args.mood)
+    if args.command == "update":
+        content = _read_content(args.content) if args.content is not None else None
+        return commands.update_entry(args.id, title=args.title, content=content, mood=args.mood)
+    if args.command == "delete":
+        return commands.delete_entry(args.id)
+    if args.command == "render":
+        return commands.render_entry(args.id, output=args.output)
+
+    if args.command == "analytics":
+        return commands.analytics(period=args.period, window=args.window, start=args.start, end=args.end,
+                                  limit=args.limit)
+
+    if args.command == "todo":
+        if args.todo_command == "list":
+            return commands.list_todos(entry_id=args.entry, limit=args.limit)
+        if args.todo_command == "report":
+            return commands.todo_report(limit=args.limit)
+        if args.todo_command == "show":
+            return commands.show_todo(args.id)
+        if args.todo_command == "find":
+            return commands.find_todos(args.task, fuzzy=args.fuzzy, status=args.status, entry_id=args.entry,
+                                       max_distance=args.max_distance, limit=args.limit)
+        if args.todo_command == "add":
+            return commands.add_todo(args.entry_id, args.task, status=args.status)
+        if args.todo_command == "done":
+            return commands.update_todo(args.id, status="done")
+        if args.todo_command == "update":
+            return commands.update_todo(args.id, task=args.task, status=args.status)
+        if args.todo_command == "delete":
+            return commands.delete_todo(args.id)
+        if args.todo_command == "bulk-done":
+            return commands.bulk_done(args.ids, entry_id=args.entry, task=args.task)
+        if args.todo_command == "bulk-delete":
+            return commands.bulk_delete(args.ids, entry_id=args.entry, status=args.status, task=args.task)
+
+    if args.command == "sync":
+        if args.sync_command == "status":
+            return commands.sync_status(peer=args.peer)
+        if args.sync_command == "export":
+            return commands.sync_export(args.path, peer=args.peer)
+        if args.sync_command == "import":
+            return commands.sync_import(args.path)
+        if args.sync_command == "serve":
+            return commands.sync_serve(host=args.host, port=args.port, once=args.once)
+        if args.sync_command == "connect":
+            return commands.sync_connect(args.address)
+
+    if args.command == "import":
+        from importer import import_entries, read_rows
+        return import_entries(read_rows(args.path, args.format), batch_size=args.batch_size)
+    if args.command == "export":
+        from exporter import export_entries
+        return export_entries(args.path, fmt=args.format, batch_size=args.batch_size, workers=args.workers)
+    if args.command == "reindex":
+        from models.entry import Entry
+        return {"indexed": Entry.rebuild_search_index()}
+    if args.command == "rebuild-summary":
+        import summary
+        return {"days": summary.rebuild()}
+    if args.command == "check-summary":
+        return commands.check_summary()
+    if args.command == "migrate":
+        from migrate import upgrade
+        return {"created_indexes": upgrade()}
+    if args.command == "compact":
+        return commands.compact_log()
+    if args.command == "convert-storage":
+        from convert_storage import convert
+        return convert(args.backend, batch_size=args.batch_size)
+    if args.command == "backup":
+        from backup import backup
+        return backup(args.directory, workers=args.workers)
+    if args.command == "restore":
+        from backup import restore
+        return restore(args.snapshot, directory=args.directory, target=args.target, workers=args.workers,
+                       force=args.force)
+    if args.command == "fsck":
+        return commands.fsck(repair=args.repair)
+    if args.command == "verify":
+        return commands.verify(repair=args.repair, workers=args.workers, processes=args.processes,
+                               checksums=args.checksums)
+
+    raise ValueError(f"Unknown command: {args.command}")
+
+
+def format_record(record):
+    if "shard" in record and "id" in record:
+        record = dict(record, id=f"{record['shard']}:{record['id']}")
+    typos = f" ~{record['distance']} typo(s)" if record.get("distance") else ""
+    if "task" in record:
+        return f"[{record['id']}] {record['task']} ({record['status']}, entry {record['entry_id']}){typos}"
+    if "title" in record:
+        line = f"[{record['id']}] {record['title']} (mood {record['mood'] or 'N/A'}, {record['timestamp']}){typos}"
+        if record.get("snippet"):
+            line += f"\n    {record['snippet']}"
+        if "todos" in record:
+            line += f" — {record['done']}/{len(record['todos'])} done"
+            line += "".join("\n    " + format_record(todo) for todo in record["todos"])
+        return line
+    return ", ".join(f"{key}: {value}" for key, value in record.items())
+
+
+def print_result(result, as_json):
+    if as_json:
+        print(json.dumps(result, ensure_ascii=False, indent=2))
+    elif isinstance(result, list):
+        for record in result:
+            print(format_record(record))
+    elif result.get("content") is not None:
+        print(format_record(result))
+        print(result["content"])
+    else:
+        print(format_record(result))
+
+
+def action_name(args):
+    if args.command == "todo":
+        return f"todo {args.todo_command}"
+    if args.command == "sync":
+        return f"sync {args.sync_command}"
+    return args.command
+
+
+def select_shard(args):
+    """
+    In a sharded journal, move this process onto the shard the command runs on.
+
+    :return: The shard config if the command fans out to every shard instead, else None.
+    """
+    if args.command in ("version", "shards"):
+        return None  # they never open a shard's database
+    import shards
+
+    config = shards.load_config()
+    if config is None:
+        if args.shard:
+            raise SystemExit(f"Error: --shard needs a {shards.config_path()} listing the shards.")
+        return None
+    if args.shard is None and (action_name(args) in FAN_OUT or args.command == "import" and config.route == "year"):
+        if args.command == "import":
+            args.path = os.path.abspath(args.path)
+        return config
+    # File arguments are relative to where the command was run, not to the shard
+    for name in ("path", "output", "checksums", "metrics", "profile", "snapshot", "directory", "target"):
+        value = getattr(args, name, None)
+        if value and value != "-":
+            setattr(args, name, os.path.abspath(value))
+    try:
+        config, name = shards.route(config, args.shard, new_entry=args.command in ("add", "import"))
+    except ValueError as e:
+        raise SystemExit(f"Error: {e}")
+    shards.enter(config.shards[name])
+    return None
+
+
+def run_sharded(args, config):
+    """
+    Run a command on every shard it concerns in parallel and merge the results.
+    """
+    import shards
+    from datetime import datetime
+
+    if args.command == "analytics":
+        from analytics import merge_reports
+        totals = shards.fan_out(config, "analytics", "shard_totals", start=args.start, end=args.end, limit=args.limit)
+        return merge_reports(totals, period=args.period, window=args.window, limit=args.limit)
+    if args.command == "import":
+        return _import_by_year(args, config)
+    if args.command == "timeline":
+        return _sharded_timeline(args, config)
+    names = None
+    if args.command == "between":
+        names = shards.for_years(config, int(args.start[:4]), int((args.end or args.start)[:4]))
+    elif args.command == "on-this-day":
+        # Only earlier years can match
+        names = shards.for_years(config, None, int(args.date[:4]) if args.date else datetime.utcnow().year)
+    key, reverse = FAN_OUT[action_name(args)]
+    limit = getattr(args, "limit", None)
+    if action_name(args) == "todo find" and not args.fuzzy:
+        limit = None  # a plain task search returns every match
+    return shards.merge(shards.fan_out(config, "cli", "run_command", args, names=names), key, reverse, limit)
+
+
+def _import_by_year(args, config):
+    """
+    Import into a journal sharded by year: split the rows by the year of their
+    timestamp, then import each year into its shard in parallel.
+    """
+    import shards
+    import tempfile
+    import time
+    from datetime import datetime
+    from importer import read_rows, split_by_year  # parses only; this process opens no database
+
+    start = time.perf_counter()
+    with tempfile.TemporaryDirectory() as directory:
+        files, skipped = split_by_year(read_rows(args.path, args.format), directory)
+        calls = {}
+        for year, path in sorted(files.items()):
+            config, name = shards.route(config, new_entry=True, timestamp=datetime(year, 1, 1))
+            calls[name] = ("importer", "import_path", (path, "jsonl"), {"batch_size": args.batch_size})
+        results = shards.run_each(config, calls)
+    stats = {"entries": 0, "todos": 0, "skipped": skipped}
+    for result in results.values():
+        for key in stats:
+            stats[key] += result[key]
+    stats["shards"] = {name: result["entries"] for name, result in results.items()}
+    stats["seconds"] = time.perf_counter() - start
+    rows_total = stats["entries"] + stats["todos"]
+    stats["rows_per_sec"] = rows_total / stats["seconds"] if stats["seconds"] else 0.0
+    return stats
+
+
+def _sharded_timeline(args, config):
+    """
+    One timeline page over every shard: each shard returns its page from the same point,
+    and the pages are merged and cut back to ``limit``.
+    """
+    import shards
+
+    after = before = None
+    if args.after or args.before:
+        name, _, entry_id = (args.after or args.before).rpartition(":")
+        if name not in config.shards:
+            raise ValueError("In a sharded journal, give --after/--before as SHARD:ID (as listed).")
+        cursor = shards.fan_out(config, "commands", "entry_cursor", _entry_id(entry_id), names=[name])[name]
+        after, before = (cursor, None) if args.after else (None, cursor)
+    results = shards.fan_out(config, "commands", "timeline_page", around=args.around, after=after, before=before,
+                             limit=args.limit)
+    merged = shards.merge(results, "timestamp")
+    if before:
+        return merged[-args.limit:]
+    if after or not args.around:
+        return merged[:args.limit]
+    # Around a date: up to half the page before it, as in Entry.page_timeline (ISO
+    # timestamps sort like the dates they start with)
+    earlier = [record for record in merged if record["timestamp"] < args.around]
+    later = merged[len(earlier):]
+    keep = min(len(earlier), max(args.limit // 2, args.limit - len(later)))
+    earlier = earlier[len(earlier) - keep:]
+    return earlier + later[:args.limit - len(earlier)]
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    args.sharded = select_shard(args)
+    if not (args.metrics or args.profile):
+        return _run(args)
+
+    profiler = None
+    if args.metrics:
+        from instrumentation import metrics
+        metrics.enable()
+    if args.profile:
+        import cProfile
+        profiler = cProfile.Profile()
+        profiler.enable()
+    try:
+        return _run(args)
+    finally:
+        if profiler:
+            profiler.disable()
+            profiler.dump_stats(args.profile)
+            print(f"Profile written to {args.profile} (python -m pstats {args.profile})", file=sys.stderr)
+        if args.metrics:
+            metrics.dump(args.metrics)
+
+
+def _run(args):
+    if args.command in (None, "menu"):
+        from menu import run_menu
+        run_menu()
+        return 0
+
+    if args.command == "version":
+        print_result({"version": __version__}, args.json)
+        return 0
+
+    if args.command == "shards":
+        import shards
+        config = shards.load_config()
+        if config is None:
+            print(f"Error: no {shards.config_path()}; this journal is not sharded.", file=sys.stderr)
+            return 1
+        print_result(shards.describe(config), args.json)
+        return 0
+
+    from commands import CommandError
+    from instrumentation import metrics
+
+    try:
+        with metrics.action(action_name(args)):  # a no-op unless --metrics is given
+            result = run_sharded(args, args.sharded) if args.sharded else run_command(args)
+    except (CommandError, ValueError, FileNotFoundError) as e:
+        if args.json:
+            print(json.dumps({"error": str(e)}))
         else:
-            print(Fore.RED + "❗ Invalid choice. Please try again.")
+            print(f"Error: {e}", file=sys.stderr)
+        return 1
+
+    if args.command == "export" and args.path == "-":
+        print(json.dumps(result) if args.json else format_record(result), file=sys.stderr)
+        return 0
+
+    if args.command == "analytics" and not args.json:
+        from analytics import format_report
+        print(format_report(result))
+        return 0
+
+    print_result(result, args.json)
+    return 0
 
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
@@ -0,0 +1,381 @@
+"""
+Non-interactive journal operations used by the command-line subcommands.
+
+Each function takes plain arguments, never prompts, and returns JSON-serialisable
+data. Failures are reported by raising CommandError.
+"""
+from datetime import date, timedelta
+from models.entry import Entry, UNCHANGED
+from models.todo import Todo
+from storage import LogStorage
+
+
+class CommandError(Exception):
+    """
+    Raised when a command cannot be carried out (e.g. an unknown ID or invalid mood).
+    """
+
+
+def entry_to_dict(entry):
+    return {
+        "id": entry.id,
+        "title": entry.title,
+        "mood": entry.mood,
+        "timestamp": entry.timestamp.isoformat() if entry.timestamp else None,
+        "content_path": entry.content_path,
+    }
+
+
+def todo_to_dict(todo):
+    return {
+        "id": todo.id,
+        "task": todo.task,
+        "status": todo.status,
+        "entry_id": todo.entry_id,
+    }
+
+
+def _parse_mood(mood):
+    if mood is None:
+        return None
+    try:
+        mood = int(mood)
+    except ValueError:
+        raise CommandError("Invalid mood. Please enter a number between 1 and 5.")
+    if mood < 1 or mood > 5:
+        raise CommandError("Invalid mood. Please enter a number between 1 and 5.")
+    return mood
+
+
+def parse_period(value, last=False):
+    """
+    Parse ``YYYY``, ``YYYY-MM`` or ``YYYY-MM-DD`` into the first day it covers, or the
+    last one with ``last``.
+    """
+    try:
+        parts = [int(part) for part in value.split("-")]
+        if len(parts) == 3:
+            return date(*parts)
+        if len(parts) == 2:
+            year, month = parts
+            if last:
+                return date(year + month // 12, month % 12 + 1, 1) - timedelta(days=1)
+            return date(year, month, 1)
+        if len(parts) == 1:
+            return date(parts[0], 12, 31) if last else date(parts[0], 1, 1)
+    except ValueError:
+        pass
+    raise CommandError(f'Invalid date "{value}". Use YYYY, YYYY-MM or YYYY-MM-DD.')
+
+
+def _get_entry(entry_id):
+    entry = Entry.find_by_id(entry_id)
+    if not entry:
+        raise CommandError(f'Entry with ID "{entry_id}" not found.')
+    return entry
+
+
+def _get_todo(todo_id):
+    todo = Todo.find_by_id(todo_id)
+    if not todo:
+        raise CommandError(f"Todo with ID {todo_id} not found.")
+    return todo
+
+
+# ======== ENTRY COMMANDS ========
+
+def list_entries(limit=None):
+    entries = []
+    for entry in Entry.iter_entries():
+        if limit is not None and len(entries) >= limit:
+            break
+        entries.append(entry_to_dict(entry))
+    return entries
+
+
+def show_entry(entry_id):
+    entry = _get_entry(entry_id)
+    data = entry_to_dict(entry)
+    data["content"] = Entry.get_content(entry)
+    return data
+
+
+def find_entries(title=None, mood=None, fuzzy=False, max_distance=None):
+    """
+    Entries whose title contains ``title``, or with the given mood.
+
+    :param fuzzy: Tolerate typos in the title; each result then has a ``distance``.
+    """
+    if title is not None and fuzzy:
+        return [dict(entry_to_dict(entry), distance=distance)
+                for entry, distance in Entry.find_by_title_fuzzy(title, max_distance=max_distance)]
+    if title is not None:
+        entries = Entry.find_by_title(title)
+    elif mood is not None:
+        entries = Entry.find_by_mood(_parse_mood(mood))
+    else:
+        raise CommandError("Give a title or a mood to search for.")
+    return [entry_to_dict(entry) for entry in entries]
+
+
+def entries_between(start, end=None, limit=None):
+    """
+    Entries from the start of period ``start`` to the end of period ``end`` (default:
+    the end of ``start``), oldest first.
+    """
+    first = parse_period(start)
+    last = parse_period(end or start, last=True)
+    return [entry_to_dict(entry) for entry in Entry.find_between(first, last, limit=limit)]
+
+
+def on_this_day(day=None, limit=None):
+    day = parse_period(day) if day else None
+    return [entry_to_dict(entry) for entry in Entry.on_this_day(day, limit=limit)]
+
+
+def timeline(around=None, after=None, before=None, limit=20):
+    """
+    One page of entries in chronological order: around a date, or after/before an entry.
+    """
+    return timeline_page(around=around, limit=limit,
+                         after=entry_cursor(after) if after is not None else None,
+                         before=entry_cursor(before) if before is not None else None)
+
+
+def entry_cursor(entry_id):
+    """
+    :return: The entry's (timestamp, id) position in the timeline.
+    """
+    return _get_entry(entry_id).cursor
+
+
+def timeline_page(around=None, after=None, before=None, limit=20):
+    """
+    One page of the timeline, after or before a (timestamp, id) cursor or around a date.
+    """
+    entries = Entry.page_timeline(limit=limit, after=after, before=before,
+                                  around=parse_period(around) if around else None)
+    return [entry_to_dict(entry) for entry in entries]
+
+
+def search_entries(query, limit=20):
+    return [
+        dict(entry_to_dict(entry), rank=rank, snippet=snippet)
+        for entry, rank, snippet in Entry.search(query, limit=limit)
+    ]
+
+
+def add_entry(title, content, mood=None):
+    if not title:
+        raise CommandError("Entry title is required.")
+    entry = Entry.add_entry(title=title, content=content, mood=_parse_mood(mood))
+    return entry_to_dict(entry)
+
+
+def update_entry(entry_id, title=None, content=None, mood=None):
+    _get_entry(entry_id)
+    Entry.update_entry(entry_id, title=title, content=content,
+                       mood=_parse_mood(mood) if mood is not None else UNCHANGED)
+    return entry_to_dict(_get_entry(entry_id))
+
+
+def delete_entry(entry_id):
+    entry = entry_to_dict(_get_entry(entry_id))
+    Entry.delete_entry(entry_id)
+    return entry
+
+
+def render_entry(entry_id, output=None):
+    """
+    Render an entry as its human-readable .txt text, optionally writing it to ``output``.
+    """
+    data = show_entry(entry_id)
+    if data["content"] is None:
+        raise CommandError("Content file not found.")
+    if output:
+        with open(output, "w", encoding="utf-8") as f:
+            f.write(data["content"])
+        return {"id": data["id"], "output": output, "bytes": len(data["content"].encode("utf-8"))}
+    return data
+
+
+def compact_log():
+    before, after = LogStorage.default().compact()
+    return {"bytes_before": before, "bytes_after": after}
+
+
+def fsck(repair=False):
+    """
+    Check entry files against the database; fails unless clean or repaired.
+    """
+    import fsck as checker
+    report = checker.check(repair=repair)
+    if not repair and not checker.is_clean(report):
+        raise CommandError(f"Inconsistencies found (run with --repair): {report}")
+    if repair and not checker.is_repaired(report):
+        raise CommandError(f"No content to rebuild entries {report['unrecoverable']} from: {report}")
+    return report
+
+
+def verify(repair=False, workers=8, processes=False, checksums=None):
+    """
+    Scan the entry files in parallel; fails unless they are consistent or were repaired.
+    """
+    import fsck as checker
+    import verify as scanner
+    report = scanner.verify(repair=repair, workers=workers, processes=processes, checksums=checksums)
+    if repair and not checker.is_repaired(report):
+        raise CommandError(f"No content to rebuild entries {report['unrecoverable']} from.")
+    if not repair and not scanner.is_clean(report):
+        problems = {key: len(report[key]) for key in
+                    ("missing", "orphans", "stale_tmp", "header_mismatches", "unreadable") if report[key]}
+        if report["unapplied_ops"]:
+            problems["unapplied_ops"] = report["unapplied_ops"]
+        raise CommandError(f"Inconsistencies found (run with --repair): {problems}")
+    return report
+
+
+def check_summary():
+    """
+    Compare the daily summary with the entries and to-dos; fails if they disagree.
+    """
+    import summary
+    problems = summary.check()
+    if problems:
+        raise CommandError(f"Daily summary is inconsistent on {len(problems)} day(s) "
+                           f"(run rebuild-summary): {problems[:10]}")
+    return {"consistent": True}
+
+
+def analytics(period="week", window=7, start=None, end=None, limit=10):
+    import analytics as stats
+    if window < 1:
+        raise CommandError("The rolling window must be at least one day.")
+    return stats.report(period=period, window=window, start=start, end=end, limit=limit)
+
+
+# ======== TODO COMMANDS ========
+
+def list_todos(entry_id=None, limit=None):
+    if entry_id is not None:
+        todos = _get_entry(entry_id).get_todos()
+    else:
+        todos = Todo.iter_todos()
+
+    result = []
+    for todo in todos:
+        if limit is not None and len(result) >= limit:
+            break
+        result.append(todo_to_dict(todo))
+    return result
+
+
+def todo_report(limit=None):
+    report = []
+    for entry in Entry.get_entries_with_todos(limit=limit):
+        data = entry_to_dict(entry)
+        data["todos"] = [todo_to_dict(todo) for todo in entry.todos]
+        data["done"] = sum(1 for todo in entry.todos if todo.status == "done")
+        report.append(data)
+    return report
+
+
+def show_todo(todo_id):
+    return todo_to_dict(_get_todo(todo_id))
+
+
+def find_todos(task, fuzzy=False, status=None, entry_id=None, max_distance=None, limit=20):
+    """
+    To-dos whose task contains ``task``.
+
+    :param fuzzy: Tolerate typos; results are ranked by edit distance, each with a
+        ``distance``.
+    :param status: Only to-dos with this status.
+    :param entry_id: Only to-dos of this entry.
+    """
+    if fuzzy:
+        matches = Todo.find_by_task_fuzzy(task, status=status, entry_id=entry_id, max_distance=max_distance,
+                                          limit=limit)
+        return [dict(todo_to_dict(todo), distance=distance) for todo, distance in matches]
+    return [todo_to_dict(todo) for todo in Todo.find_by_task(task, status=status, entry_id=entry_id)]
+
+
+def add_todo(entry_id, task, status="pending"):
+    _get_entry(entry_id)
+    return todo_to_dict(Todo.add_todo(task=task, entry_id=entry_id, status=status))
+
+
+def update_todo(todo_id, task=None, status=None):
+    _get_todo(todo_id)
+    Todo.update_todo(todo_id=todo_id, task=task, status=status)
+    return todo_to_dict(_get_todo(todo_id))
+
+
+def delete_todo(todo_id):
+    todo = todo_to_dict(_get_todo(todo_id))
+    Todo.delete_todo(todo_id)
+    return todo
+
+
+def bulk_done(ids=None, entry_id=None, task=None):
+    """
+    Mark the selected to-dos as done in one statement.
+    """
+    try:
+        count = Todo.bulk_update_status("done", ids=ids or None, entry_id=entry_id, task=task)
+    except ValueError as e:
+        raise CommandError(str(e))
+    return {"updated": count}
+
+
+def bulk_delete(ids=None, entry_id=None, status=None, task=None):
+    """
+    Delete the selected to-dos in one statement.
+    """
+    try:
+        count = Todo.bulk_delete(ids=ids or None, entry_id=entry_id, status=status, task=task)
+    except ValueError as e:
+        raise CommandError(str(e))
+    return {"deleted": count}
+
+
+# ======== SYNC COMMANDS ========
+
+def sync_status(peer=None):
+    import sync
+    return sync.status(peer)
+
+
+def sync_export(path, peer=None):
+    """
+    Write the changes a peer has not confirmed yet (all changes without ``peer``) to a file.
+    """
+    import sync
+    return sync.export_bundle(path, peer=peer)
+
+
+def sync_import(path):
+    import sync
+    try:
+        return sync.import_bundle(path)
+    except (KeyError, ValueError) as e:
+        raise CommandError(f"Invalid sync bundle {path}: {e}")
+
+
+def sync_connect(address):
+    """
+    Exchange changes with a journal running ``sync serve``.
+    """
+    import sync
+    try:
+        return sync.connect(address)
+    except (OSError, KeyError, ValueError) as e:
+        raise CommandError(f"Sync with {address} failed: {e}")
+
+
+def sync_serve(host="127.0.0.1", port=None, once=False):
+    import sync
+    try:
+        return sync.serve(host, port or sync.DEFAULT_PORT, once=once) or {}
+    except OSError as e:
+        raise CommandError(f"Cannot serve sync on {host}:{port}: {e}")
@@ -0,0 +1,112 @@
+"""
+Move existing entries from one storage backend to another.
+
+Each entry's body is read from the backend it currently lives in and written to the
+target backend together with its current to-dos; ``content_path`` is then pointed at
+the new key. The history blocks of deleted or updated to-dos are not carried over --
+the target holds the entry as it is now.
+
+Usage::
+
+    python convert_storage.py cas [--batch-size 500]
+"""
+import time
+from sqlalchemy import or_
+from sqlalchemy.orm import selectinload
+from init import session
+from models.entry import Entry
+from models.todo import Todo  # noqa: F401 -- registers Entry.todos
+from storage import get_backend, get_storage, CasStorage, LogStorage
+import cache
+
+
+def _convert_batch(entries, target):
+    """
+    Re-store one batch of entries in ``target`` and commit it.
+
+    :return: (converted, missing) counts.
+    """
+    converted = missing = 0
+    written, old_keys = [], []
+    try:
+        for entry in entries:
+            source = get_storage(entry.content_path)
+            body = source.read_body(entry.content_path)
+            if body is None:
+                missing += 1
+                continue
+            todos = [(todo.task, todo.status) for todo in entry.todos]
+            key = target.create(entry.title, body, entry.mood, entry.timestamp, todos=todos)
+            written.append(key)
+            old_keys.append((source, entry.content_path))
+            if source.transactional:
+                source.delete(entry.content_path)
+            entry.content_path = key
+            converted += 1
+        session.commit()
+    except Exception:
+        session.rollback()
+        if not target.transactional:
+            for key in written:
+                target.delete(key)
+        raise
+
+    for source, key in old_keys:
+        if not source.transactional:
+            source.delete(key)
+    for entry in entries:
+        cache.invalidate_entry(entry.id)
+    return converted, missing
+
+
+def convert(backend, batch_size=500):
+    """
+    Move every entry not already stored in ``backend`` to it, one transaction per batch.
+
+    :param backend: ``file``, ``log`` or ``cas``.
+    :return: A dict with converted/missing counts, timing and, after moving entries out
+        of the content-addressed store, the blobs garbage-collected.
+    """
+    target = get_backend(backend)
+    start = time.perf_counter()
+    stats = {"converted": 0, "missing": 0}
+    moved_from_cas = False
+    last_id = 0
+
+    while True:
+        query = (
+            session.query(Entry)
+            .options(selectinload(Entry.todos))
+            .filter(Entry.id > last_id)
+            .order_by(Entry.id)
+        )
+        if target.prefix:
+            query = query.filter(~Entry.content_path.startswith(target.prefix))
+        else:
+            query = query.filter(or_(
+                Entry.content_path.startswith(LogStorage.prefix),
+                Entry.content_path.startswith(CasStorage.prefix),
+            ))
+        entries = query.limit(batch_size).all()
+        if not entries:
+            break
+        last_id = entries[-1].id
+        moved_from_cas |= any(e.content_path.startswith(CasStorage.prefix) for e in entries)
+
+        converted, missing = _convert_batch(entries, target)
+        stats["converted"] += converted
+        stats["missing"] += missing
+
+    if moved_from_cas:
+        stats["blobs_removed"], stats["bytes_freed"] = get_backend("cas").gc()
+    stats["seconds"] = time.perf_counter() - start
+    return stats
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Move entries to another storage backend")
+    parser.add_argument("backend", choices=["file", "log", "cas"])
+    parser.add_argument("--batch-size", type=int, default=500)
+    args = parser.parse_args()
+    print(convert(args.backend, batch_size=args.batch_size))
@@ -0,0 +1,154 @@
+"""
+Text formats of the human-readable entry files.
+
+Shared by the models, the bulk importer and the storage backends so that every
+writer and reader agrees on what an entry file looks like.
+"""
+
+MOOD_MAP = {
+    1: "😞 Very Sad",
+    2: "😕 Sad",
+    3: "😐 Neutral",
+    4: "🙂 Happy",
+    5: "😄 Very Happy"
+}
+
+
+def entry_filename(title, timestamp):
+    """
+    Build the content file path for an entry from its title and timestamp.
+    """
+    safe_title = title.replace(' ', '_')
+    return f"entries/{safe_title}_{timestamp.strftime('%Y-%m-%d_%H-%M-%S')}.txt"
+
+
+def format_entry_file(title, content, mood, timestamp):
+    """
+    Render the text written to a new entry's content file.
+    """
+    lines = [
+        "="*40,
+        "       📝 Journal Entry",
+        "="*40,
+        "",
+        f"Title     : {title}",
+        f"Mood      : {MOOD_MAP.get(mood, 'N/A')}",
+        f"Timestamp : {timestamp.strftime('%Y-%m-%d %H:%M:%S')}",
+        "",
+        "-"*40,
+        "Content:",
+        "-"*40,
+        content,
+    ]
+    return "\n".join(lines) + "\n"
+
+
+def format_todo_block(task, status):
+    """
+    Render the block appended to an entry file when a to-do is added.
+    """
+    lines = [
+        "",
+        "="*40,
+        "          ✅ To-Do",
+        "="*40,
+        f"📝 Task   : {task}",
+        f"📌 Status : {status.capitalize()}",
+    ]
+    return "\n".join(lines) + "\n"
+
+
+def format_todo_deleted_block(task, status):
+    """
+    Render the block appended to an entry file when a to-do is deleted.
+    """
+    lines = [
+        "",
+        "="*40,
+        "       ❌ To-Do Deleted",
+        "="*40,
+        f"📝 Task   : {task}",
+        f"📌 Status : {status.capitalize() if status else 'N/A'}",
+    ]
+    return "\n".join(lines) + "\n"
+
+
+def format_todo_updated_block(old_task, old_status, task, status):
+    """
+    Render the pair of blocks appended to an entry file when a to-do is updated.
+    """
+    lines = [
+        "",
+        "="*40,
+        "   ❗️ Previous To-Do Updated",
+        "="*40,
+        f"📝 Old Task   : {old_task}",
+        f"📌 Old Status : {old_status.capitalize() if old_status else 'N/A'}",
+        "",
+        "="*40,
+        "       🔄 New To-Do",
+        "="*40,
+        f"📝 Task   : {task}",
+        f"📌 Status : {status.capitalize() if status else 'N/A'}",
+    ]
+    return "\n".join(lines) + "\n"
+
+
+def format_todo_event(event):
+    """
+    Render a to-do event dict (as recorded by the storage backends) as its file block.
+    """
+    kind = event["kind"]
+    if kind == "added":
+        return format_todo_block(event["task"], event["status"])
+    if kind == "deleted":
+        return format_todo_deleted_block(event["task"], event["status"])
+    if kind == "updated":
+        return format_todo_updated_block(event["old_task"], event["old_status"], event["task"], event["status"])
+    raise ValueError(f"Unknown to-do event: {kind}")
+
+
+def entry_body_span(text):
+    """
+    Locate the journal content in an entry file.
+
+    Understands both the format written by ``format_entry_file`` and the shorter
+    ``Title: ...`` header that ``update_entry`` used to write.
+
+    :return: (start, end) offsets of the content; ``end`` is where the to-do blocks
+        begin, or the length of the text if there are none.
+    """
+    marker = "Content:\n" + "-"*40 + "\n"
+    if text.startswith("="*40) and marker in text:
+        start = text.index(marker) + len(marker)
+    elif text.startswith("Title: ") and "\n\n" in text:
+        start = text.index("\n\n") + 2
+    else:
+        start = 0
+
+    end = text.find("\n" + "="*40 + "\n", start)
+    return start, len(text) if end == -1 else end
+
+
+def parse_entry_body(text):
+    """
+    Extract the journal content from an entry file, without header or to-do blocks.
+    """
+    start, end = entry_body_span(text)
+    return text[start:end].rstrip("\n")
+
+
+def parse_entry_header(text):
+    """
+    Read the header fields of an entry file.
+
+    :return: (format, title, mood, timestamp) as strings, where format is ``"entry"``
+        for the ``format_entry_file`` header, ``"legacy"`` for the old ``update_entry``
+        header and ``"unknown"`` otherwise (the other fields are then None).
+    """
+    lines = text.split("\n", 8)
+    if len(lines) > 7 and lines[0] == "="*40 and lines[4].startswith("Title     : "):
+        return "entry", lines[4][12:], lines[5][12:], lines[6][12:]
+    if len(lines) > 3 and lines[0].startswith("Title: ") and lines[1].startswith("Mood: "):
+        return "legacy", lines[0][7:], lines[1][6:], lines[2][11:]
+    return "unknown", None, None, None
@@ -0,0 +1,148 @@
+"""
+Lazy, memory-mapped reading of entry files.
+
+An entry file keeps growing after it is written: every to-do change appends another
+block to it. ``EntryContent`` maps the file instead of reading it, locates the header,
+the journal content and the to-do blocks with byte searches on the mapping, and hands
+out ``memoryview`` slices of it. Opening an entry therefore costs the same however
+long it has grown, and only the parts that are decoded are read from disk.
+"""
+import mmap
+from instrumentation import io_counters
+
+RULE = b"=" * 40
+CONTENT_MARKER = b"Content:\n" + b"-" * 40 + b"\n"
+# A to-do block starts with an empty line and a rule (see entry_format).
+BLOCK_START = b"\n\n" + RULE + b"\n"
+
+# The header markers are only looked for this far into the file.
+HEADER_LIMIT = 4096
+
+
+def decode(view):
+    """
+    Turn a slice of an entry file into text.
+    """
+    data = bytes(view)
+    io_counters.read(data)
+    return data.decode("utf-8", errors="replace")
+
+
+class EntryContent:
+    """
+    An entry file (or rendered entry text) opened for partial reads.
+
+    The offsets mirror ``entry_format.entry_body_span``: the header ends where the
+    journal content starts, and the content ends where the first to-do block begins.
+    Views must be released before ``close``, which unmaps the file.
+    """
+
+    def __init__(self, data, mapping=None):
+        """
+        :param data: The entry text as bytes, or a memory map of the file.
+        :param mapping: The mmap to close along with this object, if any.
+        """
+        self._data = data
+        self._mapping = mapping
+        self._span = None
+
+    @classmethod
+    def open(cls, path):
+        """
+        Map an entry file.
+
+        :return: An EntryContent, or None if the file is missing.
+        """
+        try:
+            with open(path, "rb") as f:
+                if not f.seek(0, 2):
+                    return cls(b"")  # an empty file cannot be mapped
+                mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except FileNotFoundError:
+            return None
+        return cls(mapping, mapping)
+
+    def close(self):
+        if self._mapping is not None:
+            self._mapping.close()
+            self._mapping = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self):
+        return len(self._data)
+
+    def body_span(self):
+        """
+        :return: (start, end) byte offsets of the journal content.
+        """
+        if self._span is None:
+            data = self._data
+            start = 0
+            if data[:len(RULE)] == RULE:
+                found = data.find(CONTENT_MARKER, 0, HEADER_LIMIT)
+                if found != -1:
+                    start = found + len(CONTENT_MARKER)
+            elif data[:7] == b"Title: ":
+                found = data.find(b"\n\n", 0, HEADER_LIMIT)
+                if found != -1:
+                    start = found + 2
+            end = data.find(BLOCK_START[1:], start)
+            self._span = (start, len(data) if end == -1 else end)
+        return self._span
+
+    def _view(self, start, end):
+        return memoryview(self._data)[start:end]
+
+    def header(self):
+        """
+        The header lines (title, mood and timestamp) as a view.
+        """
+        return self._view(0, self.body_span()[0])
+
+    def body(self):
+        """
+        The journal content, without header or to-do blocks, as a view.
+        """
+        return self._view(*self.body_span())
+
+    def todo_tail(self, blocks=None):
+        """
+        The to-do blocks appended after the content, as a view.
+
+        :param blocks: Only the last this many blocks (default: all of them).
+        """
+        start = self.body_span()[1]
+        if blocks is not None:
+            tail_start = len(self._data)
+            for _ in range(blocks):
+                found = self._data.rfind(BLOCK_START, start, tail_start)
+                if found == -1:
+                    break
+                tail_start = found
+            else:
+                start = tail_start + 1
+        return self._view(start, len(self._data))
+
+    def page(self, offset, lines):
+        """
+        Decode up to ``lines`` lines starting at byte ``offset``.
+
+        :return: (text, offset of the next page, or None at the end of the file).
+        """
+        data = self._data
+        end = offset
+        for _ in range(lines):
+            found = data.find(b"\n", end)
+            if found == -1:
+                end = len(data)
+                break
+            end = found + 1
+        text = decode(self._view(offset, end))
+        if text.endswith("\n"):
+            text = text[:-1]
+        return text, (end if end < len(data) else None)
@@ -0,0 +1,240 @@
+"""
+Streaming export of entries and their to-dos to JSONL, CSV or Parquet.
+
+The output uses the same fields as ``importer.py`` (title, content, mood, timestamp,
+todos), plus the entry ID, so an export can be imported again. Entries and to-dos are
+streamed from two ordered cursors and merged, so only a batch at a time is held in
+memory. Entry content is read from storage by a thread pool while the main thread
+fetches the next batch and writes finished ones.
+
+Parquet output needs the optional ``pyarrow`` package.
+"""
+import csv
+import json
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from sqlalchemy import select
+from init import session, unit_of_work
+from models.entry import Entry
+from models.todo import Todo
+from storage import get_storage
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+
+DEFAULT_BATCH_SIZE = 1000
+DEFAULT_WORKERS = 4
+
+# Batches whose content is being read ahead of the writer
+PREFETCH_BATCHES = 2
+
+FIELDS = ["id", "title", "mood", "timestamp", "content", "todos"]
+
+
+class JsonlWriter:
+    binary = False
+
+    def __init__(self, f):
+        self.f = f
+
+    def write(self, rows):
+        self.f.write("".join(json.dumps(row, ensure_ascii=False) + "\n" for row in rows))
+
+    def close(self):
+        pass
+
+
+class CsvWriter:
+    """
+    One row per entry; the ``todos`` column holds a JSON list, as ``read_csv`` expects.
+    """
+    binary = False
+
+    def __init__(self, f):
+        self.writer = csv.DictWriter(f, fieldnames=FIELDS)
+        self.writer.writeheader()
+
+    def write(self, rows):
+        self.writer.writerows(dict(row, todos=json.dumps(row["todos"], ensure_ascii=False)) for row in rows)
+
+    def close(self):
+        pass
+
+
+class ParquetWriter:
+    """
+    One row group per batch, with the to-dos as a list of (task, status) structs.
+    """
+    binary = True
+
+    def __init__(self, f):
+        if pyarrow is None:
+            raise ValueError("Parquet export needs the pyarrow package (pip install pyarrow).")
+        self.schema = pyarrow.schema([
+            ("id", pyarrow.int64()),
+            ("title", pyarrow.string()),
+            ("mood", pyarrow.int8()),
+            ("timestamp", pyarrow.string()),
+            ("content", pyarrow.string()),
+            ("todos", pyarrow.list_(pyarrow.struct([("task", pyarrow.string()), ("status", pyarrow.string())]))),
+        ])
+        self.writer = pyarrow.parquet.ParquetWriter(f, self.schema, compression="zstd")
+
+    def write(self, rows):
+        columns = {name: [row[name] for row in rows] for name in FIELDS}
+        self.writer.write_table(pyarrow.table(columns, schema=self.schema))
+
+    def close(self):
+        self.writer.close()
+
+
+WRITERS = {"jsonl": JsonlWriter, "csv": CsvWriter, "parquet": ParquetWriter}
+
+
+def guess_format(path):
+    ext = os.path.splitext(path)[1].lower().lstrip(".")
+    return ext if ext in WRITERS else "jsonl"
+
+
+def iter_batches(batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Yield lists of entry dicts in ID order, with their to-dos but without content.
+
+    Entries and to-dos are read through two streaming (``yield_per``) queries ordered by
+    entry ID and merged here, instead of one to-do query per batch.
+
+    :return: Lists of dicts with the export fields; ``content`` holds the storage key.
+    """
+    entries = session.execute(
+        select(Entry.id, Entry.title, Entry.mood, Entry.timestamp, Entry.content_path)
+        .order_by(Entry.id)
+        .execution_options(yield_per=batch_size)
+    )
+    todos = iter(session.execute(
+        select(Todo.entry_id, Todo.task, Todo.status)
+        .where(Todo.entry_id.isnot(None))
+        .order_by(Todo.entry_id, Todo.id)
+        .execution_options(yield_per=batch_size)
+    ))
+    todo = next(todos, None)
+    for partition in entries.partitions():
+        batch = []
+        for id_, title, mood, timestamp, key in partition:
+            while todo is not None and todo.entry_id < id_:
+                todo = next(todos, None)  # to-do of a missing entry
+            entry_todos = []
+            while todo is not None and todo.entry_id == id_:
+                entry_todos.append({"task": todo.task, "status": todo.status})
+                todo = next(todos, None)
+            batch.append({
+                "id": id_,
+                "title": title,
+                "mood": mood,
+                "timestamp": timestamp.isoformat() if timestamp else None,
+                "content": key,
+                "todos": entry_todos,
+            })
+        yield batch
+
+
+def _read_contents(keys):
+    """
+    Read entry bodies in a worker thread, on a short-lived session of its own.
+    """
+    with unit_of_work():
+        return [get_storage(key).read_body(key) for key in keys]
+
+
+def _submit_batch(pool, batch, workers):
+    size = max(1, -(-len(batch) // workers))
+    keys = [row["content"] for row in batch]
+    return [pool.submit(_read_contents, keys[i:i + size]) for i in range(0, len(keys), size)]
+
+
+def export_entries(path, fmt=None, batch_size=DEFAULT_BATCH_SIZE, workers=DEFAULT_WORKERS):
+    """
+    Export every entry with its content and to-dos.
+
+    The file is written under a temporary name and renamed when complete, so an
+    interrupted export never leaves a truncated file behind. ``path`` may be ``-`` for
+    standard output (JSONL and CSV only).
+
+    :param workers: Threads reading entry content.
+    :return: A dict with entry, to-do and missing-content counts, bytes written,
+        elapsed seconds and entries/sec.
+    """
+    fmt = fmt or guess_format(path)
+    if fmt not in WRITERS:
+        raise ValueError(f"Unsupported export format: {fmt}")
+    writer_class = WRITERS[fmt]
+    to_stdout = path == "-"
+    if to_stdout and writer_class.binary:
+        raise ValueError(f"{fmt} output needs a file path.")
+
+    stats = {"entries": 0, "todos": 0, "missing_content": 0}
+    start = time.perf_counter()
+    tmp = None if to_stdout else path + ".tmp"
+    if to_stdout:
+        f = sys.stdout
+    else:
+        f = open(tmp, "wb") if writer_class.binary else open(tmp, "w", encoding="utf-8", newline="")
+
+    try:
+        writer = writer_class(f)
+
+        def write(batch, futures):
+            contents = [content for future in futures for content in future.result()]
+            for row, content in zip(batch, contents):
+                row["content"] = content
+                stats["missing_content"] += content is None
+                stats["todos"] += len(row["todos"])
+            writer.write(batch)
+            stats["entries"] += len(batch)
+
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            pending = deque()
+            for batch in iter_batches(batch_size):
+                pending.append((batch, _submit_batch(pool, batch, workers)))
+                if len(pending) > PREFETCH_BATCHES:
+                    write(*pending.popleft())
+            while pending:
+                write(*pending.popleft())
+        writer.close()
+    except BaseException:
+        if tmp:
+            f.close()
+            os.remove(tmp)
+        raise
+    finally:
+        session.commit()  # end the read transaction of the streaming queries
+
+    if tmp:
+        f.flush()
+        os.fsync(f.fileno())
+        f.close()
+        os.replace(tmp, path)
+        stats["bytes"] = os.path.getsize(path)
+    stats["seconds"] = time.perf_counter() - start
+    stats["entries_per_sec"] = stats["entries"] / stats["seconds"] if stats["seconds"] else 0.0
+    return stats
+
+
+def export_file(path, fmt=None, batch_size=DEFAULT_BATCH_SIZE, workers=DEFAULT_WORKERS):
+    """
+    Export all entries to a file and print a throughput summary.
+    """
+    stats = export_entries(path, fmt=fmt, batch_size=batch_size, workers=workers)
+    print(
+        f"Exported {stats['entries']} entries and {stats['todos']} to-dos "
+        f"in {stats['seconds']:.2f}s ({stats['entries_per_sec']:.0f} entries/sec)."
+    )
+    if stats["missing_content"]:
+        print(f"{stats['missing_content']} entries had no content.")
+    return stats
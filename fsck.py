@@ -0,0 +1,160 @@
+"""
+Consistency check between the database and the entry files on disk.
+
+Finds (and with ``repair=True`` fixes):
+
+* committed file operations that were never applied -- rolled forward;
+* stale ``.tmp`` files left by transactions that never committed -- deleted;
+* entries whose file is missing -- the staged ``.tmp`` is promoted if there is one,
+  otherwise the file is regenerated from the database (content from the search index,
+  to-dos as they are now, without their history). An entry the search index has no
+  content for is reported as unrecoverable and left alone;
+* files in ``entries/`` that no entry points to -- moved to ``entries/lost+found/``,
+  under a new name if one of that name is already there.
+
+Entries kept in the segment log (``log:`` keys) or the content-addressed store
+(``cas:`` keys) are not checked here.
+"""
+import os
+import shutil
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+from init import session
+from models.entry import Entry
+from models.todo import Todo  # noqa: F401 -- registers Entry.todos, used when regenerating
+from models.file_intent import FileIntent
+from entry_format import format_entry_file, format_todo_block
+import search
+from storage import CasStorage, LogStorage, recover_file_ops
+
+ENTRIES_DIR = "entries"
+LOST_AND_FOUND = os.path.join(ENTRIES_DIR, "lost+found")
+
+
+def _indexed_content(entry_id):
+    try:
+        row = session.execute(
+            text(f"SELECT content FROM {search.FTS_TABLE} WHERE rowid = :id"), {"id": entry_id}
+        ).first()
+    except OperationalError:
+        return None
+    return row[0] if row else None
+
+
+def _regenerate(entry):
+    """
+    Rebuild a missing entry file from the database: metadata, indexed content and the
+    current to-dos (their earlier events are lost).
+
+    :return: False, writing nothing, if the search index has no content for the entry.
+    """
+    content = _indexed_content(entry.id)
+    if content is None:
+        return False
+    text_ = format_entry_file(entry.title, content, entry.mood, entry.timestamp)
+    text_ += "".join(format_todo_block(todo.task, todo.status) for todo in entry.todos)
+    os.makedirs(os.path.dirname(entry.content_path) or ".", exist_ok=True)
+    tmp = entry.content_path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(text_)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, entry.content_path)
+    return True
+
+
+def move_to_lost_and_found(path):
+    """
+    Move an orphan file into ``entries/lost+found/``, numbering it if the name is taken.
+
+    :return: The new path.
+    """
+    os.makedirs(LOST_AND_FOUND, exist_ok=True)
+    stem, ext = os.path.splitext(os.path.basename(path))
+    target = os.path.join(LOST_AND_FOUND, stem + ext)
+    number = 1
+    while os.path.exists(target):
+        target = os.path.join(LOST_AND_FOUND, f"{stem}-{number}{ext}")
+        number += 1
+    shutil.move(path, target)
+    return target
+
+
+def _entry_files():
+    if not os.path.isdir(ENTRIES_DIR):
+        return []
+    return [
+        os.path.join(ENTRIES_DIR, name)
+        for name in sorted(os.listdir(ENTRIES_DIR))
+        if os.path.isfile(os.path.join(ENTRIES_DIR, name))
+    ]
+
+
+def check(repair=False):
+    """
+    Compare entry rows with the files in ``entries/``.
+
+    :param repair: Fix what is found instead of only reporting it.
+    :return: A dict listing the problems found (and, when repairing, fixed).
+    """
+    FileIntent.__table__.create(session.connection(), checkfirst=True)
+    report = {"unapplied_ops": 0, "stale_tmp": [], "missing": [], "orphans": [], "regenerated": [],
+              "unrecoverable": [], "repaired": repair}
+
+    if repair:
+        report["unapplied_ops"] = recover_file_ops()
+        session.commit()
+    else:
+        report["unapplied_ops"] = session.query(FileIntent).count()
+
+    pending = {intent.source for intent in session.query(FileIntent) if intent.source}
+    entries = [
+        entry for entry in session.query(Entry).order_by(Entry.id)
+        if not entry.content_path.startswith((LogStorage.prefix, CasStorage.prefix))
+    ]
+    referenced = {os.path.normpath(entry.content_path) for entry in entries}
+
+    for entry in entries:
+        if os.path.exists(entry.content_path):
+            continue
+        report["missing"].append({"id": entry.id, "path": entry.content_path})
+        if repair:
+            tmp = entry.content_path + ".tmp"
+            if os.path.exists(tmp):
+                os.replace(tmp, entry.content_path)
+            elif _regenerate(entry):
+                report["regenerated"].append(entry.id)
+            else:
+                report["unrecoverable"].append(entry.id)
+
+    for path in _entry_files():
+        if path.endswith(".tmp"):
+            if path in pending or not os.path.exists(path):
+                continue
+            report["stale_tmp"].append(path)
+            if repair:
+                os.remove(path)
+        elif os.path.normpath(path) not in referenced:
+            report["orphans"].append(path)
+            if repair:
+                move_to_lost_and_found(path)
+
+    return report
+
+
+def is_clean(report):
+    return not (report["unapplied_ops"] or report["stale_tmp"] or report["missing"] or report["orphans"])
+
+
+def is_repaired(report):
+    """
+    Whether a repair fixed everything it found: no entry was left without its file.
+    """
+    return not report["unrecoverable"]
+
+
+if __name__ == "__main__":
+    import sys
+    result = check(repair="--repair" in sys.argv)
+    print(result)
+    sys.exit(0 if is_clean(result) or (result["repaired"] and is_repaired(result)) else 1)
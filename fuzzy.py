@@ -0,0 +1,257 @@
+"""
+Typo-tolerant lookup of to-do tasks and entry titles through trigram indexes.
+
+Each indexed column gets an external-content FTS5 table with the ``trigram``
+tokenizer, kept in sync by triggers on the source table, so bulk inserts, updates and
+deletes are covered too.
+
+A lookup never scans the table. A text within ``k`` edits of the query lacks at most
+``3k`` of the query's trigrams (one edit touches at most three), so it contains at
+least one of any ``3k + 1`` of them. The index is asked for the rows containing one of
+the ``3k + 1`` rarest query trigrams, for ``k`` = 0, 1, ... until enough close
+matches are found, and the candidates are ranked by edit distance: the fewest
+insertions, deletions or substitutions that turn the query into some part of the text.
+
+A short query has too few trigrams for that: with fewer than ``3k + 1`` distinct ones
+(``mxlk`` has two, yet ``milk`` is one edit away) a close match may share none. Such
+queries fall back to a ``LIKE`` scan for texts holding the query's characters in
+order with ``k`` of them left out, which every match within ``k`` edits does, and rank
+those. Queries shorter than three characters looked up exactly are a substring scan.
+"""
+from itertools import combinations
+from sqlalchemy import bindparam, text
+from init import session
+
+
+# name -> (source table, indexed column)
+INDEXES = {
+    "todos_trgm": ("todos", "task"),
+    "entry_titles_trgm": ("entries", "title"),
+}
+
+# Above this many LIKE patterns the short-query fallback checks every row instead
+MAX_PATTERNS = 64
+
+_ready = set()
+
+
+def _create(name):
+    table, column = INDEXES[name]
+    session.execute(text(
+        f"CREATE VIRTUAL TABLE {name} USING fts5({column}, content='{table}', content_rowid='id', "
+        "tokenize='trigram')"
+    ))
+    session.execute(text(
+        f"CREATE TRIGGER {name}_ai AFTER INSERT ON {table} BEGIN "
+        f"INSERT INTO {name} (rowid, {column}) VALUES (new.id, new.{column}); END"
+    ))
+    session.execute(text(
+        f"CREATE TRIGGER {name}_ad AFTER DELETE ON {table} BEGIN "
+        f"INSERT INTO {name} ({name}, rowid, {column}) VALUES ('delete', old.id, old.{column}); END"
+    ))
+    session.execute(text(
+        f"CREATE TRIGGER {name}_au AFTER UPDATE OF {column} ON {table} BEGIN "
+        f"INSERT INTO {name} ({name}, rowid, {column}) VALUES ('delete', old.id, old.{column}); "
+        f"INSERT INTO {name} (rowid, {column}) VALUES (new.id, new.{column}); END"
+    ))
+    # Document frequency of each trigram, used to pick the most selective ones
+    session.execute(text(f"CREATE VIRTUAL TABLE {name}_vocab USING fts5vocab({name}, 'row')"))
+    session.execute(text(f"INSERT INTO {name} ({name}) VALUES ('rebuild')"))
+
+
+def _drop(name):
+    for trigger in ("ai", "ad", "au"):
+        session.execute(text(f"DROP TRIGGER IF EXISTS {name}_{trigger}"))
+    session.execute(text(f"DROP TABLE IF EXISTS {name}_vocab"))
+    session.execute(text(f"DROP TABLE IF EXISTS {name}"))
+
+
+def ensure_indexes():
+    """
+    Create the trigram tables and their triggers if they do not exist, indexing the
+    existing rows. From then on the triggers keep them up to date. An index whose
+    triggers are gone (its source table was dropped and created again) is rebuilt.
+
+    :return: The names of the indexes that were created.
+    """
+    if len(_ready) == len(INDEXES):
+        return []
+    existing = {name for (name,) in session.execute(
+        text("SELECT name FROM sqlite_master WHERE type IN ('table', 'trigger')"))}
+    created = []
+    for name, (table, _) in INDEXES.items():
+        if table not in existing:
+            continue
+        if name not in existing or f"{name}_ai" not in existing:
+            _drop(name)
+            _create(name)
+            created.append(name)
+        _ready.add(name)
+    if created:
+        session.commit()
+    return created
+
+
+def default_max_distance(query):
+    """
+    The edit distance tolerated by default: none for very short queries, then one typo
+    per four characters, at most three.
+    """
+    return min(3, len(query) // 4)
+
+
+def edit_distance(query, text_):
+    """
+    Smallest edit distance between ``query`` and any substring of ``text_``.
+
+    Myers' bit-parallel form of Sellers' algorithm: one column of the edit-distance
+    table is kept as bit vectors, so each character of ``text_`` costs a few integer
+    operations however long the query is. Matching may start and end anywhere in
+    ``text_`` at no cost, so an exact substring scores 0.
+    """
+    m = len(query)
+    if not m:
+        return 0
+    peq = {}
+    for i, ch in enumerate(query):
+        peq[ch] = peq.get(ch, 0) | (1 << i)
+    mask = (1 << m) - 1
+    high = 1 << (m - 1)
+    pv, mv, score = mask, 0, m
+    best = m
+    for ch in text_:
+        eq = peq.get(ch, 0)
+        xv = eq | mv
+        xh = (((eq & pv) + pv) ^ pv) | eq
+        ph = mv | (~(xh | pv) & mask)
+        mh = pv & xh
+        if ph & high:
+            score += 1
+        elif mh & high:
+            score -= 1
+            if score < best:
+                best = score
+        ph = (ph << 1) & mask
+        mh = (mh << 1) & mask
+        pv = mh | (~(xv | ph) & mask)
+        mv = ph & xv
+    return best
+
+
+def trigrams(value):
+    return {value[i:i + 3] for i in range(len(value) - 2)}
+
+
+def _by_frequency(name, grams):
+    """
+    The query trigrams ordered from the one occurring in the fewest rows.
+    """
+    frequency = dict(session.execute(
+        text(f"SELECT term, doc FROM {name}_vocab WHERE term IN :grams").bindparams(
+            bindparam("grams", expanding=True)),
+        {"grams": sorted(grams)},
+    ).all())
+    return sorted(grams, key=lambda gram: (frequency.get(gram, 0), gram))
+
+
+def _like_patterns(query, max_distance):
+    """
+    ``LIKE`` patterns that every text within ``max_distance`` edits of ``query`` matches
+    one of: the query's characters in order, any ``max_distance`` of them dropped.
+
+    :return: The patterns, or None if there would be more than ``MAX_PATTERNS``.
+    """
+    if max_distance >= len(query):
+        return None  # any text is that close
+    escaped = [ch if ch not in "\\%_" else "\\" + ch for ch in query]
+    if not max_distance:
+        return ["%" + "".join(escaped) + "%"]
+    patterns = {"%" + "%".join(chars) + "%" for chars in combinations(escaped, len(query) - max_distance)}
+    return sorted(patterns) if len(patterns) <= MAX_PATTERNS else None
+
+
+def _scan(table, column, query, max_distance, where, params, limit):
+    """
+    Rank the rows matching one of the query's ``LIKE`` patterns by edit distance.
+    """
+    patterns = _like_patterns(query, max_distance)
+    params = dict(params)
+    like = ""
+    if patterns is not None:
+        params.update((f"pattern_{i}", pattern) for i, pattern in enumerate(patterns))
+        like = " AND (" + " OR ".join(
+            f"lower(s.{column}) LIKE :pattern_{i} ESCAPE '\\'" for i in range(len(patterns))) + ")"
+    rows = session.execute(text(f"SELECT s.id, s.{column} FROM {table} s WHERE 1{like}{where}"), params)
+    scored = []
+    for id_, value in rows:
+        value = value.lower()
+        distance = edit_distance(query, value)
+        if distance <= max_distance:
+            scored.append((distance, len(value), id_))
+    scored.sort()
+    return [(id_, distance) for distance, _, id_ in scored[:limit]]
+
+
+def match(name, query, filters="", params=None, max_distance=None, limit=20):
+    """
+    Fuzzy-match ``query`` against one trigram index.
+
+    :param name: A key of ``INDEXES``.
+    :param filters: Extra SQL conditions on the source table, aliased ``s``.
+    :param params: Bind parameters used by ``filters``.
+    :return: A list of (row id, distance) pairs, closest first, within ``max_distance``.
+    """
+    ensure_indexes()
+    table, column = INDEXES[name]
+    query = " ".join(query.lower().split())
+    if not query:
+        return []
+    if max_distance is None:
+        max_distance = default_max_distance(query)
+    params = dict(params or {})
+    where = f" AND {filters}" if filters else ""
+
+    if len(query) < 3 and not max_distance:
+        rows = session.execute(
+            text(f"SELECT s.id, s.{column} FROM {table} s WHERE s.{column} LIKE :pattern{where} LIMIT :limit"),
+            dict(params, pattern=f"%{query}%", limit=limit),
+        ).all()
+        return [(id_, 0) for id_, _ in rows]
+
+    grams = trigrams(query)
+    if len(grams) < 3 * max_distance + 1:
+        return _scan(table, column, query, max_distance, where, params, limit)
+
+    # Widen the search one edit at a time: the 3d + 1 rarest trigrams find every row
+    # within d edits, so once ``limit`` rows are that close the rest can be skipped.
+    ordered = _by_frequency(name, grams)
+    shared_needed = len(grams) - 3 * max_distance
+    sql = text(
+        f"SELECT s.id, s.{column} FROM {name} JOIN {table} s ON s.id = {name}.rowid "
+        f"WHERE {name} MATCH :match{where}"
+    )
+    seen = set()
+    scored = []
+    for tier in range(max_distance + 1):
+        selective = ordered[:3 * tier + 1]
+        rows = session.execute(sql, dict(
+            params, match=" OR ".join('"' + gram.replace('"', '""') + '"' for gram in selective),
+        ))
+        for id_, value in rows:
+            if id_ in seen:
+                continue
+            seen.add(id_)
+            value = value.lower()
+            if query in value:
+                distance = 0
+            elif sum(gram in value for gram in grams) < shared_needed:
+                continue  # too few trigrams in common to be within max_distance
+            else:
+                distance = edit_distance(query, value)
+                if distance > max_distance:
+                    continue
+            scored.append((distance, len(value), id_))
+        if len(selective) == len(ordered) or sum(1 for found in scored if found[0] <= tier) >= limit:
+            break
+    scored.sort()
+    return [(id_, distance) for distance, _, id_ in scored[:limit]]
@@ -0,0 +1,194 @@
+"""
+Synthetic journal generator for production-scale testing.
+
+Builds N entries with realistic-looking text, to-dos and moods. Faker text is generated
+in parallel worker processes; the rows are then written through the bulk importer
+(batched Core inserts, one transaction per batch), or saved as a JSONL file that
+``cli.py import`` can load later. The distributions are parameterised:
+
+* to-do fan-out: Poisson with mean ``--todos``, ``--done`` of them done;
+* content size: log-normal number of words with median ``--words`` and spread ``--sigma``;
+* mood: weights for moods 1-5 (``--mood-weights``), ``--no-mood`` of entries without one;
+* timestamps: spread evenly over the last ``--days`` days, in ID order.
+
+Generation is deterministic for a given ``--seed``. For millions of entries use the
+``cas`` storage backend, which does not write one file per entry::
+
+    JOURNAL_STORAGE=cas python generate.py --entries 1000000 --processes 8
+    python generate.py --entries 100000 --output dataset.jsonl
+"""
+import argparse
+import json
+import math
+import os
+import random
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+
+CHUNK_SIZE = 2000
+
+_fake = None
+_vocabulary = None
+
+
+def _faker(seed):
+    global _fake, _vocabulary
+    if _fake is None:
+        from faker import Faker
+        _fake = Faker()
+        _fake.seed_instance(seed)
+        _vocabulary = _fake.words(nb=3000)
+    return _fake, _vocabulary
+
+
+def _poisson(rng, mean):
+    """
+    Knuth's method; fine for the small means of a to-do fan-out.
+    """
+    limit, k, p = math.exp(-mean), 0, rng.random()
+    while p > limit:
+        k += 1
+        p *= rng.random()
+    return k
+
+
+def _paragraphs(rng, vocabulary, n_words):
+    words = rng.choices(vocabulary, k=n_words)
+    sentences, i = [], 0
+    while i < n_words:
+        length = rng.randint(6, 18)
+        sentence = words[i:i + length]
+        sentences.append(" ".join(sentence).capitalize() + ".")
+        i += length
+    paragraphs = [" ".join(sentences[j:j + 5]) for j in range(0, len(sentences), 5)]
+    return "\n\n".join(paragraphs)
+
+
+def make_rows(task):
+    """
+    Generate one chunk of entry dicts in the importer's format (runs in a worker process).
+
+    :param task: (first entry index, count, spec dict).
+    """
+    first, count, spec = task
+    fake, vocabulary = _faker(spec["seed"])
+    chunk_seed = spec["seed"] * 1_000_003 + first
+    fake.seed_instance(chunk_seed)  # same chunk, same text, whichever process makes it
+    rng = random.Random(chunk_seed)
+    end = datetime.fromisoformat(spec["end"])
+    step = timedelta(days=spec["days"]) / max(spec["entries"], 1)
+    mu = math.log(max(spec["words"], 1))
+    moods = [1, 2, 3, 4, 5]
+
+    rows = []
+    for i in range(first, first + count):
+        timestamp = end - step * (spec["entries"] - i) + step * rng.random()
+        n_words = max(1, int(rng.lognormvariate(mu, spec["sigma"])))
+        mood = None if rng.random() < spec["no_mood"] else rng.choices(moods, weights=spec["mood_weights"])[0]
+        todos = [
+            {
+                "task": " ".join(rng.choices(vocabulary, k=rng.randint(2, 6))).capitalize(),
+                "status": "done" if rng.random() < spec["done"] else "pending",
+            }
+            for _ in range(_poisson(rng, spec["todos"]))
+        ]
+        rows.append({
+            "title": fake.sentence(nb_words=rng.randint(2, 6)).rstrip("."),
+            "content": _paragraphs(rng, vocabulary, n_words),
+            "mood": mood,
+            "timestamp": timestamp.isoformat(timespec="seconds"),
+            "todos": todos,
+        })
+    return rows
+
+
+def generate(spec, processes=None, chunk_size=CHUNK_SIZE):
+    """
+    Yield generated entry dicts in order, generating chunks in parallel.
+
+    At most two chunks per process are generated ahead of the consumer, so memory stays
+    bounded when writing the rows is slower than generating them.
+    """
+    processes = processes or os.cpu_count() or 1
+    tasks = ((first, min(chunk_size, spec["entries"] - first), spec)
+             for first in range(0, spec["entries"], chunk_size))
+    with ProcessPoolExecutor(max_workers=processes) as pool:
+        pending = deque()
+        for task in tasks:
+            pending.append(pool.submit(make_rows, task))
+            if len(pending) >= 2 * processes:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
+
+
+def build_spec(args):
+    weights = [float(w) for w in args.mood_weights.split(",")]
+    if len(weights) != 5:
+        raise ValueError("--mood-weights needs five comma-separated weights (moods 1 to 5).")
+    return {
+        "entries": args.entries,
+        "todos": args.todos,
+        "done": args.done,
+        "words": args.words,
+        "sigma": args.sigma,
+        "mood_weights": weights,
+        "no_mood": args.no_mood,
+        "days": args.days,
+        "end": (args.end or datetime.utcnow().replace(microsecond=0)).isoformat(),
+        "seed": args.seed,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--entries", type=int, default=10000)
+    parser.add_argument("--todos", type=float, default=2.0, help="Mean to-dos per entry (default: 2)")
+    parser.add_argument("--done", type=float, default=0.5, help="Share of to-dos that are done (default: 0.5)")
+    parser.add_argument("--words", type=int, default=150, help="Median words per entry (default: 150)")
+    parser.add_argument("--sigma", type=float, default=0.8,
+                        help="Spread of the log-normal entry length (default: 0.8)")
+    parser.add_argument("--mood-weights", default="1,2,4,3,2", help="Relative weights of moods 1-5")
+    parser.add_argument("--no-mood", type=float, default=0.1, help="Share of entries without a mood")
+    parser.add_argument("--days", type=int, default=3650, help="Days the timestamps span (default: 3650)")
+    parser.add_argument("--end", type=datetime.fromisoformat, help="Latest timestamp (default: now)")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--processes", type=int, help="Generator processes (default: CPU count)")
+    parser.add_argument("--batch-size", type=int, default=5000, help="Entries per transaction (default: 5000)")
+    parser.add_argument("--output", help="Write a JSONL file instead of the journal database")
+    parser.add_argument("--append", action="store_true", help="Allow adding to a journal that has entries")
+    args = parser.parse_args(argv)
+
+    spec = build_spec(args)
+    rows = generate(spec, processes=args.processes)
+    start = time.perf_counter()
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            for row in rows:
+                f.write(json.dumps(row, ensure_ascii=False) + "\n")
+        print(f"Wrote {args.entries} entries to {args.output} in {time.perf_counter() - start:.2f}s.")
+        return 0
+
+    from init import session
+    from migrate import upgrade
+    from models.entry import Entry
+    from importer import import_entries
+
+    upgrade()
+    if not args.append and session.query(Entry.id).first() is not None:
+        print("The journal already has entries; pass --append to add generated ones anyway.")
+        return 1
+    stats = import_entries(rows, batch_size=args.batch_size)
+    print(
+        f"Generated {stats['entries']} entries and {stats['todos']} to-dos "
+        f"in {stats['seconds']:.2f}s ({stats['rows_per_sec']:.0f} rows/sec)."
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,6 +1,18 @@
 import datetime
-from models.entry import Entry
+import functools
+from models.entry import Entry, UNCHANGED
 from models.todo import Todo
+from importer import import_file
+from exporter import export_file
+import cache
+import analytics
+from instrumentation import instrumented
+from commands import CommandError, parse_period
+
+
+PAGE_SIZE = 20
+# Lines per screen of the entry viewer
+SCREEN_LINES = 24
 
 
 def exit_program():
@@ -9,24 +21,80 @@ def exit_program():
 
 # ======== ENTRY HELPERS ========
 
+def page_through(fetch_page, heading, describe=str):
+    """
+    Show results one page at a time, letting the user move to the next or previous page.
+
+    :param fetch_page: Callable taking ``limit``, ``after`` and ``before`` cursors.
+    :param describe: Callable turning one result into the line printed for it.
+    """
+    page = fetch_page(limit=PAGE_SIZE)
+    if not page:
+        print(f"{heading} (none)")
+        return
+
+    number = 1
+    while True:
+        print(f"{heading} (page {number})")
+        for item in page:
+            print(describe(item))
+
+        choice = input("[n]ext page, [p]revious page, [q]uit: ").strip().lower()
+        if choice == "n":
+            next_page = fetch_page(limit=PAGE_SIZE, after=page[-1].cursor)
+            if next_page:
+                page, number = next_page, number + 1
+            else:
+                print("Already on the last page.")
+        elif choice == "p":
+            prev_page = fetch_page(limit=PAGE_SIZE, before=page[0].cursor)
+            if prev_page:
+                page, number = prev_page, number - 1
+            else:
+                print("Already on the first page.")
+        elif choice in ("q", ""):
+            return
+
+
+@instrumented
 def list_entries():
-    entries = Entry.get_all_entries()
-    print("All Entries:")
-    for entry in entries:
-        print(entry)
+    page_through(Entry.page_entries, "All Entries:")
+
+
+def _with_fuzzy(matches, find_fuzzy, limit=20):
+    """
+    Every substring match, followed by up to ``limit`` fuzzy hits not among them.
 
+    :param find_fuzzy: Called with a limit, returns (item, distance) pairs.
+    :return: (item, distance) pairs.
+    """
+    ids = {item.id for item in matches}
+    hits = [(item, distance) for item, distance in find_fuzzy(len(matches) + limit) if item.id not in ids]
+    return [(item, 0) for item in matches] + hits[:limit]
 
+
+def _with_distance(item, distance):
+    """
+    Show a fuzzy match, noting how many typos away it is.
+    """
+    if not distance:
+        return str(item)
+    return f"{item}  (~{distance} typo{'s' if distance > 1 else ''})"
+
+
+@instrumented
 def find_entry_by_title():
     title = input("Enter the entry title: ")
-    entries = Entry.find_by_title(title)
+    entries = _with_fuzzy(Entry.find_by_title(title), lambda limit: Entry.find_by_title_fuzzy(title, limit=limit))
     if entries:
         print("Entries found:")
-        for entry in entries:
-            print(entry)
+        for entry, distance in entries:
+            print(_with_distance(entry, distance))
     else:
         print(f'Entry with title "{title}" not found.')
 
 
+@instrumented
 def find_entry_by_id():
     id_ = input("Enter the entry ID: ")
     entry = Entry.find_by_id(id_)
@@ -36,6 +104,7 @@ def find_entry_by_id():
     else:
         print(f'Entry with ID "{id_}" not found.')
 
+@instrumented
 def find_entries_by_mood():
     mood_value = input("Enter your mood (1-5): 1-😞 Very Sad, 2-😕 Sad, 3-😐 Neutral, 4-🙂 Happy, 5-😄 Very Happy: ") or None
 
@@ -51,6 +120,45 @@ def find_entries_by_mood():
 
 
 
+@instrumented
+def find_entries_between():
+    start = input("From (YYYY-MM-DD, YYYY-MM or YYYY): ").strip()
+    end = input("To (blank for the same period): ").strip() or start
+    try:
+        entries = Entry.find_between(parse_period(start), parse_period(end, last=True))
+    except CommandError as e:
+        print(e)
+        return
+    if entries:
+        for entry in entries:
+            print(entry)
+    else:
+        print("No entries in that period.")
+
+
+@instrumented
+def show_on_this_day():
+    entries = Entry.on_this_day()
+    if entries:
+        print(f"On this day ({datetime.datetime.utcnow():%B %d}) in earlier years:")
+        for entry in entries:
+            print(entry)
+    else:
+        print("No entries from this day in earlier years.")
+
+
+@instrumented
+def browse_timeline():
+    around = input("Start around which date? (YYYY-MM-DD, blank for the oldest entries): ").strip()
+    try:
+        around = parse_period(around) if around else None
+    except CommandError as e:
+        print(e)
+        return
+    page_through(functools.partial(Entry.page_timeline, around=around), "Timeline:")
+
+
+@instrumented
 def create_entry():
     title = input("Enter the entry title: ")
     mood = input("Enter your mood (1-5): 1-😞 Very Sad, 2-😕 Sad, 3-😐 Neutral, 4-🙂 Happy, 5-😄 Very Happy: ") or None
@@ -64,6 +172,7 @@ def create_entry():
         print("Invalid mood. Please enter a number between 1 and 5.")
 
 
+@instrumented
 def update_entry():
     id_ = input("Enter the entry ID to update: ")
     entry = Entry.find_by_id(id_)
@@ -71,20 +180,22 @@ def update_entry():
         print(f'Entry with ID "{id_}" not found.')
         return
 
-    title = input(f"New title (press Enter to keep '{entry.title}'): ") or entry.title
-    mood = input(f"New mood (1-5): 1-😞 Very Sad, 2-😕 Sad, 3-😐 Neutral, 4-🙂 Happy, 5-😄 Very Happy, press Enter to keep '{entry.mood}'): ") or entry.mood
+    title = input(f"New title (press Enter to keep '{entry.title}'): ")
+    mood = input(f"New mood (1-5): 1-😞 Very Sad, 2-😕 Sad, 3-😐 Neutral, 4-🙂 Happy, 5-😄 Very Happy, press Enter to keep '{entry.mood}'): ")
     content = input("New content (press Enter to keep current content): ")
 
     try:
-        mood_val = int(mood) if mood else entry.mood
+        # Only the fields given count as changed, so a sync does not overwrite the others
+        mood_val = int(mood) if mood else UNCHANGED
         new_content = content if content else None
-        Entry.update_entry(id_, title=title, mood=mood_val, content=new_content)
-        print(f'Entry "{title}" updated successfully.')
+        Entry.update_entry(id_, title=title or None, mood=mood_val, content=new_content)
+        print(f'Entry "{title or entry.title}" updated successfully.')
     except ValueError:
         print("Invalid mood. Please enter a number between 1 and 5.")
 
 
 
+@instrumented
 def delete_entry():
     id_ = input("Enter the entry ID to delete: ")
     entry = Entry.find_by_id(id_)
@@ -96,25 +207,135 @@ def delete_entry():
 
 
 
+@instrumented
 def view_entry_details():
     id_ = input("Enter the entry ID: ")
-    entry = Entry.find_by_id(id_)
-    if entry:
-        print("\n=== Entry Details ===")
-        Entry.read_entry_content(entry.id)
-    else:
+    entry = Entry.info(id_)
+    if not entry:
         print("Entry not found.")
+        return
+    content = Entry.open_content(entry)
+    if content is None:
+        print("Error: Content file not found.")
+        return
+    print("\n=== Entry Details ===")
+    with content:
+        page_content(content)
+
+
+def page_content(content):
+    """
+    Show an entry's text one screen at a time. Only the screens shown are read.
+
+    :param content: An ``entry_reader.EntryContent``.
+    """
+    starts = [0]  # byte offsets of the screens shown so far, for going back
+    while True:
+        text, next_start = content.page(starts[-1], SCREEN_LINES)
+        print(text)
+        if next_start is None and len(starts) == 1:
+            return  # it all fit on one screen
+
+        choice = input("[n]ext screen, [p]revious screen, [t]o-dos, [q]uit: ").strip().lower()
+        if choice == "n":
+            if next_start is not None:
+                starts.append(next_start)
+            else:
+                print("Already at the end.")
+        elif choice == "p":
+            if len(starts) > 1:
+                starts.pop()
+            else:
+                print("Already at the start.")
+        elif choice == "t":
+            todos = content.body_span()[1]
+            if todos < len(content):
+                starts.append(todos)
+            else:
+                print("This entry has no to-do blocks.")
+        elif choice in ("q", ""):
+            return
+
+
+@instrumented
+def search_entries():
+    query = input('Search entries (use "exact phrase" or prefix*): ')
+    results = Entry.search(query)
+    if results:
+        print("Best matches:")
+        for entry, rank, snippet in results:
+            print(entry)
+            print(f"    {snippet}")
+    else:
+        print(f'No entries match "{query}".')
+
+
+@instrumented
+def show_analytics():
+    period = input("Trend period (day/week/month/year) [default: week]: ") or "week"
+    try:
+        print(analytics.format_report(analytics.report(period=period)))
+    except ValueError as e:
+        print(e)
+
+
+@instrumented
+def show_cache_stats():
+    for name, stats in cache.stats().items():
+        print(f"{name.capitalize()} cache: " + ", ".join(f"{key}: {value}" for key, value in stats.items()))
+
+
+@instrumented
+def rebuild_search_index():
+    count = Entry.rebuild_search_index()
+    print(f"Search index rebuilt for {count} entries.")
+
+
+@instrumented
+def import_entries():
+    path = input("Enter the path to a JSONL or CSV file: ")
+    batch_size = input("Batch size [default: 1000]: ") or "1000"
+
+    try:
+        import_file(path, batch_size=int(batch_size))
+    except FileNotFoundError:
+        print(f'File "{path}" not found.')
+    except ValueError as e:
+        print(f"Import failed: {e}")
+
+
+@instrumented
+def export_entries():
+    path = input("Enter the path of the export file (.jsonl, .csv or .parquet): ")
+    try:
+        export_file(path)
+    except (OSError, ValueError) as e:
+        print(f"Export failed: {e}")
 
 
 # ======== TODO HELPERS ======== 
 
+def describe_todo(todo):
+    return f"{todo} — {todo.entry.title}" if todo.entry else str(todo)
+
+
+@instrumented
 def list_todos():
-    todos = Todo.get_all_todos()
-    print("All To-Do Items:")
-    for todo in todos:
-        print(todo)
+    page_through(Todo.page_todos, "All To-Do Items:", describe=describe_todo)
 
 
+@instrumented
+def todo_report():
+    entries = Entry.get_entries_with_todos()
+    print("To-Do Report:")
+    for entry in entries:
+        done = sum(1 for todo in entry.todos if todo.status == "done")
+        print(f"\n{entry} — {done}/{len(entry.todos)} done")
+        for todo in entry.todos:
+            print(f"    {todo}")
+
+
+@instrumented
 def get_entry_todos():
     id_ = input("Enter the entry ID: ")
     entry = Entry.find_by_id(id_)
@@ -131,11 +352,12 @@ def get_entry_todos():
 
 
 
+@instrumented
 def create_todo():
     task = input("Enter the to-do task: ")
     entry_id = input("Enter the associated entry ID: ")
 
-    if not Entry.find_by_id(entry_id):
+    if not Entry.exists(entry_id):
         print(f"No entry found with ID {entry_id}.")
         return
 
@@ -143,6 +365,7 @@ def create_todo():
     Todo.add_todo(task=task, entry_id=entry_id, status=status)
     print(f'Task "{task}" added to entry {entry_id} successfully.')
 
+@instrumented
 def update_todo():
     id_ = input("Enter the to-do ID to update: ")
     todo = Todo.find_by_id(id_)
@@ -154,13 +377,14 @@ def update_todo():
     status = input(f"New status (press Enter to keep '{todo.status}'): ") or todo.status
     entry_id = todo.entry_id
 
-    if not Entry.find_by_id(entry_id):
+    if not Entry.exists(entry_id):
         print(f"No entry found with ID {entry_id}.")
         return
 
     Todo.update_todo(todo_id=id_, task=task, status=status, entry_id=entry_id)
     print(f"Todo updated successfully.")
 
+@instrumented
 def delete_todo():
     id_ = input("Enter the to-do ID to delete: ")
     todo = Todo.find_by_id(id_)
@@ -171,17 +395,62 @@ def delete_todo():
         print(f"Todo with ID {id_} not found.")
 
 
+def _bulk_selection():
+    """
+    Ask which to-dos a bulk operation applies to; empty answers are ignored.
+    """
+    ids = input("To-do IDs, separated by commas (press Enter to skip): ")
+    entry_id = input("Only to-dos of entry ID (press Enter to skip): ")
+    task = input("Only tasks containing (press Enter to skip): ")
+    return {
+        "ids": [int(id_) for id_ in ids.replace(",", " ").split()] or None,
+        "entry_id": int(entry_id) if entry_id.strip() else None,
+        "task": task.strip() or None,
+    }
+
+
+@instrumented
+def complete_todos():
+    try:
+        count = Todo.bulk_update_status("done", **_bulk_selection())
+    except ValueError as e:
+        print(e)
+        return
+    print(f"{count} to-do(s) marked as done.")
+
+
+@instrumented
+def delete_todos():
+    try:
+        selection = _bulk_selection()
+        status = input("Only to-dos with status (pending/done, press Enter to skip): ").strip() or None
+        count = Todo.bulk_delete(status=status, **selection)
+    except ValueError as e:
+        print(e)
+        return
+    print(f"{count} to-do(s) deleted.")
+
+
+@instrumented
 def find_todo_by_task():
     task = input("Enter a task name to search: ")
-    todos = Todo.find_by_task(task)
+    status = input("Only to-dos with status (pending/done, press Enter to skip): ").strip() or None
+    entry_id = input("Only to-dos of entry ID (press Enter to skip): ").strip()
+    if entry_id and not entry_id.isdigit():
+        print("Invalid entry ID.")
+        return
+    entry_id = int(entry_id) if entry_id else None
+    todos = _with_fuzzy(Todo.find_by_task(task, status=status, entry_id=entry_id),
+                        lambda limit: Todo.find_by_task_fuzzy(task, status=status, entry_id=entry_id, limit=limit))
     if todos:
         print("To-Dos found:")
-        for todo in todos:
-            print(todo)
+        for todo, distance in todos:
+            print(_with_distance(todo, distance))
     else:
         print("No matching to-dos found.")
 
 
+@instrumented
 def find_todo_by_id():
     id_ = input("Enter the to-do ID: ")
     todo = Todo.find_by_id(id_)
@@ -0,0 +1,249 @@
+import csv
+import json
+import os
+import time
+from datetime import datetime
+from sqlalchemy import insert
+from init import session
+from models.entry import Entry
+from models.todo import Todo
+from storage import get_storage
+import search
+import summary
+import changelog
+
+
+DEFAULT_BATCH_SIZE = 1000
+
+
+def read_jsonl(path):
+    """
+    Yield one entry dict per non-empty line of a JSONL file.
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                yield json.loads(line)
+
+
+def read_csv(path):
+    """
+    Yield one entry dict per CSV row.
+
+    The ``todos`` column, if present, holds a JSON list of to-dos; it is decoded with the
+    rest of the row, so that a malformed list only skips its own row.
+    """
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        yield from csv.DictReader(f)
+
+
+def read_rows(path, fmt=None):
+    """
+    Read entry rows from a JSONL or CSV file, guessing the format from the extension.
+    """
+    fmt = fmt or ("csv" if path.lower().endswith(".csv") else "jsonl")
+    if fmt == "csv":
+        return read_csv(path)
+    if fmt == "jsonl":
+        return read_jsonl(path)
+    raise ValueError(f"Unsupported import format: {fmt}")
+
+
+def _parse_row(row):
+    """
+    Normalise an input row into (title, content, mood, timestamp, todos).
+
+    :raises ValueError: If a field is missing, out of range or of the wrong type (JSON
+        rows can hold any type), so that the row is skipped rather than the batch failing.
+    """
+    title = row.get("title")
+    if title is not None and not isinstance(title, str):
+        raise ValueError("Entry title must be text.")
+    title = (title or "").strip()
+    if not title:
+        raise ValueError("Entry title is required.")
+
+    content = row.get("content")
+    if content is not None and not isinstance(content, str):
+        raise ValueError("Entry content must be text.")
+
+    mood = row.get("mood")
+    if isinstance(mood, (bool, float)):
+        raise ValueError("Mood must be an integer between 1 and 5.")
+    mood = int(mood) if mood not in (None, "") else None
+    if mood is not None and (mood < 1 or mood > 5):
+        raise ValueError("Mood must be an integer between 1 and 5.")
+
+    timestamp = row.get("timestamp")
+    timestamp = datetime.fromisoformat(timestamp) if timestamp else datetime.utcnow()
+
+    todos = row.get("todos") or []
+    if isinstance(todos, str):
+        try:
+            todos = json.loads(todos)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"Invalid to-do list ({e}).")
+    if not isinstance(todos, list):
+        raise ValueError("The to-do list must be a list.")
+
+    parsed = []
+    for todo in todos:
+        if isinstance(todo, str):
+            todo = {"task": todo}
+        if not isinstance(todo, dict):
+            raise ValueError("A to-do must be a task or an object with a task.")
+        task, status = todo.get("task"), todo.get("status") or "pending"
+        if not isinstance(task, str) or not task:
+            raise ValueError("A to-do task must be text.")
+        if not isinstance(status, str):
+            raise ValueError("A to-do status must be text.")
+        parsed.append((task, status))
+
+    return title, content or "", mood, timestamp, parsed
+
+
+def _flush_batch(batch):
+    """
+    Write the content for a batch and insert its rows in one transaction.
+
+    Rows are inserted with bulk Core ``INSERT``s (entry IDs come back through
+    ``RETURNING``) rather than as ORM objects, which would cost more than the inserts.
+
+    :param batch: (title, content, mood, timestamp, todos) tuples.
+    """
+    store = get_storage()
+    written = []
+    try:
+        entry_rows = []
+        for title, content, mood, timestamp, todos in batch:
+            key = store.create(title, content, mood, timestamp, todos=todos)
+            written.append(key)
+            entry_rows.append({"title": title, "mood": mood, "timestamp": timestamp, "content_path": key,
+                               "uid": changelog.new_uid()})
+
+        ids = session.scalars(
+            insert(Entry).returning(Entry.id, sort_by_parameter_order=True), entry_rows
+        ).all()
+        todo_rows, todo_changes = [], []
+        for entry_id, entry_row, (_, _, _, _, todos) in zip(ids, entry_rows, batch):
+            for task, status in todos:
+                uid = changelog.new_uid()
+                todo_rows.append({"task": task, "status": status, "entry_id": entry_id, "uid": uid})
+                todo_changes.append(("todo", uid, changelog.todo_data(task, status, entry_row["uid"])))
+        if todo_rows:
+            session.execute(insert(Todo), todo_rows)
+        search.index_many([
+            {"id": entry_id, "title": title, "content": content, "todos": " ".join(task for task, _ in todos)}
+            for entry_id, (title, content, _, _, todos) in zip(ids, batch)
+        ])
+        changelog.record_many(
+            ("entry", row["uid"], changelog.entry_data(title, mood, timestamp, content))
+            for row, (title, content, mood, timestamp, _) in zip(entry_rows, batch)
+        )
+        changelog.record_many(todo_changes)
+        summary.record_many(
+            (timestamp, mood, len(todos), sum(status == "done" for _, status in todos))
+            for _, _, mood, timestamp, todos in batch
+        )
+        session.commit()
+    except Exception:
+        session.rollback()
+        if not store.transactional:
+            for key in written:
+                store.delete(key)
+        raise
+
+
+def split_by_year(rows, directory):
+    """
+    Sort import rows into one JSONL file per year of their timestamp, for a journal
+    sharded by year. Invalid rows are reported and skipped here.
+
+    Only parses rows; nothing is read from or written to the database.
+
+    :param directory: Where to write ``<year>.jsonl``.
+    :return: (dict of year -> file path, number of rows skipped).
+    """
+    files = {}
+    skipped = 0
+    try:
+        for line_no, row in enumerate(rows, start=1):
+            try:
+                title, content, mood, timestamp, todos = _parse_row(row)
+            except (KeyError, TypeError, ValueError) as e:
+                print(f"Skipping row {line_no}: {e}")
+                skipped += 1
+                continue
+            if timestamp.year not in files:
+                path = os.path.join(directory, f"{timestamp.year}.jsonl")
+                files[timestamp.year] = open(path, "w", encoding="utf-8")
+            files[timestamp.year].write(json.dumps({
+                "title": title, "content": content, "mood": mood, "timestamp": timestamp.isoformat(),
+                "todos": [{"task": task, "status": status} for task, status in todos],
+            }, ensure_ascii=False) + "\n")
+    finally:
+        for f in files.values():
+            f.close()
+    return {year: f.name for year, f in files.items()}, skipped
+
+
+def import_entries(rows, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Bulk insert entries and their to-dos, committing once per batch.
+
+    Each entry's content is written once with all of its to-dos already included.
+
+    :param rows: An iterable of entry dicts (title, content, mood, timestamp, todos).
+    :param batch_size: Number of entries per transaction.
+    :return: A dict with entry, to-do and skipped counts, elapsed seconds and rows/sec.
+    """
+    stats = {"entries": 0, "todos": 0, "skipped": 0}
+    batch = []
+    start = time.perf_counter()
+
+    for line_no, row in enumerate(rows, start=1):
+        try:
+            title, content, mood, timestamp, todos = _parse_row(row)
+        except (KeyError, TypeError, ValueError) as e:
+            print(f"Skipping row {line_no}: {e}")
+            stats["skipped"] += 1
+            continue
+
+        batch.append((title, content, mood, timestamp, todos))
+
+        stats["entries"] += 1
+        stats["todos"] += len(todos)
+
+        if len(batch) >= batch_size:
+            _flush_batch(batch)
+            batch = []
+
+    if batch:
+        _flush_batch(batch)
+
+    stats["seconds"] = time.perf_counter() - start
+    rows_total = stats["entries"] + stats["todos"]
+    stats["rows_per_sec"] = rows_total / stats["seconds"] if stats["seconds"] else 0.0
+    return stats
+
+
+def import_path(path, fmt=None, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Import entries from a JSONL or CSV file (e.g. in one shard of a sharded journal).
+    """
+    return import_entries(read_rows(path, fmt), batch_size=batch_size)
+
+
+def import_file(path, fmt=None, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Import entries from a JSONL or CSV file and print a throughput summary.
+    """
+    stats = import_entries(read_rows(path, fmt), batch_size=batch_size)
+    print(
+        f"Imported {stats['entries']} entries and {stats['todos']} to-dos "
+        f"in {stats['seconds']:.2f}s ({stats['rows_per_sec']:.0f} rows/sec)."
+    )
+    if stats["skipped"]:
+        print(f"Skipped {stats['skipped']} invalid rows.")
+    return stats
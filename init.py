@@ -1,16 +1,127 @@
-from sqlalchemy.orm import declarative_base, sessionmaker, registry
-from sqlalchemy import create_engine
+from sqlalchemy.orm import declarative_base, sessionmaker, scoped_session
+from sqlalchemy import create_engine, event
+from sqlalchemy.util import ScopedRegistry, ThreadLocalRegistry
+from contextlib import contextmanager
+import contextvars
+import os
 
 # Database URL
-db_url = "sqlite:///cli-journal.db"
+db_url = os.environ.get("JOURNAL_DB_URL", "sqlite:///cli-journal.db")
+
+# Seconds a connection waits for a lock held by another writer before giving up
+busy_timeout = float(os.environ.get("JOURNAL_DB_BUSY_TIMEOUT", 30))
+
+# Connections kept open in the pool, and how many more may be opened under load
+pool_size = int(os.environ.get("JOURNAL_DB_POOL_SIZE", 5))
+max_overflow = int(os.environ.get("JOURNAL_DB_MAX_OVERFLOW", 10))
+
+# Where new entry content is stored: "file" (one .txt per entry), "log" (segment log)
+# or "cas" (compressed, content-addressed pack files)
+storage_backend = os.environ.get("JOURNAL_STORAGE", "file")
+
+# Memory budget of the in-process entry content cache, in bytes
+cache_bytes = int(os.environ.get("JOURNAL_CACHE_BYTES", 8 * 1024 * 1024))
+
+
+def is_sqlite_file(url):
+    return url.startswith("sqlite") and ":memory:" not in url and not url.rstrip("/").endswith(":")
+
+
+def engine_options(url):
+    """
+    Keyword arguments for ``create_engine`` (or ``create_async_engine``) for ``url``.
+    """
+    if url.startswith("sqlite") and not is_sqlite_file(url):
+        return {}  # in-memory databases use SQLAlchemy's single-connection pool
+    options = {"pool_size": pool_size, "max_overflow": max_overflow, "pool_pre_ping": not url.startswith("sqlite")}
+    if url.startswith("sqlite"):
+        options["connect_args"] = {"timeout": busy_timeout}
+    return options
+
+
+def set_sqlite_pragmas(dbapi_connection, connection_record):
+    """
+    Tune every new SQLite connection: WAL lets readers run alongside the single writer,
+    and with WAL a synchronous=NORMAL commit is still atomic and durable across crashes
+    of the process (only an OS crash can lose the latest commits).
+    """
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute(f"PRAGMA busy_timeout={int(busy_timeout * 1000)}")
+    cursor.execute("PRAGMA cache_size=-16000")  # 16 MiB page cache per connection
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.close()
+
 
 # Create the SQLAlchemy engine
-engine = create_engine(db_url)
+engine = create_engine(db_url, **engine_options(db_url))
+if is_sqlite_file(db_url):
+    event.listen(engine, "connect", set_sqlite_pragmas)
 
 Base = declarative_base()
 
 Base.metadata.bind = engine
-    
+
 # Create session
 DBSession = sessionmaker(bind=engine)
-session = DBSession()
+
+# Set by callers that bind their own session to the current context (``unit_of_work``,
+# async_repository.py); each such scope removes its session when it ends.
+session_scope = contextvars.ContextVar("session_scope", default=None)
+
+
+class SessionRegistry:
+    """
+    Registry behind ``session``: the session of the current context scope if one is set,
+    otherwise one per thread.
+
+    Per-thread sessions live in a ``threading.local``, so they are dropped (and their
+    uncommitted work rolled back) when their thread exits, and a new thread never picks
+    up a dead thread's session, as it could if they were keyed by the reusable thread ident.
+    """
+
+    def __init__(self, createfunc):
+        self.threads = ThreadLocalRegistry(createfunc)
+        self.contexts = ScopedRegistry(createfunc, session_scope.get)
+
+    def _current(self):
+        return self.contexts if session_scope.get() is not None else self.threads
+
+    def __call__(self):
+        return self._current()()
+
+    def has(self):
+        return self._current().has()
+
+    def set(self, obj):
+        self._current().set(obj)
+
+    def clear(self):
+        self._current().clear()
+
+
+# The session used by the models, search and storage modules
+session = scoped_session(DBSession)
+session.registry = SessionRegistry(DBSession)
+
+
+@contextmanager
+def unit_of_work():
+    """
+    Give the enclosed block its own session, committed if the block succeeds, rolled back
+    if it raises, and closed afterwards. Use it around each request or task in threaded code::
+
+        with unit_of_work():
+            entry = Entry.add_entry("Morning", "Went for a run")
+    """
+    token = session_scope.set(object())
+    try:
+        yield session
+        session.commit()
+    except BaseException:
+        session.rollback()
+        raise
+    finally:
+        session.remove()
+        session_scope.reset(token)
@@ -0,0 +1,259 @@
+"""
+Hooks for observing the SQL issued by the journal.
+
+``count_queries`` counts the statements executed inside a block, which makes it easy to
+spot N+1 query patterns::
+
+    with count_queries() as counter:
+        helpers.list_todos()
+    print(counter.count)
+
+``max_queries`` does the same but raises if the block exceeds a budget, so tests can pin
+the number of queries a helper is allowed to issue.
+
+``metrics`` is an opt-in, per-action profile of the journal. Once enabled, every helper
+action (``create_entry``, ``update_todo``, ...) and CLI command records its calls, wall
+time, SQL statement count and time, entry storage bytes read and written, and cache
+hits and misses. The totals can be written as JSON or in the Prometheus text format::
+
+    metrics.enable()
+    helpers.list_entries()
+    metrics.dump("metrics.prom")
+"""
+import functools
+import json
+import threading
+import time
+from contextlib import contextmanager
+from sqlalchemy import event
+from init import engine
+
+
+class QueryCounter:
+    """
+    Collects the SQL statements executed on an engine while it is attached.
+    """
+
+    def __init__(self):
+        self.statements = []
+
+    @property
+    def count(self):
+        return len(self.statements)
+
+    def __call__(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+
+
+@contextmanager
+def count_queries(bind=engine):
+    """
+    Count the SQL statements executed on ``bind`` inside the ``with`` block.
+    """
+    counter = QueryCounter()
+    event.listen(bind, "before_cursor_execute", counter)
+    try:
+        yield counter
+    finally:
+        event.remove(bind, "before_cursor_execute", counter)
+
+
+@contextmanager
+def max_queries(limit, bind=engine):
+    """
+    Fail with AssertionError if the ``with`` block executes more than ``limit`` statements.
+    """
+    with count_queries(bind) as counter:
+        yield counter
+    if counter.count > limit:
+        listing = "\n".join(counter.statements)
+        raise AssertionError(f"Expected at most {limit} queries, got {counter.count}:\n{listing}")
+
+
+class IOCounters:
+    """
+    Bytes read from and written to entry storage by this process.
+
+    The storage backends report every read and write here; counting only happens while
+    ``enabled`` is set, so the hooks cost a single attribute check otherwise.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.bytes_read = self.bytes_written = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _size(data):
+        return len(data.encode("utf-8")) if isinstance(data, str) else len(data)
+
+    def read(self, data):
+        if self.enabled and data:
+            with self._lock:
+                self.bytes_read += self._size(data)
+
+    def wrote(self, data):
+        if self.enabled and data:
+            with self._lock:
+                self.bytes_written += self._size(data)
+
+
+io_counters = IOCounters()
+
+
+class Metrics:
+    """
+    Per-action totals of wall time, SQL, storage I/O and cache use.
+
+    Actions are measured from process-wide counters taken before and after the call, so
+    work done on worker threads (offloaded file I/O, export readers) is included. A
+    nested action is counted as part of the outermost one only.
+    """
+    FIELDS = ("calls", "errors", "seconds", "sql_statements", "sql_seconds",
+              "bytes_read", "bytes_written", "cache_hits", "cache_misses")
+
+    HELP = {
+        "calls": "Times the action ran.",
+        "errors": "Times the action raised an exception.",
+        "seconds": "Wall time spent in the action.",
+        "sql_statements": "SQL statements executed by the action.",
+        "sql_seconds": "Time spent executing SQL statements.",
+        "bytes_read": "Entry storage bytes read.",
+        "bytes_written": "Entry storage bytes written.",
+        "cache_hits": "Entry and content cache hits.",
+        "cache_misses": "Entry and content cache misses.",
+    }
+
+    def __init__(self, bind=engine):
+        self.bind = bind
+        self.enabled = False
+        self.actions = {}
+        self.sql_statements = 0
+        self.sql_seconds = 0.0
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def _before_execute(self, conn, cursor, statement, parameters, context, executemany):
+        # Kept on the statement's own execution context, so a statement that raises
+        # leaves nothing behind to be mistaken for a later statement's start
+        context._metrics_started = time.perf_counter()
+
+    def _record(self, context):
+        started = getattr(context, "_metrics_started", None)
+        if started is None:
+            return
+        del context._metrics_started
+        with self._lock:
+            self.sql_statements += 1
+            self.sql_seconds += time.perf_counter() - started
+
+    def _after_execute(self, conn, cursor, statement, parameters, context, executemany):
+        self._record(context)
+
+    def _handle_error(self, exception_context):
+        # A failed statement still reached the database, so its time is counted too
+        self._record(exception_context.execution_context)
+
+    def enable(self):
+        if not self.enabled:
+            event.listen(self.bind, "before_cursor_execute", self._before_execute)
+            event.listen(self.bind, "after_cursor_execute", self._after_execute)
+            event.listen(self.bind, "handle_error", self._handle_error)
+            self.enabled = io_counters.enabled = True
+
+    def disable(self):
+        if self.enabled:
+            event.remove(self.bind, "before_cursor_execute", self._before_execute)
+            event.remove(self.bind, "after_cursor_execute", self._after_execute)
+            event.remove(self.bind, "handle_error", self._handle_error)
+            self.enabled = io_counters.enabled = False
+
+    def reset(self):
+        with self._lock:
+            self.actions = {}
+
+    def _counters(self):
+        import cache
+        caches = (cache.entry_cache, cache.content_cache)
+        return (
+            time.perf_counter(),
+            self.sql_statements,
+            self.sql_seconds,
+            io_counters.bytes_read,
+            io_counters.bytes_written,
+            sum(c.hits for c in caches),
+            sum(c.misses for c in caches),
+        )
+
+    @contextmanager
+    def action(self, name):
+        """
+        Measure the ``with`` block as one call of action ``name`` (a no-op when disabled).
+        """
+        if not self.enabled or getattr(self._local, "active", False):
+            yield
+            return
+        self._local.active = True
+        before = self._counters()
+        failed = False
+        try:
+            yield
+        except BaseException as e:
+            # Leaving the menu is how a session ends, not an error
+            failed = not isinstance(e, SystemExit)
+            raise
+        finally:
+            self._local.active = False
+            deltas = [after - start for after, start in zip(self._counters(), before)]
+            with self._lock:
+                totals = self.actions.setdefault(name, dict.fromkeys(self.FIELDS, 0))
+                totals["calls"] += 1
+                totals["errors"] += failed
+                for field, delta in zip(self.FIELDS[2:], deltas):
+                    totals[field] += delta
+
+    def to_dict(self):
+        with self._lock:
+            return {name: dict(totals) for name, totals in sorted(self.actions.items())}
+
+    def to_json(self):
+        return json.dumps(self.to_dict(), indent=2)
+
+    def to_prometheus(self, prefix="journal_action"):
+        """
+        Render the totals in the Prometheus text exposition format, one counter per field.
+        """
+        actions = self.to_dict()
+        lines = []
+        for field in self.FIELDS:
+            metric = f"{prefix}_{field}_total"
+            lines.append(f"# HELP {metric} {self.HELP[field]}")
+            lines.append(f"# TYPE {metric} counter")
+            for name, totals in actions.items():
+                value = totals[field]
+                value = f"{value:.6f}" if isinstance(value, float) else value
+                label = name.replace("\\", "\\\\").replace('"', '\\"')
+                lines.append(f'{metric}{{action="{label}"}} {value}')
+        return "\n".join(lines) + "\n"
+
+    def dump(self, path):
+        """
+        Write the totals to ``path``: JSON for a ``.json`` file, Prometheus text otherwise.
+        """
+        text = self.to_json() + "\n" if path.endswith(".json") else self.to_prometheus()
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text)
+
+
+metrics = Metrics()
+
+
+def instrumented(fn):
+    """
+    Record each call of ``fn`` as an action named after it in ``metrics``.
+    """
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        with metrics.action(fn.__name__):
+            return fn(*args, **kwargs)
+    return wrapper
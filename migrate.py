@@ -0,0 +1,88 @@
+from sqlalchemy import inspect
+from init import Base, engine
+
+# Imported so that their tables are registered on Base.metadata.
+from models.entry import Entry
+from models.todo import Todo
+from models.change import Change
+import summary
+import fuzzy
+import changelog
+
+# Fill columns added to an existing table; keyed by table name.
+BACKFILL = {
+    "entries": [
+        "UPDATE entries SET day = substr(timestamp, 1, 10), month_day = substr(timestamp, 6, 5) WHERE day IS NULL",
+        "UPDATE entries SET uid = lower(hex(randomblob(16))) WHERE uid IS NULL",
+    ],
+    "todos": [
+        "UPDATE todos SET uid = lower(hex(randomblob(16))) WHERE uid IS NULL",
+    ],
+}
+
+
+def add_missing_columns(conn):
+    """
+    Add columns that the models define but an older table lacks, and backfill them.
+
+    :return: The added columns as ``table.column`` names.
+    """
+    added = []
+    inspector = inspect(conn)
+    for table in Base.metadata.sorted_tables:
+        existing = {column["name"] for column in inspector.get_columns(table.name)}
+        missing = [column for column in table.columns if column.name not in existing]
+        for column in missing:
+            conn.exec_driver_sql(
+                f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column.type.compile(conn.dialect)}")
+            added.append(f"{table.name}.{column.name}")
+        if missing:
+            for statement in BACKFILL.get(table.name, []):
+                conn.exec_driver_sql(statement)
+    return added
+
+
+def upgrade(bind=engine):
+    """
+    Bring an existing database up to the current schema.
+
+    Creates missing tables, columns and any indexes that older databases were created
+    without, and fills new columns, a newly created daily summary and change feed and
+    the trigram indexes from the existing rows.
+    Safe to run repeatedly.
+
+    :return: The names of the indexes that were created.
+    """
+    with bind.connect() as conn:
+        new_summary = not inspect(conn).has_table(summary.SUMMARY_TABLE)
+        new_changes = not inspect(conn).has_table(Change.__tablename__)
+    Base.metadata.create_all(bind)
+
+    created = []
+    with bind.begin() as conn:
+        add_missing_columns(conn)
+        existing = {
+            name
+            for (name,) in conn.exec_driver_sql("SELECT name FROM sqlite_master WHERE type = 'index'")
+        }
+        for table in Base.metadata.sorted_tables:
+            for index in table.indexes:
+                if index.name not in existing:
+                    index.create(conn)
+                    created.append(index.name)
+        if new_summary:
+            summary.rebuild(conn)
+        if created:
+            conn.exec_driver_sql("ANALYZE")
+    created += fuzzy.ensure_indexes()
+    if new_changes:
+        changelog.snapshot()
+    return created
+
+
+if __name__ == "__main__":
+    created = upgrade()
+    if created:
+        print("Created indexes: " + ", ".join(created))
+    else:
+        print("Database schema is up to date.")
@@ -0,0 +1,38 @@
+from sqlalchemy import Column, Integer, String, DateTime, Text
+from init import Base
+
+
+class CasRef(Base):
+    """
+    An entry stored by the content-addressed backend.
+
+    The body lives in a pack file under its hash (shared by identical bodies);
+    this row holds the stable key, the header fields and the to-do events, and is
+    written in the same transaction as the entry itself.
+    """
+    __tablename__ = 'cas_refs'
+
+    key = Column(String, primary_key=True)
+    digest = Column(String, nullable=False, index=True)
+    title = Column(String, nullable=False)
+    mood = Column(Integer, nullable=True)
+    timestamp = Column(DateTime, nullable=False)
+    events = Column(Text, nullable=False, default="[]")  # JSON list of to-do events
+
+    def __repr__(self):
+        return f"CasRef(key='{self.key}', digest='{self.digest[:12]}', title='{self.title}')"
+
+
+class CasBlob(Base):
+    """
+    Where a compressed body is stored: a byte range of one pack file.
+    """
+    __tablename__ = 'cas_blobs'
+
+    digest = Column(String, primary_key=True)  # SHA-256 of the uncompressed body
+    pack = Column(Integer, nullable=False)
+    offset = Column(Integer, nullable=False)
+    length = Column(Integer, nullable=False)
+
+    def __repr__(self):
+        return f"CasBlob(digest='{self.digest[:12]}', pack={self.pack}, offset={self.offset}, length={self.length})"
@@ -0,0 +1,44 @@
+from sqlalchemy import Column, Integer, String, DateTime, Text, Index
+from init import Base
+
+
+class Change(Base):
+    """
+    One entry or to-do mutation in the change feed (see changelog.py).
+
+    ``seq`` only ever grows (AUTOINCREMENT never reuses a number), so a peer that has
+    seen every change up to ``seq`` N needs exactly the rows after N. ``data`` is the
+    row's full state after the change, as JSON, or NULL for a deletion.
+    """
+    __tablename__ = 'changes'
+
+    seq = Column(Integer, primary_key=True)
+    origin = Column(String(32), nullable=False)  # node ID of the journal the change was made on
+    kind = Column(String, nullable=False)  # 'entry' or 'todo'
+    uid = Column(String(32), nullable=False)
+    op = Column(String, nullable=False)  # 'put' or 'delete'
+    changed_at = Column(DateTime, nullable=False)
+    data = Column(Text, nullable=True)
+
+    # The latest change of a row, for conflict resolution
+    __table_args__ = (
+        Index('ix_changes_kind_uid', 'kind', 'uid'),
+        {'sqlite_autoincrement': True},
+    )
+
+    def __repr__(self):
+        return f"Change(seq={self.seq}, {self.op} {self.kind} {self.uid}, origin='{self.origin}')"
+
+
+class SyncState(Base):
+    """
+    Small key/value settings of the sync machinery: this journal's node ID and, per
+    peer, how far each side has seen the other's change feed.
+    """
+    __tablename__ = 'sync_state'
+
+    key = Column(String, primary_key=True)
+    value = Column(String, nullable=False)
+
+    def __repr__(self):
+        return f"SyncState(key='{self.key}', value='{self.value}')"
@@ -0,0 +1,27 @@
+from sqlalchemy import Column, Integer, String
+from init import Base
+
+
+class DailySummary(Base):
+    """
+    Running totals for one calendar day of entries, kept up to date by the entry and
+    to-do operations (see summary.py) so that reports read one row per day instead of
+    every entry. To-dos count towards the day of the entry they belong to.
+    """
+    __tablename__ = 'daily_summary'
+
+    day = Column(String, primary_key=True)  # 'YYYY-MM-DD', the date part of Entry.timestamp
+    entries = Column(Integer, nullable=False, default=0)
+    mood_sum = Column(Integer, nullable=False, default=0)
+    mood_count = Column(Integer, nullable=False, default=0)
+    # Entries per mood, for distributions and the day's lowest/highest mood
+    mood_1 = Column(Integer, nullable=False, default=0)
+    mood_2 = Column(Integer, nullable=False, default=0)
+    mood_3 = Column(Integer, nullable=False, default=0)
+    mood_4 = Column(Integer, nullable=False, default=0)
+    mood_5 = Column(Integer, nullable=False, default=0)
+    todos_created = Column(Integer, nullable=False, default=0)
+    todos_done = Column(Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"DailySummary(day='{self.day}', entries={self.entries}, todos={self.todos_done}/{self.todos_created})"
@@ -1,18 +1,64 @@
-from sqlalchemy import Column, Integer, String, DateTime, CheckConstraint
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, String, DateTime, CheckConstraint, Index, tuple_
+from sqlalchemy.orm import relationship, selectinload
 from init import Base, session
-from datetime import datetime
-import os
+from datetime import date, datetime, time
+from collections import namedtuple
+from storage import get_storage
+from entry_reader import EntryContent
+import search
+import fuzzy
+import summary
+import cache
+import changelog
+
+
+# Detached snapshot of an entry's metadata, as kept in the entry cache.
+EntryInfo = namedtuple("EntryInfo", ["id", "title", "mood", "timestamp", "content_path"])
+
+# Default of ``update_entry``'s mood: leave it as it is (None clears it).
+UNCHANGED = object()
+
+
+def _bucket(fmt):
+    """
+    Column default deriving a time bucket from the row's timestamp; it also runs for
+    bulk Core inserts, which bypass the ORM.
+    """
+    def default(context):
+        timestamp = context.get_current_parameters().get("timestamp")
+        return timestamp.strftime(fmt) if timestamp else None
+    return default
+
+
+def _as_day(value):
+    """
+    The ``day`` bucket of a range bound given as a date or datetime.
+    """
+    if value is None:
+        return None
+    return value.strftime("%Y-%m-%d")
 
 
 class Entry(Base):
     __tablename__ = 'entries'
 
     id = Column(Integer, primary_key=True)
-    title = Column(String, nullable=False)
-    mood = Column(Integer, CheckConstraint('mood >= 1 AND mood <= 5'), nullable=True)
-    timestamp = Column(DateTime, default=datetime.utcnow)
+    title = Column(String, nullable=False, index=True)
+    mood = Column(Integer, CheckConstraint('mood >= 1 AND mood <= 5'), nullable=True, index=True)
+    timestamp = Column(DateTime, default=datetime.utcnow, index=True)
     content_path = Column(String, nullable=False)
+    # Identifies the entry across synced journals (see changelog.py)
+    uid = Column(String(32), default=changelog.new_uid, unique=True, index=True)
+
+    # Time buckets of ``timestamp``, set on insert (an entry's timestamp never changes):
+    # the day (YYYY-MM-DD) for date-range lookups and MM-DD for "on this day".
+    day = Column(String(10), default=_bucket("%Y-%m-%d"))
+    month_day = Column(String(5), default=_bucket("%m-%d"))
+
+    __table_args__ = (
+        Index('ix_entries_day_timestamp', 'day', 'timestamp'),
+        Index('ix_entries_month_day_timestamp', 'month_day', 'timestamp'),
+    )
 
     # Relationship with TodoItem (one-to-many)
     todos = relationship("Todo", back_populates="entry", cascade="all, delete-orphan")
@@ -20,41 +66,26 @@ class Entry(Base):
     def __repr__(self):
         return f"Entry(id={self.id}, title='{self.title}', mood={self.mood}, timestamp={self.timestamp})"
 
+    def to_info(self):
+        return EntryInfo(self.id, self.title, self.mood, self.timestamp, self.content_path)
+
     @classmethod
-    def add_entry(cls, title, content, mood=None):
+    def add_entry(cls, title, content, mood=None, timestamp=None, uid=None):
         """
         Create a formatted journal entry file and save entry metadata in the database.
+
+        :param timestamp: When the entry was written (default: now).
+        :param uid: The entry's ID across synced journals (default: a new one).
         """
-        timestamp = datetime.utcnow()
-        safe_title = title.replace(' ', '_')
-        filename = f"entries/{safe_title}_{timestamp.strftime('%Y-%m-%d_%H-%M-%S')}.txt"
-
-        mood_map = {
-            1: "😞 Very Sad",
-            2: "😕 Sad",
-            3: "😐 Neutral",
-            4: "🙂 Happy",
-            5: "😄 Very Happy"
-        }
-
-        mood_label = mood_map.get(mood, "N/A")
-
-        os.makedirs(os.path.dirname(filename), exist_ok=True)
-
-        with open(filename, "w", encoding="utf-8") as f:
-            f.write("="*40 + "\n")
-            f.write("       📝 Journal Entry\n")
-            f.write("="*40 + "\n\n")
-            f.write(f"Title     : {title}\n")
-            f.write(f"Mood      : {mood_label}\n")
-            f.write(f"Timestamp : {timestamp.strftime('%Y-%m-%d %H:%M:%S')}\n\n")
-            f.write("-"*40 + "\n")
-            f.write("Content:\n")
-            f.write("-"*40 + "\n")
-            f.write(content + "\n")
-
-        entry = cls(title=title, mood=mood, content_path=filename, timestamp=timestamp)
+        timestamp = timestamp or datetime.utcnow()
+        key = get_storage().create(title, content, mood, timestamp)
+
+        entry = cls(title=title, mood=mood, content_path=key, timestamp=timestamp, uid=uid)
         session.add(entry)
+        session.flush()
+        search.index_entry(entry.id, title, content)
+        summary.record_entry(timestamp, mood)
+        changelog.record_entry(entry, content)
         session.commit()
         return entry
 
@@ -64,13 +95,165 @@ class Entry(Base):
         Retrieve all journal entries.
         """
         return session.query(cls).order_by(cls.timestamp.desc()).all()
+
+    @classmethod
+    def get_entries_with_todos(cls, limit=None):
+        """
+        Retrieve journal entries, newest first, with their to-dos loaded in one extra query.
+        """
+        query = session.query(cls).options(selectinload(cls.todos)).order_by(cls.timestamp.desc(), cls.id.desc())
+        if limit is not None:
+            query = query.limit(limit)
+        return query.all()
+
+    @property
+    def cursor(self):
+        """
+        Keyset position of this entry in the newest-first listing.
+        """
+        return (self.timestamp, self.id)
+
+    @classmethod
+    def _listing(cls, after=None, before=None):
+        query = session.query(cls)
+        if after:
+            return query.filter(tuple_(cls.timestamp, cls.id) < tuple_(*after)).order_by(
+                cls.timestamp.desc(), cls.id.desc())
+        if before:
+            return query.filter(tuple_(cls.timestamp, cls.id) > tuple_(*before)).order_by(
+                cls.timestamp.asc(), cls.id.asc())
+        return query.order_by(cls.timestamp.desc(), cls.id.desc())
+
+    @classmethod
+    def iter_entries(cls, batch_size=100, after=None):
+        """
+        Stream journal entries newest first without loading them all into memory.
+
+        :param batch_size: Number of rows fetched from the database at a time.
+        :param after: Cursor of the last entry already seen; streaming resumes after it.
+        """
+        yield from cls._listing(after=after).yield_per(batch_size)
+
+    @classmethod
+    def page_entries(cls, limit=20, after=None, before=None):
+        """
+        Retrieve one page of journal entries, newest first, using keyset pagination.
+
+        :param after: Cursor of the last entry on the previous page (next page).
+        :param before: Cursor of the first entry on the current page (previous page).
+        :return: A list of at most ``limit`` Entry objects.
+        """
+        page = cls._listing(after=after, before=before).limit(limit).all()
+        return page[::-1] if before else page
+
+    @classmethod
+    def find_between(cls, start=None, end=None, limit=None):
+        """
+        Retrieve the entries in a date or time range, oldest first.
+
+        Dates select whole days through the ``day`` bucket, both ends included; datetimes
+        select ``start <= timestamp < end`` (if only one end is a date, the other is
+        taken by its day). Either end may be None for an open range. Only the rows in the
+        range are read, in index order.
+
+        :param start: A date or datetime.
+        :param end: A date or datetime.
+        :return: A list of at most ``limit`` Entry objects.
+        """
+        query = session.query(cls)
+        if any(isinstance(bound, date) and not isinstance(bound, datetime) for bound in (start, end)):
+            start, end = _as_day(start), _as_day(end)
+            if start:
+                query = query.filter(cls.day >= start)
+            if end:
+                query = query.filter(cls.day <= end)
+            query = query.order_by(cls.day, cls.timestamp, cls.id)
+        else:
+            if start:
+                query = query.filter(cls.timestamp >= start)
+            if end:
+                query = query.filter(cls.timestamp < end)
+            query = query.order_by(cls.timestamp, cls.id)
+        if limit is not None:
+            query = query.limit(limit)
+        return query.all()
+
+    @classmethod
+    def on_this_day(cls, day=None, limit=None):
+        """
+        Retrieve the entries written on the same month and day in earlier years, newest first.
+
+        :param day: The date to look back from (default: today, UTC).
+        """
+        day = day or datetime.utcnow().date()
+        query = (
+            session.query(cls)
+            .filter(cls.month_day == day.strftime("%m-%d"), cls.timestamp < datetime.combine(day, time()))
+            .order_by(cls.timestamp.desc(), cls.id.desc())
+        )
+        if limit is not None:
+            query = query.limit(limit)
+        return query.all()
+
+    @classmethod
+    def page_timeline(cls, limit=20, after=None, before=None, around=None):
+        """
+        Retrieve one page of the timeline, oldest first, using keyset pagination.
+
+        :param after: Cursor of the last entry on the current page (next page).
+        :param before: Cursor of the first entry on the current page (previous page).
+        :param around: A datetime or date; without a cursor, the page holds the
+            ``limit`` entries around it (half before, the rest from it on).
+        :return: A list of at most ``limit`` Entry objects.
+        """
+        ascending = (cls.timestamp.asc(), cls.id.asc())
+        descending = (cls.timestamp.desc(), cls.id.desc())
+        query = session.query(cls)
+        if after:
+            return query.filter(tuple_(cls.timestamp, cls.id) > tuple_(*after)).order_by(*ascending).limit(limit).all()
+        if before:
+            page = query.filter(tuple_(cls.timestamp, cls.id) < tuple_(*before)).order_by(*descending).limit(limit).all()
+            return page[::-1]
+        if around is None:
+            return query.order_by(*ascending).limit(limit).all()
+
+        if not isinstance(around, datetime):
+            around = datetime.combine(around, time())
+        # Near either end of the journal, the other side fills the rest of the page
+        earlier = query.filter(cls.timestamp < around).order_by(*descending).limit(limit).all()
+        later = query.filter(cls.timestamp >= around).order_by(*ascending).limit(limit).all()
+        earlier = earlier[:max(limit // 2, limit - len(later))]
+        return earlier[::-1] + later[:limit - len(earlier)]
     
     @classmethod
     def find_by_id(cls, entry_id):
         """
         Retrieve a journal entry by ID.
         """
-        return session.query(cls).filter_by(id=entry_id).first()
+        entry = session.query(cls).filter_by(id=entry_id).first()
+        if entry:
+            cache.entry_cache.put(entry.id, entry.to_info())
+        return entry
+
+    @classmethod
+    def info(cls, entry_id):
+        """
+        Return an entry's metadata as an EntryInfo, from the entry cache when possible.
+
+        :return: The EntryInfo, or None if there is no such entry.
+        """
+        key = cache.cache_key(entry_id)
+        if key is None:
+            return None
+        info = cache.entry_cache.get(key)
+        if info is None:
+            entry = cls.find_by_id(key)
+            info = entry.to_info() if entry else None
+        return info
+
+    @classmethod
+    def exists(cls, entry_id):
+        return cls.info(entry_id) is not None
     
     @classmethod
     def find_by_title(cls, title):
@@ -78,6 +261,18 @@ class Entry(Base):
         Search entries by title (case-insensitive).
         """
         return session.query(cls).filter(cls.title.ilike(f"%{title}%")).all()
+
+    @classmethod
+    def find_by_title_fuzzy(cls, title, max_distance=None, limit=20):
+        """
+        Find entries whose title contains ``title`` give or take a few typos.
+
+        :param max_distance: Edits tolerated (default: one per four characters, at most three).
+        :return: A list of (Entry, edit distance) pairs, closest first.
+        """
+        hits = fuzzy.match("entry_titles_trgm", title, max_distance=max_distance, limit=limit)
+        entries = {e.id: e for e in session.query(cls).filter(cls.id.in_([id_ for id_, _ in hits]))}
+        return [(entries[id_], distance) for id_, distance in hits if id_ in entries]
     
     @classmethod
     def find_by_mood(cls, mood):
@@ -86,71 +281,157 @@ class Entry(Base):
         """
         return session.query(cls).filter_by(mood=mood).all()
 
+    @classmethod
+    def search(cls, query, limit=20):
+        """
+        Full-text search over entry title, content and to-do text.
+
+        :return: A list of (Entry, rank, snippet) tuples, best match first.
+        """
+        hits = search.search(query, limit=limit)
+        entries = {e.id: e for e in session.query(cls).filter(cls.id.in_([h[0] for h in hits]))}
+        return [(entries[id_], rank, snippet) for id_, rank, snippet in hits if id_ in entries]
+
+    @classmethod
+    def rebuild_search_index(cls):
+        """
+        Rebuild the full-text index from the entries table and their content files.
+
+        :return: The number of entries indexed.
+        """
+        rows = session.query(cls.id, cls.title, cls.content_path).all()
+
+        def documents():
+            for id_, title, key in rows:
+                yield id_, title, get_storage(key).read_body(key) or ""
+
+        return search.rebuild(documents())
+
   
     @staticmethod
-    def read_entry_content(entry_id):
-        entry = Entry.find_by_id(entry_id)
-        if entry:
-            try:
-                with open(entry.content_path, "r", encoding="utf-8") as f:
-                    print(f.read())
-            except FileNotFoundError:
-                print("Error: Content file not found.")
-        else:
+    def get_content(entry):
+        """
+        Return the text of an entry's content file, or None if the file is missing.
+
+        :param entry: An Entry or EntryInfo. The text is served from the content cache when possible.
+        """
+        content = cache.content_cache.get(entry.id)
+        if content is None:
+            content = get_storage(entry.content_path).read(entry.content_path)
+            if content is not None:
+                cache.content_cache.put(entry.id, content)
+        return content
+
+    @staticmethod
+    def open_content(entry):
+        """
+        Open an entry's content for lazy, partial reads without loading all of it.
+
+        An entry file is memory-mapped; text the log and content-addressed backends
+        render from their records is served from the content cache when possible.
+
+        :param entry: An Entry or EntryInfo.
+        :return: An ``entry_reader.EntryContent`` (close it when done), or None if the
+            content is missing.
+        """
+        store = get_storage(entry.content_path)
+        if store.mapped:
+            return store.open(entry.content_path)
+        text = Entry.get_content(entry)
+        return EntryContent(text.encode("utf-8")) if text is not None else None
+
+    @staticmethod
+    def read_entry_content(entry_id, page_lines=200):
+        """
+        Print an entry's content, a page of lines at a time, without reading the whole
+        file into memory.
+        """
+        entry = Entry.info(entry_id)
+        if not entry:
             print("Entry not found.")
+            return
+        content = Entry.open_content(entry)
+        if content is None:
+            print("Error: Content file not found.")
+            return
+        with content:
+            offset = 0
+            while offset is not None:
+                text, offset = content.page(offset, page_lines)
+                print(text)
 
     @staticmethod
     def delete_entry(entry_id):
         """
         Delete a journal entry by ID, including its associated file.
         """
-        entry = session.query(Entry).get(entry_id)
+        entry = session.get(Entry, entry_id)
         if entry:
-            # Delete the file if it exists
-            if entry.content_path and os.path.exists(entry.content_path):
+            key = entry.content_path
+            store = get_storage(key) if key else None
+            # Delete the file if it exists (staged until the commit)
+            if store is not None and store.transactional:
                 try:
-                    os.remove(entry.content_path)
+                    store.delete(key)
                 except Exception as e:
                     print(f"Warning: Could not delete file. {e}")
 
+            search.remove_entry(entry.id)
+            # The entry's to-dos go with it (delete-orphan cascade)
+            summary.record_entry(entry.timestamp, entry.mood, sign=-1, todos=len(entry.todos),
+                                 done=sum(todo.status == "done" for todo in entry.todos))
+            changelog.record_delete("entry", entry.uid)
             session.delete(entry)
             session.commit()
+            if store is not None and not store.transactional:
+                # An append cannot be rolled back, so the tombstone waits for the commit
+                store.delete(key)
+            cache.invalidate_entry(entry_id)
         else:
             print("Entry not found.")
 
 
     @staticmethod
-    def update_entry(entry_id, title=None, content=None, mood=None):
-        entry = session.query(Entry).get(entry_id)
+    def update_entry(entry_id, title=None, content=None, mood=UNCHANGED):
+        """
+        Change an entry's title, mood and/or content; None leaves the title or content as
+        it is (an empty string is valid content), ``UNCHANGED`` the mood (None clears it).
+        """
+        entry = session.get(Entry, entry_id)
         if entry:
-            old_path = entry.content_path
+            if mood is not UNCHANGED and mood is not None and (mood < 1 or mood > 5):
+                raise ValueError("Mood must be an integer between 1 and 5.")
 
+            changed = []
             if title:
-                new_filename = f"entries/{title.replace(' ', '_')}_{entry.timestamp.isoformat()}.txt"
-                try:
-                    os.rename(old_path, new_filename)
-                    entry.content_path = new_filename
-                except FileNotFoundError:
-                    print("Warning: Original file not found during rename.")
                 entry.title = title
-
-            if mood is not None:
-                if mood < 1 or mood > 5:
-                    raise ValueError("Mood must be an integer between 1 and 5.")
+                changed.append("title")
+            if mood is not UNCHANGED:
+                summary.change_mood(entry.timestamp, entry.mood, mood)
                 entry.mood = mood
+                changed.append("mood")
+            if content is not None:
+                changed.append("content")
 
-            if content:
-                try:
-                    with open(entry.content_path, "w", encoding="utf-8") as f:
-                        f.write(f"Title: {entry.title}\n")
-                        f.write(f"Mood: {entry.mood if entry.mood else 'N/A'}\n")
-                        f.write(f"Timestamp: {entry.timestamp}\n")
-                        f.write("\n")
-                        f.write(content)
-                except FileNotFoundError:
-                    print("Error: Content file not found.")
+            store = get_storage(entry.content_path)
+            if changed:
+                body = content if content is not None else store.read_body(entry.content_path) or ""
+                changelog.record_entry(entry, body, changed)
+                update = dict(title=entry.title, content=content, mood=entry.mood, timestamp=entry.timestamp,
+                              rename=bool(title))
+                if store.transactional:
+                    entry.content_path = store.update(entry.content_path, **update)
 
+            if content is not None:
+                search.index_entry(entry.id, entry.title, content)
+            elif title:
+                search.update_title(entry.id, entry.title)
+            key = entry.content_path
             session.commit()
+            if changed and not store.transactional:
+                # An append cannot be rolled back, so the record waits for the commit
+                store.update(key, **update)
+            cache.invalidate_entry(entry_id)
         else:
             print("Entry not found.")
 
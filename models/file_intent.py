@@ -0,0 +1,23 @@
+from sqlalchemy import Column, Integer, String
+from init import Base
+
+
+class FileIntent(Base):
+    """
+    A file operation recorded in the same transaction as the rows it belongs to.
+
+    Entry files are first written to a ``.tmp`` sibling and only moved into place once
+    the transaction has committed. If the process dies in between, the surviving intent
+    rows tell recovery which staged files belong to committed work (roll forward) --
+    any ``.tmp`` file without an intent belongs to a transaction that never committed.
+    """
+    __tablename__ = 'file_intents'
+
+    id = Column(Integer, primary_key=True)
+    txid = Column(String, nullable=False, index=True)
+    op = Column(String, nullable=False)  # 'replace' (source -> target) or 'remove' (target)
+    source = Column(String, nullable=True)
+    target = Column(String, nullable=False)
+
+    def __repr__(self):
+        return f"FileIntent(id={self.id}, op='{self.op}', source='{self.source}', target='{self.target}')"
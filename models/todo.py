@@ -1,18 +1,32 @@
 # todo.py
 
-from sqlalchemy import Column, Integer, String, ForeignKey
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, String, ForeignKey, Index
+from sqlalchemy.orm import relationship, joinedload
 from init import Base, session
-import os
+from models.entry import Entry
+from storage import get_storage
+import search
+import fuzzy
+import summary
+import cache
+import changelog
+
+# Entry IDs per statement in bulk operations, well below SQLite's bound-parameter limit
+BULK_CHUNK = 5000
 
 
 class Todo(Base):
     __tablename__ = 'todos'
 
     id = Column(Integer, primary_key=True)
-    task = Column(String, nullable=False)
-    status = Column(String, default='pending')  # e.g., 'pending', 'done'
+    task = Column(String, nullable=False, index=True)
+    status = Column(String, default='pending', index=True)  # e.g., 'pending', 'done'
     entry_id = Column(Integer, ForeignKey('entries.id'))
+    # Identifies the to-do across synced journals (see changelog.py)
+    uid = Column(String(32), default=changelog.new_uid, unique=True, index=True)
+
+    # Serves to-do lookups by entry and, covering status too, per-entry completion counts
+    __table_args__ = (Index('ix_todos_entry_id_status', 'entry_id', 'status'),)
 
     # Relationship with Entry (many-to-one)
     entry = relationship("Entry", back_populates="todos")
@@ -21,28 +35,35 @@ class Todo(Base):
         return f"Todo(id={self.id}, task='{self.task}', status='{self.status}', Entry ID={self.entry_id})"
     
     @classmethod
-    def add_todo(cls, task, entry_id, status='pending'):
+    def add_todo(cls, task, entry_id, status='pending', uid=None):
         """
         Add a new to-do item to the database and update the associated entry file.
+
+        :param uid: The to-do's ID across synced journals (default: a new one).
         """
-        new_todo = cls(task=task, entry_id=entry_id, status=status)
+        new_todo = cls(task=task, entry_id=entry_id, status=status, uid=uid)
         session.add(new_todo)
+        session.flush()
+        search.reindex_todos(entry_id)
+
+        entry = session.get(Entry, entry_id)
+        file_path = entry.content_path if entry else None
+        if entry:
+            summary.record_todo(entry.timestamp, status)
+        changelog.record_todo(new_todo.uid, task, status, entry.uid if entry else None)
         session.commit()
 
         # After commit, update the entry file
-        entry = session.query(new_todo.__class__.entry.property.mapper.class_).get(entry_id)
-        if entry and os.path.exists(entry.content_path):
+        if file_path:
             try:
-                with open(entry.content_path, "a", encoding="utf-8") as f:
-                    f.write("\n" + "="*40 + "\n")
-                    f.write("          ✅ To-Do\n")
-                    f.write("="*40 + "\n")
-                    f.write(f"📝 Task   : {task}\n")
-                    f.write(f"📌 Status : {status.capitalize()}\n")
+                get_storage(file_path).append_todo_event(
+                    file_path, {"kind": "added", "task": task, "status": status})
             except Exception as e:
                 print("Failed to update entry file with new to-do:", e)
+            session.commit()  # events kept in the database (cas: storage)
+        cache.invalidate_content(entry_id)
 
-
+        return new_todo
 
     @classmethod
     def get_all_todos(cls):
@@ -53,6 +74,52 @@ class Todo(Base):
         """
         return session.query(cls).all()
 
+    @classmethod
+    def get_todos_with_entries(cls):
+        """
+        Retrieve all to-do items with their entries loaded in the same query.
+
+        :return: A list of Todo objects whose ``entry`` is already populated.
+        """
+        return session.query(cls).options(joinedload(cls.entry)).order_by(cls.id).all()
+
+    @property
+    def cursor(self):
+        """
+        Keyset position of this to-do in the listing (ordered by ID).
+        """
+        return self.id
+
+    @classmethod
+    def iter_todos(cls, batch_size=100, after=None):
+        """
+        Stream to-do items in ID order without loading them all into memory.
+
+        :param batch_size: Number of rows fetched from the database at a time.
+        :param after: ID of the last to-do already seen; streaming resumes after it.
+        """
+        query = session.query(cls).order_by(cls.id)
+        if after is not None:
+            query = query.filter(cls.id > after)
+        yield from query.yield_per(batch_size)
+
+    @classmethod
+    def page_todos(cls, limit=20, after=None, before=None):
+        """
+        Retrieve one page of to-do items in ID order using keyset pagination.
+
+        :param after: ID of the last to-do on the previous page (next page).
+        :param before: ID of the first to-do on the current page (previous page).
+        :return: A list of at most ``limit`` Todo objects, with their entries loaded.
+        """
+        query = session.query(cls).options(joinedload(cls.entry))
+        if before is not None:
+            page = query.filter(cls.id < before).order_by(cls.id.desc()).limit(limit).all()
+            return page[::-1]
+        if after is not None:
+            query = query.filter(cls.id > after)
+        return query.order_by(cls.id).limit(limit).all()
+
     @classmethod
     def find_by_id(cls, todo_id):
         """
@@ -64,21 +131,49 @@ class Todo(Base):
         return session.query(cls).filter_by(id=todo_id).first()
 
     @classmethod
-    def find_by_task(cls, task):
+    def find_by_task(cls, task, status=None, entry_id=None):
         """
         Search to-do items by task name (case-insensitive and supports partial matches).
 
         :param task: The task string to search.
+        :param status: Only to-dos with this status.
+        :param entry_id: Only to-dos of this entry.
         :return: A list of matching Todo objects.
         """
-        return session.query(cls).filter(cls.task.ilike(f"%{task}%")).all()
+        query = session.query(cls).filter(cls.task.ilike(f"%{task}%"))
+        if status is not None:
+            query = query.filter(cls.status == status)
+        if entry_id is not None:
+            query = query.filter(cls.entry_id == entry_id)
+        return query.all()
+
+    @classmethod
+    def find_by_task_fuzzy(cls, task, status=None, entry_id=None, max_distance=None, limit=20):
+        """
+        Find to-do items whose task contains ``task`` give or take a few typos.
+
+        :param status: Only to-dos with this status.
+        :param entry_id: Only to-dos of this entry.
+        :param max_distance: Edits tolerated (default: one per four characters, at most three).
+        :return: A list of (Todo, edit distance) pairs, closest first.
+        """
+        filters, params = [], {}
+        if status is not None:
+            filters.append("s.status = :status")
+            params["status"] = status
+        if entry_id is not None:
+            filters.append("s.entry_id = :entry_id")
+            params["entry_id"] = entry_id
+        hits = fuzzy.match("todos_trgm", task, " AND ".join(filters), params, max_distance=max_distance, limit=limit)
+        todos = {t.id: t for t in session.query(cls).filter(cls.id.in_([id_ for id_, _ in hits]))}
+        return [(todos[id_], distance) for id_, distance in hits if id_ in todos]
     
     @staticmethod
     def delete_todo(todo_id):
         """
         Delete a to-do item and annotate its deletion in the associated entry file.
         """
-        todo = session.query(Todo).get(todo_id)
+        todo = session.get(Todo, todo_id)
         if not todo:
             print("To-do not found.")
             return
@@ -86,22 +181,27 @@ class Todo(Base):
         # Preserve info before deletion
         task = todo.task
         status = todo.status
-        entry = todo.entry
+        entry = session.get(Entry, todo.entry_id) if todo.entry_id else None
+        file_path = entry.content_path if entry else None
 
+        entry_id = todo.entry_id
+        changelog.record_delete("todo", todo.uid)
         session.delete(todo)
+        session.flush()
+        search.reindex_todos(entry_id)
+        if entry:
+            summary.record_todo(entry.timestamp, status, sign=-1)
         session.commit()
 
         # Log deletion in the file
-        if entry and os.path.exists(entry.content_path):
+        if file_path:
             try:
-                with open(entry.content_path, "a", encoding="utf-8") as f:
-                    f.write("\n" + "="*40 + "\n")
-                    f.write("       ❌ To-Do Deleted\n")
-                    f.write("="*40 + "\n")
-                    f.write(f"📝 Task   : {task}\n")
-                    f.write(f"📌 Status : {status.capitalize() if status else 'N/A'}\n")
+                get_storage(file_path).append_todo_event(
+                    file_path, {"kind": "deleted", "task": task, "status": status})
             except Exception as e:
                 print("Failed to log deleted to-do in entry file:", e)
+            session.commit()
+        cache.invalidate_content(entry_id)
 
 
     @staticmethod
@@ -110,7 +210,7 @@ class Todo(Base):
         Update an existing to-do item and annotate the old version as updated,
         then append the new version in the associated entry file.
         """
-        todo = session.query(Todo).get(todo_id)
+        todo = session.get(Todo, todo_id, options=[joinedload(Todo.entry)])
         if not todo:
             print("To-do not found.")
             return
@@ -129,29 +229,159 @@ class Todo(Base):
         if entry_id:
             todo.entry_id = entry_id
 
-        session.commit()
+        session.flush()
+        search.reindex_todos(todo.entry_id)
+        if original_entry and original_entry.id != todo.entry_id:
+            search.reindex_todos(original_entry.id)
 
-        entry_to_update = session.query(Todo).get(todo_id).entry or original_entry
-        file_path = entry_to_update.content_path
+        # Capture what the file append needs before commit expires the loaded objects
+        entry_to_update = session.get(Entry, todo.entry_id) or original_entry
+        file_path = entry_to_update.content_path if entry_to_update else None
+        updated_entry_id = entry_to_update.id if entry_to_update else None
+        new_task, new_status = todo.task, todo.status
+        if (original_entry and original_entry.id, old_status) != (todo.entry_id, new_status):
+            if original_entry:
+                summary.record_todo(original_entry.timestamp, old_status, sign=-1)
+            if entry_to_update and entry_to_update.id == todo.entry_id:
+                summary.record_todo(entry_to_update.timestamp, new_status)
+        changelog.record_todo(todo.uid, new_task, new_status,
+                              entry_to_update.uid if entry_to_update and entry_to_update.id == todo.entry_id else None)
+        session.commit()
 
-        if entry_to_update and os.path.exists(file_path):
+        if file_path:
             try:
-                with open(file_path, "a", encoding="utf-8") as f:
-                    f.write("\n" + "="*40 + "\n")
-                    f.write("   ❗️ Previous To-Do Updated\n")
-                    f.write("="*40 + "\n")
-                    f.write(f"📝 Old Task   : {old_task}\n")
-                    f.write(f"📌 Old Status : {old_status.capitalize() if old_status else 'N/A'}\n")
-
-                    f.write("\n" + "="*40 + "\n")
-                    f.write("       🔄 New To-Do\n")
-                    f.write("="*40 + "\n")
-                    f.write(f"📝 Task   : {todo.task}\n")
-                    f.write(f"📌 Status : {todo.status.capitalize() if todo.status else 'N/A'}\n")
-
+                get_storage(file_path).append_todo_event(file_path, {
+                    "kind": "updated",
+                    "old_task": old_task,
+                    "old_status": old_status,
+                    "task": new_task,
+                    "status": new_status,
+                })
             except Exception as e:
                 print("Failed to append to-do update in entry file:", e)
+            session.commit()
+        cache.invalidate_content(updated_entry_id)
+
+
+
+    
+
+    # ---- bulk operations ----
+
+    @classmethod
+    def _selection(cls, ids=None, entry_id=None, status=None, task=None):
+        """
+        Filter criteria for the bulk operations. At least one criterion is required,
+        so that a missing argument never selects every to-do.
+
+        :param ids: To-do IDs.
+        :param entry_id: Only to-dos of this entry.
+        :param status: Only to-dos with this status.
+        :param task: Only to-dos whose task contains this text (case-insensitive).
+        """
+        criteria = []
+        if ids is not None:
+            criteria.append(cls.id.in_(list(ids)))
+        if entry_id is not None:
+            criteria.append(cls.entry_id == entry_id)
+        if status is not None:
+            criteria.append(cls.status == status)
+        if task:
+            criteria.append(cls.task.ilike(f"%{task}%"))
+        if not criteria:
+            raise ValueError("Select the to-dos by ID, entry, status or task.")
+        return criteria
+
+    @staticmethod
+    def _finish_bulk(rows, event, done_delta, removed):
+        """
+        Bring the summary (and the search index, if to-dos were removed) up to date for a
+        bulk change, commit, then append one group of events to each affected entry file
+        (committed together, where the storage keeps them in the database).
 
+        :param rows: The affected (id, task, status, entry_id, uid) rows, as they were before.
+        :param event: Function returning the file event for a row.
+        :param done_delta: Function returning the change in done to-dos for a row.
+        """
+        entry_ids = sorted({row.entry_id for row in rows if row.entry_id is not None})
+        entries = {}
+        for i in range(0, len(entry_ids), BULK_CHUNK):
+            chunk = entry_ids[i:i + BULK_CHUNK]
+            entries.update(
+                (id_, (timestamp, key, uid))
+                for id_, timestamp, key, uid in session.query(Entry.id, Entry.timestamp, Entry.content_path, Entry.uid)
+                .filter(Entry.id.in_(chunk))
+            )
+            if removed:
+                search.reindex_todos_many(chunk)
+        summary.record_todo_changes(
+            (entries[row.entry_id][0], -1 if removed else 0, done_delta(row)) for row in rows if row.entry_id in entries
+        )
+        changelog.record_many(
+            ("todo", row.uid, None) if removed else
+            ("todo", row.uid, changelog.todo_data(event(row)["task"], event(row)["status"],
+                                                  entries[row.entry_id][2] if row.entry_id in entries else None))
+            for row in rows
+        )
+        session.commit()
+
+        events = {}
+        for row in rows:
+            if row.entry_id in entries:
+                events.setdefault(row.entry_id, []).append(event(row))
+        for entry_id, entry_events in events.items():
+            key = entries[entry_id][1]
+            try:
+                get_storage(key).append_todo_events(key, entry_events)
+            except Exception as e:
+                print(f"Failed to log to-do changes in the file of entry {entry_id}:", e)
+            cache.invalidate_content(entry_id)
+        session.commit()  # one commit for the events of every entry (cas: storage)
+
+    @classmethod
+    def bulk_update_status(cls, status, ids=None, entry_id=None, task=None, current_status=None):
+        """
+        Set the status of many to-dos with one UPDATE, e.g. to close out a sprint.
 
+        To-dos are selected as in ``_selection`` (``current_status`` filters on the
+        status before the change); those already in ``status`` are left alone. Each
+        affected entry file gets one append with an "updated" block per to-do.
 
-    
\ No newline at end of file
+        :return: The number of to-dos changed.
+        """
+        criteria = cls._selection(ids, entry_id, current_status, task) + [cls.status != status]
+        rows = session.query(cls.id, cls.task, cls.status, cls.entry_id, cls.uid).filter(*criteria).all()
+        if not rows:
+            return 0
+        session.query(cls).filter(*criteria).update({cls.status: status}, synchronize_session=False)
+        cls._finish_bulk(
+            rows,
+            event=lambda row: {"kind": "updated", "old_task": row.task, "old_status": row.status,
+                               "task": row.task, "status": status},
+            done_delta=lambda row: (status == "done") - (row.status == "done"),
+            removed=False,
+        )
+        return len(rows)
+
+    @classmethod
+    def bulk_delete(cls, ids=None, entry_id=None, status=None, task=None):
+        """
+        Delete many to-dos with one DELETE.
+
+        To-dos are selected as in ``_selection``. Each affected entry file gets one
+        append with a "deleted" block per to-do.
+
+        :return: The number of to-dos deleted.
+        """
+        criteria = cls._selection(ids, entry_id, status, task)
+        rows = session.query(cls.id, cls.task, cls.status, cls.entry_id, cls.uid).filter(*criteria).all()
+        if not rows:
+            return 0
+        session.query(cls).filter(*criteria).delete(synchronize_session=False)
+        cls._finish_bulk(
+            rows,
+            event=lambda row: {"kind": "deleted", "task": row.task, "status": row.status},
+            done_delta=lambda row: -(row.status == "done"),
+            removed=True,
+        )
+        return len(rows)
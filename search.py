@@ -0,0 +1,176 @@
+from sqlalchemy import bindparam, text
+from sqlalchemy.exc import OperationalError
+from init import session
+
+
+FTS_TABLE = "entries_fts"
+
+# Column weights for bm25(): title, content, to-do text.
+RANK_WEIGHTS = (10.0, 1.0, 2.0)
+
+_index_ready = False
+
+
+def ensure_index():
+    """
+    Create the FTS5 table over entry title, content and to-do text if it does not exist.
+
+    The row id of the index is the entry ID.
+    """
+    global _index_ready
+    if _index_ready:
+        return
+    session.execute(text(
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} "
+        "USING fts5(title, content, todos, tokenize='unicode61 remove_diacritics 2')"
+    ))
+    _index_ready = True
+
+
+def index_entry(entry_id, title, content):
+    """
+    Insert or replace the index row for an entry. To-do text is taken from the todos table.
+    """
+    ensure_index()
+    session.execute(text(f"DELETE FROM {FTS_TABLE} WHERE rowid = :id"), {"id": entry_id})
+    session.execute(
+        text(
+            f"INSERT INTO {FTS_TABLE} (rowid, title, content, todos) VALUES "
+            "(:id, :title, :content, "
+            "(SELECT group_concat(task, ' ') FROM todos WHERE entry_id = :id))"
+        ),
+        {"id": entry_id, "title": title, "content": content},
+    )
+
+
+def index_many(rows):
+    """
+    Bulk insert index rows for new entries.
+
+    :param rows: A list of dicts with id, title, content and todos keys.
+    """
+    if not rows:
+        return
+    ensure_index()
+    session.execute(
+        text(f"INSERT INTO {FTS_TABLE} (rowid, title, content, todos) VALUES (:id, :title, :content, :todos)"),
+        rows,
+    )
+
+
+def update_title(entry_id, title):
+    """
+    Update the indexed title of an entry.
+    """
+    ensure_index()
+    session.execute(text(f"UPDATE {FTS_TABLE} SET title = :title WHERE rowid = :id"), {"id": entry_id, "title": title})
+
+
+def reindex_todos(entry_id):
+    """
+    Refresh the indexed to-do text of an entry from the todos table.
+    """
+    ensure_index()
+    session.execute(
+        text(
+            f"UPDATE {FTS_TABLE} SET todos = "
+            "(SELECT group_concat(task, ' ') FROM todos WHERE entry_id = :id) WHERE rowid = :id"
+        ),
+        {"id": entry_id},
+    )
+
+
+def reindex_todos_many(entry_ids):
+    """
+    Refresh the indexed to-do text of several entries in one statement.
+    """
+    if not entry_ids:
+        return
+    ensure_index()
+    session.execute(
+        text(
+            f"UPDATE {FTS_TABLE} SET todos = "
+            f"(SELECT group_concat(task, ' ') FROM todos WHERE entry_id = {FTS_TABLE}.rowid) "
+            "WHERE rowid IN :ids"
+        ).bindparams(bindparam("ids", expanding=True)),
+        {"ids": list(entry_ids)},
+    )
+
+
+def remove_entry(entry_id):
+    """
+    Drop an entry from the index.
+    """
+    ensure_index()
+    session.execute(text(f"DELETE FROM {FTS_TABLE} WHERE rowid = :id"), {"id": entry_id})
+
+
+def _quote_terms(query):
+    """
+    Turn free text into a safe FTS5 query by quoting each term.
+    """
+    return " ".join('"' + term.replace('"', '""') + '"' for term in query.split())
+
+
+def search(query, limit=20):
+    """
+    Run a ranked full-text query.
+
+    Supports FTS5 syntax such as ``"exact phrase"``, ``prefix*`` and ``title:word``.
+    Input that is not valid FTS5 syntax is searched as plain terms.
+
+    :return: A list of (entry_id, rank, snippet) tuples, best match first.
+    """
+    ensure_index()
+    weights = ", ".join(str(w) for w in RANK_WEIGHTS)
+    statement = text(
+        f"SELECT rowid, bm25({FTS_TABLE}, {weights}) AS rank, "
+        f"snippet({FTS_TABLE}, -1, '[', ']', '…', 12) "
+        f"FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH :query ORDER BY rank LIMIT :limit"
+    )
+    try:
+        # A savepoint, so that a syntax error only undoes this query, not the caller's work
+        with session.begin_nested():
+            rows = session.execute(statement, {"query": query, "limit": limit}).all()
+    except OperationalError:
+        rows = session.execute(statement, {"query": _quote_terms(query), "limit": limit}).all()
+    return [tuple(row) for row in rows]
+
+
+def rebuild(entries):
+    """
+    Recreate the index from scratch.
+
+    :param entries: An iterable of (entry_id, title, content) tuples.
+    :return: The number of entries indexed.
+    """
+    global _index_ready
+    session.execute(text(f"DROP TABLE IF EXISTS {FTS_TABLE}"))
+    _index_ready = False
+    ensure_index()
+
+    count = 0
+    batch = []
+    for entry_id, title, content in entries:
+        batch.append({"id": entry_id, "title": title, "content": content})
+        if len(batch) >= 1000:
+            count += _insert_with_todos(batch)
+            batch = []
+    count += _insert_with_todos(batch)
+
+    session.execute(text(f"INSERT INTO {FTS_TABLE} ({FTS_TABLE}) VALUES ('optimize')"))
+    session.commit()
+    return count
+
+
+def _insert_with_todos(batch):
+    if batch:
+        session.execute(
+            text(
+                f"INSERT INTO {FTS_TABLE} (rowid, title, content, todos) VALUES "
+                "(:id, :title, :content, "
+                "(SELECT group_concat(task, ' ') FROM todos WHERE entry_id = :id))"
+            ),
+            batch,
+        )
+    return len(batch)
@@ -2,21 +2,37 @@ from models.entry import Entry
 from models.todo import Todo
 from init import Base, engine
 from faker import Faker
+from sqlalchemy import func, inspect, select
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.exc import SQLAlchemyError
 import os
+import sys
 
 fake = Faker()
 
-# Ensure entries directory exists
-os.makedirs("entries", exist_ok=True)
 
-try:
-    Base.metadata.drop_all(engine)
-    Base.metadata.create_all(engine)
-    print("Database tables created successfully.")
-except SQLAlchemyError as e:
-    print("Error creating database tables:", e)
+def reset_database(force=False):
+    """
+    Drop and recreate all tables. A journal that already has entries is only wiped
+    with ``force`` (take a ``python cli.py backup`` first).
+
+    :return: True if the tables were recreated.
+    """
+    with engine.connect() as conn:
+        if not force and inspect(conn).has_table(Entry.__tablename__) \
+                and conn.scalar(select(func.count()).select_from(Entry.__table__)):
+            print(f"Refusing to wipe a journal with entries ({engine.url.database}); "
+                  "run with --force to drop all tables.")
+            return False
+    try:
+        Base.metadata.drop_all(engine)
+        Base.metadata.create_all(engine)
+        print("Database tables created successfully.")
+    except SQLAlchemyError as e:
+        print("Error creating database tables:", e)
+        return False
+    return True
+
 
 def generate_seed_data():
     Base.metadata.bind = engine
@@ -51,7 +67,11 @@ def generate_seed_data():
         session.close()
 
 if __name__ == "__main__":
+    # Ensure entries directory exists
+    os.makedirs("entries", exist_ok=True)
 
+    if not reset_database(force="--force" in sys.argv[1:]):
+        sys.exit(1)
     generate_seed_data()
 
 
@@ -0,0 +1,208 @@
+"""
+Sharded journals: several SQLite databases, each with its own content folder.
+
+A shard is a directory laid out like an unsharded journal -- a ``cli-journal.db`` next
+to an ``entries/`` folder -- so an existing journal can become a shard as it is, and
+each shard stays small enough to vacuum, verify and back up quickly. The shards are
+listed in ``shards.json`` in the journal root (or the file named by JOURNAL_SHARDS)::
+
+    {"route": "year", "default": "2025", "shards": {"2024": "shards/2024", "2025": "shards/2025"}}
+
+``route`` decides where new entries go: ``journal`` sends them to the default shard,
+``year`` to the shard named after the year of the entry's timestamp, created on first
+use (an import is split by year). Other operations run on the shard named with
+``--shard`` (entry and to-do IDs are per shard) or on the default one.
+
+The models, storage backends and search index all work on "the" database in the
+current directory, so a process serves one shard: ``enter`` must run before ``init``
+is imported. Queries over every shard are run by ``fan_out`` in a pool of fresh
+(spawned) processes, one shard each, and the results are merged by the caller.
+"""
+import importlib
+import json
+import os
+import sys
+from collections import namedtuple
+from datetime import datetime
+
+CONFIG_FILE = "shards.json"
+DB_FILE = "cli-journal.db"
+ROUTES = ("journal", "year")
+
+ShardConfig = namedtuple("ShardConfig", "path route default shards")
+
+
+def config_path():
+    return os.environ.get("JOURNAL_SHARDS", CONFIG_FILE)
+
+
+def load_config(path=None):
+    """
+    Read the shard list.
+
+    :return: A ShardConfig with absolute shard directories, or None if the journal is
+        not sharded.
+    """
+    path = os.path.abspath(path or config_path())
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    route = data.get("route", "journal")
+    if route not in ROUTES:
+        raise ValueError(f"Unknown shard route {route!r} in {path} (use journal or year).")
+    root = os.path.dirname(path)
+    shards = {name: os.path.join(root, directory) for name, directory in data.get("shards", {}).items()}
+    default = data.get("default") or (str(datetime.utcnow().year) if route == "year" else next(iter(shards), None))
+    return ShardConfig(path, route, default, shards)
+
+
+def add_shard(config, name, directory=None):
+    """
+    Register a shard (by default ``shards/<name>`` next to the config file) and save the config.
+
+    :return: The updated ShardConfig.
+    """
+    root = os.path.dirname(config.path)
+    directory = directory or os.path.join("shards", name)
+    with open(config.path, encoding="utf-8") as f:
+        data = json.load(f)
+    data.setdefault("shards", {})[name] = directory
+    tmp = config.path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2)
+    os.replace(tmp, config.path)
+    return config._replace(shards=dict(config.shards, **{name: os.path.join(root, directory)}))
+
+
+def describe(config):
+    """
+    :return: One record per shard: name, directory, database size and whether it is the default.
+    """
+    records = []
+    for name, directory in config.shards.items():
+        db = os.path.join(directory, DB_FILE)
+        records.append({"shard": name, "path": directory, "db_bytes": os.path.getsize(db) if os.path.exists(db) else 0,
+                        "default": name == config.default})
+    return records
+
+
+def route(config, shard=None, new_entry=False, timestamp=None):
+    """
+    Pick the shard an operation runs on.
+
+    :param shard: The shard asked for by name, if any.
+    :param new_entry: The operation creates an entry (year routing files it under the
+        year of ``timestamp``, registering that shard if needed).
+    :param timestamp: When the new entry was written (default: now).
+    :return: (config, shard name); the config changes when a shard is added.
+    """
+    if shard is not None:
+        if shard not in config.shards:
+            raise ValueError(f"Unknown shard {shard!r}; shards: {', '.join(sorted(config.shards)) or 'none'}.")
+        return config, shard
+    if config.route == "year" and new_entry:
+        name = str((timestamp or datetime.utcnow()).year)
+    else:
+        name = config.default
+    if name is None:
+        raise ValueError(f"No shards are configured in {config.path}.")
+    if name not in config.shards:
+        if config.route != "year":
+            raise ValueError(f"The default shard {name!r} is not listed in {config.path}.")
+        config = add_shard(config, name)
+    return config, name
+
+
+def for_years(config, first, last=None):
+    """
+    The shards that can hold entries from the years ``first`` to ``last``.
+
+    With year routing a shard named after a year only holds that year's entries, so the
+    others are left out; shards with other names (and all shards of a journal routed
+    another way) may hold any year.
+
+    :param first: The first year, or None for no lower bound.
+    :param last: The last year, or None for no upper bound.
+    :return: A list of shard names, in config order.
+    """
+    if config.route != "year":
+        return list(config.shards)
+    return [name for name in config.shards
+            if not name.isdigit() or ((first is None or int(name) >= first) and (last is None or int(name) <= last))]
+
+
+def enter(directory):
+    """
+    Make this process work on the shard in ``directory``, creating it if needed.
+
+    Must run before ``init`` (and so any model) is imported.
+    """
+    if "init" in sys.modules:
+        raise RuntimeError("shards.enter() must run before the database is opened.")
+    os.makedirs(directory, exist_ok=True)
+    os.chdir(directory)
+    os.environ["JOURNAL_DB_URL"] = "sqlite:///" + os.path.abspath(DB_FILE)
+    if not os.path.exists(DB_FILE):
+        import migrate
+        migrate.upgrade()
+
+
+def _call_in_shard(directory, module, function, args, kwargs):
+    enter(directory)
+    return getattr(importlib.import_module(module), function)(*args, **kwargs)
+
+
+def fan_out(config, module, function, *args, names=None, processes=None, **kwargs):
+    """
+    Call ``module.function(*args, **kwargs)`` on every shard (or the shards in
+    ``names``) in parallel.
+
+    :return: A dict of shard name -> result, in shard order.
+    """
+    names = list(config.shards) if names is None else names
+    return run_each(config, {name: (module, function, args, kwargs) for name in names}, processes=processes)
+
+
+def run_each(config, calls, processes=None):
+    """
+    Make one call per shard in parallel.
+
+    Each call runs in a freshly spawned process that serves only that shard, so
+    ``init`` binds to the shard's database. Arguments and results must be picklable.
+
+    :param calls: A dict of shard name -> (module, function, args, kwargs).
+    :param processes: Worker processes (default: one per shard, at most the CPU count).
+    :return: A dict of shard name -> result, in the order of ``calls``.
+    """
+    if not calls:
+        return {}
+    import multiprocessing  # only commands that fan out pay for it
+
+    processes = processes or min(len(calls), os.cpu_count() or 1)
+    context = multiprocessing.get_context("spawn")
+    with context.Pool(processes, maxtasksperchild=1) as pool:
+        results = pool.starmap(
+            _call_in_shard,
+            [(config.shards[name], module, function, args, kwargs)
+             for name, (module, function, args, kwargs) in calls.items()],
+        )
+    return dict(zip(calls, results))
+
+
+def merge(results, key=None, reverse=False, limit=None):
+    """
+    Combine the per-shard results of a query.
+
+    Lists of records are concatenated, each record tagged with its ``shard``, then
+    sorted by ``key`` (a record field) and cut to ``limit``. Any other result is
+    returned as a dict of shard name -> result.
+    """
+    if not all(isinstance(result, list) for result in results.values()):
+        return results
+    merged = [dict(record, shard=name) for name, result in results.items() for record in result]
+    if key is not None:
+        unsorted = [record for record in merged if record.get(key) is None]
+        merged = sorted((record for record in merged if record.get(key) is not None),
+                        key=lambda record: record[key], reverse=reverse) + unsorted
+    return merged[:limit] if limit is not None else merged
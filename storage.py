@@ -0,0 +1,969 @@
+"""
+Storage backends for entry content and to-do events.
+
+The ``content_path`` column of an entry is the key its content is stored under, and
+its prefix selects the backend that owns it:
+
+* ``FileStorage`` (no prefix) keeps one human-readable ``.txt`` file per entry under
+  ``entries/`` -- the original layout. Writes are staged as fsynced ``.tmp`` files and
+  moved into place with ``os.replace`` only after the database transaction commits.
+* ``LogStorage`` (``log:`` prefix) appends entry content and to-do events as records to
+  a single append-only segment log under ``entries/log/`` and renders the ``.txt``
+  text on demand.
+* ``CasStorage`` (``cas:`` prefix) stores each distinct body once, compressed, in pack
+  files under ``entries/cas/``, addressed by its SHA-256; the header fields and to-do
+  events of an entry are kept in the ``cas_refs`` table, so the key never changes.
+
+New entries go to the backend named by ``JOURNAL_STORAGE`` (``file``, ``log`` or ``cas``).
+"""
+import asyncio
+import functools
+import hashlib
+import json
+import logging
+import os
+import struct
+import threading
+import uuid
+import zlib
+from datetime import datetime
+from sqlalchemy import event, text
+from sqlalchemy.orm import Session
+from init import session, storage_backend
+from instrumentation import io_counters
+from models.file_intent import FileIntent
+from models.cas_ref import CasRef, CasBlob
+from entry_reader import EntryContent
+from entry_format import (
+    entry_body_span,
+    entry_filename,
+    format_entry_file,
+    format_todo_block,
+    format_todo_event,
+    parse_entry_body,
+)
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - not available on Windows
+    fcntl = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+log = logging.getLogger(__name__)
+
+
+def _datasync(fd):
+    if hasattr(os, "fdatasync"):
+        os.fdatasync(fd)
+    else:
+        os.fsync(fd)
+
+
+def _fsync_dir(path):
+    """
+    Persist a rename/unlink in ``path`` (a no-op where directories cannot be opened).
+    """
+    try:
+        fd = os.open(path or ".", os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def offload(fn, *args, sess=None):
+    """
+    Run blocking file I/O. Within an async repository call (the session is marked with
+    ``offload_io``) it runs in a worker thread so the event loop keeps serving requests;
+    ``fn`` must therefore not touch the database session.
+    """
+    if (sess if sess is not None else session).info.get("offload_io"):
+        from sqlalchemy.util import await_only
+        loop = asyncio.get_running_loop()
+        return await_only(loop.run_in_executor(None, functools.partial(fn, *args)))
+    return fn(*args)
+
+
+def apply_file_op(op, source, target):
+    """
+    Carry out one committed file operation. Idempotent, so recovery can safely replay it.
+    """
+    if op == "replace":
+        try:
+            os.replace(source, target)
+        except FileNotFoundError:
+            pass  # already applied
+    elif op == "remove":
+        try:
+            os.remove(target)
+        except FileNotFoundError:
+            pass
+    _fsync_dir(os.path.dirname(target))
+
+
+@event.listens_for(Session, "after_commit")
+def _after_commit(sess):
+    ops = sess.info.pop("file_ops", None)
+    txid = sess.info.pop("file_txid", None)
+    if ops:
+        sess.info["committed_file_ops"] = (txid, ops)
+
+
+@event.listens_for(Session, "after_transaction_end")
+def _after_transaction_end(sess, transaction):
+    # Applied once the committed transaction has released its connection: clearing the
+    # intents takes another one, and holding two at a time can exhaust the pool.
+    if transaction.parent is not None or "committed_file_ops" not in sess.info:
+        return
+    txid, ops = sess.info.pop("committed_file_ops")
+    offload(_apply_file_ops, ops, sess=sess)
+    with sess.get_bind().begin() as conn:
+        conn.execute(text("DELETE FROM file_intents WHERE txid = :txid"), {"txid": txid})
+
+
+def _apply_file_ops(ops):
+    for op, source, target in ops:
+        apply_file_op(op, source, target)
+
+
+@event.listens_for(Session, "after_rollback")
+def _after_rollback(sess):
+    sess.info.pop("file_txid", None)
+    for op, source, _ in sess.info.pop("file_ops", None) or ():
+        if op == "replace" and source:
+            try:
+                os.remove(source)
+            except FileNotFoundError:
+                pass
+
+
+def recover_file_ops(sess=session):
+    """
+    Roll forward file operations whose transaction committed but which were never applied
+    (the process died between the commit and the file moves).
+
+    The intent rows are deleted within ``sess``'s transaction; replaying is idempotent, so
+    if that transaction rolls back the operations are simply replayed again next time.
+
+    :return: The number of operations replayed.
+    """
+    FileIntent.__table__.create(sess.connection(), checkfirst=True)
+    query = sess.query(FileIntent).order_by(FileIntent.id)
+    if sess.info.get("file_txid"):
+        query = query.filter(FileIntent.txid != sess.info["file_txid"])
+    intents = query.all()
+    for intent in intents:
+        apply_file_op(intent.op, intent.source, intent.target)
+        sess.delete(intent)
+    return len(intents)
+
+
+def _write_synced(path, text, mode="w"):
+    with open(path, mode, encoding="utf-8") as f:
+        f.write(text)
+        f.flush()
+        os.fsync(f.fileno())
+    io_counters.wrote(text)
+
+
+def _read_text(path):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            text = f.read()
+    except FileNotFoundError:
+        return None
+    io_counters.read(text)
+    return text
+
+
+class FileStorage:
+    """
+    One plain-text file per entry, rewritten and appended to in place.
+    """
+
+    prefix = ""
+    transactional = True
+    # open() maps the file, so reads are left to the OS page cache
+    mapped = True
+    _recovered = False
+
+    def _intend(self, op, source, target):
+        """
+        Record a file operation to carry out when the current transaction commits.
+        """
+        if not FileStorage._recovered:
+            FileStorage._recovered = True
+            recover_file_ops()
+        txid = session.info.setdefault("file_txid", uuid.uuid4().hex)
+        session.add(FileIntent(txid=txid, op=op, source=source, target=target))
+        session.info.setdefault("file_ops", []).append((op, source, target))
+
+    def _stage(self, path, text):
+        """
+        Write ``text`` to a fsynced temp file that replaces ``path`` on commit.
+        """
+        tmp = path + ".tmp"
+        offload(_write_synced, tmp, text)
+        self._intend("replace", tmp, path)
+
+    @staticmethod
+    def _free_path(path, own=None):
+        """
+        ``path``, or the first ``<name>_<n>.txt`` next to it that no file is using yet.
+
+        :param own: The entry's current file, which counts as free.
+        """
+        base, ext = os.path.splitext(path)
+        n = 1
+        while path != own and (os.path.exists(path) or os.path.exists(path + ".tmp")):
+            path = f"{base}_{n}{ext}"
+            n += 1
+        return path
+
+    def create(self, title, content, mood, timestamp, todos=()):
+        """
+        Stage a new entry file, with any initial to-dos already rendered.
+
+        :param todos: (task, status) pairs to include in the file.
+        :return: The key (file path) of the new entry.
+        """
+        path = self._free_path(entry_filename(title, timestamp))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        text = format_entry_file(title, content, mood, timestamp)
+        text += "".join(format_todo_block(task, status) for task, status in todos)
+        self._stage(path, text)
+        return path
+
+    def update(self, key, title, content, mood, timestamp, rename=False):
+        """
+        Stage a rewrite of the entry file's header, and of its content if given, keeping
+        its to-do blocks; after a title change the file is renamed to match.
+
+        :return: The (possibly new) key of the entry.
+        """
+        text = self.read(key)
+        if text is None:
+            log.warning("Entry file %s not found during update.", key)
+            if content is None:
+                return key
+            text = ""
+        start, end = entry_body_span(text)
+        if content is None:
+            content = text[start:end].rstrip("\n")
+        text = format_entry_file(title, content, mood, timestamp) + text[end:]
+
+        new_key = self._free_path(entry_filename(title, timestamp), own=key) if rename else key
+        self._stage(new_key, text)
+        if new_key != key:
+            self._intend("remove", None, key)
+        return new_key
+
+    def append_todo_event(self, key, event):
+        """
+        Append the rendered block for a to-do event, if the entry file exists.
+        """
+        self.append_todo_events(key, [event])
+
+    def append_todo_events(self, key, events):
+        """
+        Append the blocks for several to-do events in one write, if the entry file exists.
+        """
+        if os.path.exists(key):
+            offload(_write_synced, key, "".join(format_todo_event(event) for event in events), "a")
+
+    def delete(self, key):
+        """
+        Stage removal of the entry file once the transaction commits.
+        """
+        self._intend("remove", None, key)
+
+    def exists(self, key):
+        return os.path.exists(key)
+
+    def read(self, key):
+        """
+        Return the entry text, or None if the file is missing.
+        """
+        return offload(_read_text, key)
+
+    def read_body(self, key):
+        """
+        Return just the journal content of an entry (no header or to-do blocks).
+        """
+        text = self.read(key)
+        return parse_entry_body(text) if text is not None else None
+
+    def open(self, key):
+        """
+        Memory-map the entry file for partial reads (see ``entry_reader``).
+
+        :return: An EntryContent, or None if the file is missing.
+        """
+        return offload(EntryContent.open, key)
+
+
+class LogStorage:
+    """
+    Append-only, length-prefixed segment log holding entry content and to-do events.
+
+    Each record is ``MAGIC | payload length | crc32 | key length | key | JSON payload``.
+    Records for one entry are replayed in order to rebuild it:
+
+    * ``create``/``snapshot`` -- title, mood, timestamp, content and to-do events
+    * ``update`` -- changed header fields and/or content
+    * ``todo`` -- one to-do event (added, updated or deleted)
+    * ``delete`` -- tombstone
+
+    Segments roll over at ``segment_size`` bytes. Compaction rewrites only the live
+    entries as one ``snapshot`` record each and removes the old segments; it runs when a
+    segment is sealed and ``needs_compaction()`` says so, or on demand.
+    """
+
+    prefix = "log:"
+    transactional = False
+    mapped = False
+    _default = None
+
+    MAGIC = b"JLR1"
+    HEADER = struct.Struct(">4sIIH")
+
+    def __init__(self, directory=os.path.join("entries", "log"), segment_size=64 * 1024 * 1024, fsync=True):
+        self.directory = directory
+        self.segment_size = segment_size
+        self.fsync = fsync
+        self._lock = threading.RLock()
+        self._fd = None
+        self._lock_fd = None
+        self._segment = None
+        # key -> list of (segment number, offset, record length); built lazily by _catch_up()
+        self._index = None
+        self._scanned = {}
+        self._readers = {}
+        self._dead_bytes = 0
+        self._total_bytes = 0
+        self._records = 0
+
+    @classmethod
+    def default(cls):
+        """
+        The shared log under ``entries/log``. Set JOURNAL_LOG_FSYNC=0 to skip fsync per append.
+        """
+        if cls._default is None:
+            cls._default = cls(fsync=os.environ.get("JOURNAL_LOG_FSYNC", "1") != "0")
+        return cls._default
+
+    # ---- segment files ----
+
+    def _segment_path(self, number):
+        return os.path.join(self.directory, f"segment-{number:06d}.log")
+
+    def _segments(self):
+        if not os.path.isdir(self.directory):
+            return []
+        return sorted(
+            int(name[8:14])
+            for name in os.listdir(self.directory)
+            if name.startswith("segment-") and name.endswith(".log")
+        )
+
+    def _flock(self, exclusive):
+        """
+        Take the cross-process log lock: shared for appends, exclusive for compaction.
+        """
+        if self._lock_fd is None:
+            os.makedirs(self.directory, exist_ok=True)
+            self._lock_fd = os.open(os.path.join(self.directory, "LOCK"), os.O_RDWR | os.O_CREAT, 0o644)
+        if fcntl:
+            fcntl.flock(self._lock_fd, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        return self._lock_fd
+
+    def _unlock(self, fd):
+        if fcntl:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+
+    def _open_active(self):
+        """
+        Make sure ``self._fd`` is open on the newest segment.
+
+        The open descriptor is reused as long as its file has not been compacted away
+        and no newer segment has been started, so an append costs one write.
+        """
+        if (self._fd is not None and os.fstat(self._fd).st_nlink > 0
+                and not os.path.exists(self._segment_path(self._segment + 1))):
+            return self._segment
+
+        segments = self._segments()
+        number = segments[-1] if segments else 1
+        if self._fd is not None:
+            os.close(self._fd)
+        self._fd = os.open(self._segment_path(number), os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        self._segment = number
+        return number
+
+    # ---- records ----
+
+    def _encode(self, key, payload):
+        key_bytes = key.encode("utf-8")
+        body = json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        crc = zlib.crc32(key_bytes + body)
+        return self.HEADER.pack(self.MAGIC, len(body), crc, len(key_bytes)) + key_bytes + body
+
+    def _append(self, key, payload):
+        offload(self._append_now, key, payload)
+
+    def _append_now(self, key, payload):
+        record = self._encode(key, payload)
+        with self._lock:
+            lock_fd = self._flock(exclusive=False)
+            try:
+                self._open_active()
+                os.write(self._fd, record)
+                io_counters.wrote(record)
+                if self.fsync:
+                    _datasync(self._fd)
+                size = os.fstat(self._fd).st_size
+            finally:
+                self._unlock(lock_fd)
+
+            if size >= self.segment_size:
+                self._roll_over()
+
+    def _roll_over(self):
+        """
+        Seal the active segment, start a new one and compact if the log is mostly dead.
+        """
+        lock_fd = self._flock(exclusive=True)
+        try:
+            open(self._segment_path(self._segment + 1), "ab").close()
+        finally:
+            self._unlock(lock_fd)
+        self._open_active()
+        self._catch_up()
+        if self.needs_compaction():
+            self.compact()
+
+    def needs_compaction(self):
+        """
+        True when at least half the log is dead, or entries average four or more records
+        (so squashing each into one snapshot would shrink the log substantially).
+        """
+        return self._dead_bytes * 2 >= self._total_bytes or self._records >= 4 * max(len(self._index), 1)
+
+    def _scan(self, number, start):
+        """
+        Parse the records of a segment from offset ``start`` on.
+
+        Torn or corrupt records are skipped by resynchronising on the next magic
+        marker. A trailing record that is still incomplete (being appended by another
+        process) is left for the next scan.
+
+        :return: A list of (offset, key, payload bytes, record length) and the offset
+                 up to which the segment has been consumed.
+        """
+        with open(self._segment_path(number), "rb") as f:
+            f.seek(start)
+            data = f.read()
+        io_counters.read(data)
+
+        records = []
+        pos = 0
+        while pos + self.HEADER.size <= len(data):
+            magic, length, crc, key_len = self.HEADER.unpack_from(data, pos)
+            end = pos + self.HEADER.size + key_len + length
+            next_magic = data.find(self.MAGIC, pos + 1)
+            if magic == self.MAGIC and end > len(data) and next_magic == -1:
+                break
+            if magic != self.MAGIC or end > len(data) or zlib.crc32(data[pos + self.HEADER.size:end]) != crc:
+                if next_magic == -1:
+                    pos = len(data)
+                    break
+                pos = next_magic
+                continue
+            key = data[pos + self.HEADER.size:pos + self.HEADER.size + key_len].decode("utf-8")
+            records.append((start + pos, key, data[end - length:end], end - pos))
+            pos = end
+        return records, start + pos
+
+    @staticmethod
+    def _op(body):
+        """
+        Read the op of a record without decoding the whole payload (it is always written first).
+        """
+        if body.startswith(b'{"op":"'):
+            return body[7:body.index(b'"', 7)].decode("ascii")
+        return json.loads(body)["op"]
+
+    def _read_record(self, number, offset):
+        f = self._readers.get(number)
+        if f is None:
+            f = self._readers[number] = open(self._segment_path(number), "rb")
+        f.seek(offset)
+        _, length, _, key_len = self.HEADER.unpack(f.read(self.HEADER.size))
+        f.seek(key_len, os.SEEK_CUR)
+        body = f.read(length)
+        io_counters.read(body)
+        return json.loads(body)
+
+    def _catch_up(self):
+        """
+        Index records written since the last scan (by this or another process).
+        """
+        segments = self._segments()
+        if self._index is None or any(number not in segments for number in self._scanned):
+            # First use, or another process compacted the log: index from scratch.
+            for f in self._readers.values():
+                f.close()
+            self._index, self._scanned, self._readers = {}, {}, {}
+            self._dead_bytes = self._total_bytes = self._records = 0
+        for number in segments:
+            start = self._scanned.get(number, 0)
+            size = os.path.getsize(self._segment_path(number))
+            if size <= start:
+                continue
+            records, consumed = self._scan(number, start)
+            for offset, key, body, record_len in records:
+                self._total_bytes += record_len
+                self._records += 1
+                op = self._op(body)
+                positions = self._index.setdefault(key, [])
+                if op in ("create", "snapshot", "delete"):
+                    self._dead_bytes += sum(length for _, _, length in positions)
+                    positions.clear()
+                if op == "delete":
+                    self._dead_bytes += record_len
+                    del self._index[key]
+                else:
+                    positions.append((number, offset, record_len))
+            self._scanned[number] = consumed
+
+    def _state(self, key, refresh=True):
+        """
+        Replay the records of one entry into a dict, or None if it does not exist.
+        """
+        with self._lock:
+            if refresh or self._index is None:
+                self._catch_up()
+            positions = list(self._index.get(key, ()))
+            payloads = [self._read_record(number, offset) for number, offset, _ in positions]
+        state = None
+        for payload in payloads:
+            op = payload["op"]
+            if op in ("create", "snapshot"):
+                state = {field: payload[field] for field in ("title", "mood", "timestamp", "content")}
+                state["events"] = list(payload.get("events", ()))
+            elif state is None:
+                continue
+            elif op == "update":
+                for field in ("title", "mood", "content"):
+                    if field in payload:
+                        state[field] = payload[field]
+            elif op == "todo":
+                state["events"].append(payload["event"])
+            elif op == "todos":
+                state["events"].extend(payload["events"])
+        return state
+
+    # ---- storage API ----
+
+    def create(self, title, content, mood, timestamp, todos=()):
+        key = f"{self.prefix}{title.replace(' ', '_')}_{timestamp.strftime('%Y-%m-%d_%H-%M-%S')}_{uuid.uuid4().hex[:8]}"
+        self._append(key, {
+            "op": "create",
+            "title": title,
+            "mood": mood,
+            "timestamp": timestamp.isoformat(),
+            "content": content,
+            "events": [{"kind": "added", "task": task, "status": status} for task, status in todos],
+        })
+        return key
+
+    def update(self, key, title, content, mood, timestamp, rename=False):
+        payload = {"op": "update", "title": title, "mood": mood}
+        if content is not None:
+            payload["content"] = content
+        self._append(key, payload)
+        return key
+
+    def append_todo_event(self, key, event):
+        self._append(key, {"op": "todo", "event": event})
+
+    def append_todo_events(self, key, events):
+        self._append(key, {"op": "todos", "events": list(events)})
+
+    def delete(self, key):
+        self._append(key, {"op": "delete"})
+
+    def exists(self, key):
+        with self._lock:
+            self._catch_up()
+            return key in self._index
+
+    def read(self, key):
+        """
+        Render the entry as the text of its ``.txt`` file, or None if it does not exist.
+        """
+        state = offload(self._state, key)
+        if state is None:
+            return None
+        timestamp = datetime.fromisoformat(state["timestamp"])
+        text = format_entry_file(state["title"], state["content"], state["mood"], timestamp)
+        return text + "".join(format_todo_event(event) for event in state["events"])
+
+    def read_body(self, key):
+        state = offload(self._state, key)
+        return state["content"] if state is not None else None
+
+    def open(self, key):
+        """
+        The rendered entry text as an EntryContent, or None if it does not exist.
+        """
+        text = self.read(key)
+        return EntryContent(text.encode("utf-8")) if text is not None else None
+
+    def compact(self):
+        """
+        Rewrite the live entries into fresh segments and delete the old ones.
+
+        :return: (bytes before, bytes after).
+        """
+        lock_fd = self._flock(exclusive=True)
+        try:
+            with self._lock:
+                self._catch_up()
+                keys = list(self._index)
+            old_segments = self._segments()
+            before = sum(os.path.getsize(self._segment_path(n)) for n in old_segments)
+
+            # Snapshots go to segments numbered after the old ones, so a crash part way
+            # through leaves both copies and replay still ends on the snapshot.
+            number = (old_segments[-1] if old_segments else 0) + 1
+            out = open(self._segment_path(number), "wb")
+            for key in keys:
+                state = self._state(key, refresh=False)
+                if state is None:
+                    continue
+                out.write(self._encode(key, {"op": "snapshot", **state}))
+                if out.tell() >= self.segment_size:
+                    out.flush()
+                    os.fsync(out.fileno())
+                    out.close()
+                    number += 1
+                    out = open(self._segment_path(number), "wb")
+            out.flush()
+            os.fsync(out.fileno())
+            out.close()
+
+            for n in old_segments:
+                os.remove(self._segment_path(n))
+
+            with self._lock:
+                if self._fd is not None:
+                    os.close(self._fd)
+                for f in self._readers.values():
+                    f.close()
+                self._fd = self._segment = self._index = None
+                self._scanned = {}
+                self._readers = {}
+                self._dead_bytes = self._total_bytes = self._records = 0
+            after = sum(os.path.getsize(self._segment_path(n)) for n in self._segments())
+            return before, after
+        finally:
+            self._unlock(lock_fd)
+
+
+class CasStorage:
+    """
+    Content-addressed, compressed store for entry bodies.
+
+    Each distinct body is compressed (zstd when the ``zstandard`` package is installed,
+    zlib otherwise; readers detect either) and appended once to a pack file under
+    ``entries/cas/``, however many entries share it. The ``cas_blobs`` table maps a
+    body's SHA-256 to its byte range, so the whole store is a handful of files. Blob
+    rows are written in the caller's transaction: bytes appended by a transaction that
+    rolls back are simply unreferenced, and ``gc()`` reclaims them.
+    """
+    prefix = "cas:"
+    transactional = True
+    mapped = False
+
+    ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+
+    def __init__(self, directory=os.path.join("entries", "cas"), pack_size=256 * 1024 * 1024,
+                 codec=None, level=None, fsync=True):
+        self.directory = directory
+        self.pack_size = pack_size
+        self.codec = codec or ("zstd" if zstandard else "zlib")
+        if self.codec == "zstd" and zstandard is None:
+            raise ValueError("zstd compression needs the zstandard package")
+        self.level = level
+        self.fsync = fsync
+        self.dedup_hits = 0
+        self._lock = threading.RLock()
+        self._readers = {}
+
+    def _pack_path(self, number):
+        return os.path.join(self.directory, f"pack-{number:06d}.pack")
+
+    def _packs(self):
+        if not os.path.isdir(self.directory):
+            return []
+        return sorted(
+            int(name[5:11]) for name in os.listdir(self.directory)
+            if name.startswith("pack-") and name.endswith(".pack")
+        )
+
+    def _compress(self, data):
+        if self.codec == "zstd":
+            return zstandard.ZstdCompressor(level=self.level or 3).compress(data)
+        return zlib.compress(data, self.level or 6)
+
+    def _decompress(self, blob):
+        if blob.startswith(self.ZSTD_MAGIC):
+            if zstandard is None:
+                raise ValueError("This body is zstd-compressed; install the zstandard package to read it")
+            return zstandard.ZstdDecompressor().decompress(blob)
+        return zlib.decompress(blob)
+
+    def _write_blob(self, blob, number=None):
+        """
+        Append a compressed blob to the active pack (or pack ``number``).
+
+        :return: (pack number, offset).
+        """
+        with self._lock:
+            os.makedirs(self.directory, exist_ok=True)
+            if number is None:
+                packs = self._packs()
+                number = packs[-1] if packs else 1
+                if os.path.exists(self._pack_path(number)) and os.path.getsize(self._pack_path(number)) >= self.pack_size:
+                    number += 1
+            fd = os.open(self._pack_path(number), os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            try:
+                if fcntl:
+                    fcntl.flock(fd, fcntl.LOCK_EX)
+                offset = os.fstat(fd).st_size
+                os.write(fd, blob)
+                io_counters.wrote(blob)
+            finally:
+                os.close(fd)  # also releases the lock
+            return number, offset
+
+    def _mark_unsynced(self, number):
+        if self.fsync:
+            session.info.setdefault("cas_dirty", set()).add(self._pack_path(number))
+
+    def _read_blob(self, pack, offset, length):
+        with self._lock:
+            f = self._readers.get(pack)
+            if f is None:
+                f = self._readers[pack] = open(self._pack_path(pack), "rb")
+            blob = os.pread(f.fileno(), length, offset)
+        io_counters.read(blob)
+        return blob
+
+    def put(self, content):
+        """
+        Store a body unless an identical one is already stored.
+
+        :return: The SHA-256 hex digest the body is stored under.
+        """
+        data = content.encode("utf-8")
+        digest = hashlib.sha256(data).hexdigest()
+        added = session.info.setdefault("cas_added", set())  # not flushed yet
+        if digest in added:
+            self.dedup_hits += 1
+            return digest
+        # ``added`` covers the pending blobs, so there is no need to flush the session
+        # first -- which, during a bulk import, would flush the whole batch entry by entry.
+        with session.no_autoflush:
+            stored = session.execute(self.HAS_BLOB_SQL, {"digest": digest}).first()
+        if stored:
+            self.dedup_hits += 1
+            return digest
+
+        blob = self._compress(data)
+        pack, offset = offload(self._write_blob, blob)
+        self._mark_unsynced(pack)
+        session.add(CasBlob(digest=digest, pack=pack, offset=offset, length=len(blob)))
+        added.add(digest)
+        return digest
+
+    def get(self, digest):
+        """
+        Return the body stored under ``digest``, or None if there is no such blob.
+        """
+        row = session.get(CasBlob, digest)
+        if row is None:
+            return None
+        return self._decompress(offload(self._read_blob, row.pack, row.offset, row.length)).decode("utf-8")
+
+    # Prebuilt statements: these run on every entry view and every stored body, where
+    # building an ORM query costs more than executing it.
+    LOAD_SQL = text(
+        "SELECT r.title, r.mood, r.timestamp, r.events, b.pack, b.offset, b.length "
+        "FROM cas_refs r JOIN cas_blobs b ON b.digest = r.digest WHERE r.key = :key"
+    )
+    HAS_BLOB_SQL = text("SELECT 1 FROM cas_blobs WHERE digest = :digest")
+
+    def _load(self, key):
+        return session.execute(self.LOAD_SQL, {"key": key}).first()
+
+    def create(self, title, content, mood, timestamp, todos=()):
+        key = f"{self.prefix}{uuid.uuid4().hex}"
+        events = [{"kind": "added", "task": task, "status": status} for task, status in todos]
+        session.add(CasRef(
+            key=key,
+            digest=self.put(content),
+            title=title,
+            mood=mood,
+            timestamp=timestamp,
+            events=json.dumps(events, ensure_ascii=False),
+        ))
+        return key
+
+    def update(self, key, title, content, mood, timestamp, rename=False):
+        ref = session.get(CasRef, key)
+        if ref is None:
+            log.warning("Stored entry %s not found during update.", key)
+            return key
+        ref.title, ref.mood = title, mood
+        if content is not None:
+            ref.digest = self.put(content)
+        return key
+
+    def append_todo_event(self, key, event):
+        self.append_todo_events(key, [event])
+
+    def append_todo_events(self, key, events):
+        ref = session.get(CasRef, key)
+        if ref is not None:
+            ref.events = json.dumps(json.loads(ref.events) + list(events), ensure_ascii=False)
+            session.flush()
+
+    def delete(self, key):
+        """
+        Drop the entry's reference; its body stays until ``gc()`` finds it unreferenced.
+        """
+        ref = session.get(CasRef, key)
+        if ref is not None:
+            session.delete(ref)
+
+    def exists(self, key):
+        return session.get(CasRef, key) is not None
+
+    def read(self, key):
+        """
+        Render the entry as the text of its ``.txt`` file, or None if it does not exist.
+        """
+        row = self._load(key)
+        if row is None:
+            return None
+        content = self._decompress(offload(self._read_blob, row.pack, row.offset, row.length)).decode("utf-8")
+        timestamp = datetime.fromisoformat(row.timestamp)
+        text = format_entry_file(row.title, content, row.mood, timestamp)
+        return text + "".join(format_todo_event(event) for event in json.loads(row.events))
+
+    def read_body(self, key):
+        row = self._load(key)
+        if row is None:
+            return None
+        return self._decompress(offload(self._read_blob, row.pack, row.offset, row.length)).decode("utf-8")
+
+    def open(self, key):
+        """
+        The rendered entry text as an EntryContent, or None if it does not exist.
+        """
+        text = self.read(key)
+        return EntryContent(text.encode("utf-8")) if text is not None else None
+
+    def gc(self):
+        """
+        Drop bodies no entry refers to and rewrite the packs without them (or any bytes
+        left by rolled-back transactions). Run it while no other process is writing.
+
+        :return: (blobs removed, bytes freed).
+        """
+        with self._lock:
+            old_packs = self._packs()
+            before = sum(os.path.getsize(self._pack_path(n)) for n in old_packs)
+            referenced = session.query(CasRef.digest).distinct().subquery()
+            removed = session.query(CasBlob).filter(~CasBlob.digest.in_(referenced.select())).delete(
+                synchronize_session=False)
+
+            number = (old_packs[-1] if old_packs else 0) + 1
+            for blob in session.query(CasBlob).order_by(CasBlob.pack, CasBlob.offset).all():
+                data = self._read_blob(blob.pack, blob.offset, blob.length)
+                if os.path.exists(self._pack_path(number)) and os.path.getsize(self._pack_path(number)) >= self.pack_size:
+                    number += 1
+                blob.pack, blob.offset = self._write_blob(data, number)
+                self._mark_unsynced(number)
+            session.commit()
+
+            for f in self._readers.values():
+                f.close()
+            self._readers = {}
+            for n in old_packs:
+                os.remove(self._pack_path(n))
+            after = sum(os.path.getsize(self._pack_path(n)) for n in self._packs())
+            return removed, before - after
+
+
+@event.listens_for(Session, "before_commit")
+def _sync_packs(sess):
+    # One fsync per pack per transaction, before the rows pointing into it commit.
+    sess.info.pop("cas_added", None)
+    dirty = sess.info.pop("cas_dirty", None)
+    if dirty:
+        offload(_sync_files, dirty, sess=sess)
+
+
+def _sync_files(paths):
+    for path in paths:
+        fd = os.open(path, os.O_RDONLY)
+        try:
+            _datasync(fd)
+        finally:
+            os.close(fd)
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_packs(sess):
+    sess.info.pop("cas_added", None)
+    sess.info.pop("cas_dirty", None)
+
+
+_file_storage = FileStorage()
+_cas_storage = CasStorage()
+
+
+BACKENDS = {"file": FileStorage.prefix, "log": LogStorage.prefix, "cas": CasStorage.prefix}
+
+
+def get_backend(name):
+    """
+    Return the backend called ``name`` (``file``, ``log`` or ``cas``).
+    """
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown storage backend: {name}")
+    return get_storage(BACKENDS[name])
+
+
+def get_storage(key=None):
+    """
+    Return the backend that owns ``key``, or the configured default for new entries.
+    """
+    if key is None:
+        key = BACKENDS.get(storage_backend, "")
+    if key.startswith(LogStorage.prefix):
+        return LogStorage.default()
+    if key.startswith(CasStorage.prefix):
+        return _cas_storage
+    return _file_storage
@@ -0,0 +1,190 @@
+"""
+Incremental maintenance of the ``daily_summary`` table.
+
+The entry and to-do operations call ``record_entry``/``record_todo``/``change_mood`` in
+the same transaction as their own changes, so the per-day totals commit (or roll back)
+together with the rows they describe. ``rebuild`` recomputes the table from scratch and
+``check`` compares it against a fresh computation.
+"""
+from sqlalchemy import inspect, text
+from init import session
+from models.daily_summary import DailySummary
+
+SUMMARY_TABLE = DailySummary.__tablename__
+
+COUNTERS = ["entries", "mood_sum", "mood_count", "mood_1", "mood_2", "mood_3", "mood_4", "mood_5",
+            "todos_created", "todos_done"]
+
+UPSERT_SQL = (
+    f"INSERT INTO {SUMMARY_TABLE} (day, {', '.join(COUNTERS)}) "
+    f"VALUES (:day, {', '.join(':' + c for c in COUNTERS)}) "
+    "ON CONFLICT (day) DO UPDATE SET " + ", ".join(f"{c} = {c} + excluded.{c}" for c in COUNTERS)
+)
+
+# The per-day totals computed from the entries and todos tables.
+COMPUTE_SQL = (
+    "SELECT substr(e.timestamp, 1, 10) AS day, COUNT(*) AS entries, "
+    "COALESCE(SUM(e.mood), 0) AS mood_sum, COUNT(e.mood) AS mood_count, "
+    + "".join(f"COUNT(CASE WHEN e.mood = {m} THEN 1 END) AS mood_{m}, " for m in range(1, 6)) +
+    "COALESCE(SUM(t.todos), 0) AS todos_created, COALESCE(SUM(t.done), 0) AS todos_done "
+    "FROM entries e LEFT JOIN ("
+    "  SELECT entry_id, COUNT(*) AS todos, SUM(status = 'done') AS done FROM todos GROUP BY entry_id"
+    ") t ON t.entry_id = e.id "
+    "GROUP BY day"
+)
+
+_table_ready = False
+
+
+def day_of(timestamp):
+    """
+    The summary day of an entry timestamp; matches ``substr(timestamp, 1, 10)`` in SQL.
+    """
+    return timestamp.strftime("%Y-%m-%d")
+
+
+def ensure_table(conn=None):
+    """
+    Create the summary table if it does not exist, filling it from the existing entries.
+    """
+    global _table_ready
+    if _table_ready:
+        return
+    conn = conn or session.connection()
+    if not inspect(conn).has_table(SUMMARY_TABLE):
+        rebuild(conn)
+    _table_ready = True
+
+
+def _apply(day, deltas):
+    _apply_many({day: dict(dict.fromkeys(COUNTERS, 0), **deltas)})
+
+
+def _mood_deltas(mood, sign):
+    if mood is None:
+        return {}
+    return {"mood_sum": sign * mood, "mood_count": sign, f"mood_{mood}": sign}
+
+
+def record_entry(timestamp, mood, sign=1, todos=0, done=0):
+    """
+    Count an entry in (``sign=1``) or out of (``sign=-1``) the totals of its day.
+
+    :param todos: To-dos of the entry to count along with it, ``done`` of them done.
+    """
+    deltas = {"entries": sign, "todos_created": sign * todos, "todos_done": sign * done}
+    deltas.update(_mood_deltas(mood, sign))
+    _apply(day_of(timestamp), deltas)
+
+
+def change_mood(timestamp, old, new):
+    """
+    Move an entry from mood ``old`` to mood ``new`` (either may be None).
+    """
+    if old == new:
+        return
+    deltas = _mood_deltas(new, 1)
+    for column, value in _mood_deltas(old, -1).items():
+        deltas[column] = deltas.get(column, 0) + value
+    _apply(day_of(timestamp), deltas)
+
+
+def record_todo(timestamp, status, sign=1):
+    """
+    Count a to-do in or out of the totals of its entry's day.
+
+    :param timestamp: Timestamp of the entry the to-do belongs to.
+    """
+    _apply(day_of(timestamp), {"todos_created": sign, "todos_done": sign * (status == "done")})
+
+
+def _apply_many(days):
+    """
+    Apply per-day deltas in one batch.
+
+    :param days: A dict mapping days to dicts of deltas for every counter.
+    """
+    if not days:
+        return
+    ensure_table()
+    session.execute(text(UPSERT_SQL), [dict(deltas, day=day) for day, deltas in days.items()])
+    emptied = [{"day": day} for day, deltas in days.items() if any(value < 0 for value in deltas.values())]
+    if emptied:
+        session.execute(
+            text(f"DELETE FROM {SUMMARY_TABLE} WHERE day = :day AND entries <= 0 AND todos_created <= 0"),
+            emptied,
+        )
+
+
+def record_many(rows):
+    """
+    Add the totals of newly inserted entries, e.g. a bulk import batch.
+
+    :param rows: (timestamp, mood, todos, done) tuples, one per entry.
+    """
+    days = {}
+    for timestamp, mood, todos, done in rows:
+        deltas = days.setdefault(day_of(timestamp), dict.fromkeys(COUNTERS, 0))
+        deltas["entries"] += 1
+        deltas["todos_created"] += todos
+        deltas["todos_done"] += done
+        for column, value in _mood_deltas(mood, 1).items():
+            deltas[column] += value
+    _apply_many(days)
+
+
+def record_todo_changes(changes):
+    """
+    Apply the to-do count changes of a bulk operation, one statement for all days.
+
+    :param changes: (entry timestamp, to-dos delta, done delta) tuples.
+    """
+    days = {}
+    for timestamp, todos, done in changes:
+        deltas = days.setdefault(day_of(timestamp), dict.fromkeys(COUNTERS, 0))
+        deltas["todos_created"] += todos
+        deltas["todos_done"] += done
+    _apply_many(days)
+
+
+def rebuild(conn=None):
+    """
+    Recompute the whole summary table from the entries and todos tables.
+
+    :param conn: Connection to run on, left for the caller to commit. By default the
+        session's connection is used and the session is committed.
+    :return: The number of days summarised.
+    """
+    global _table_ready
+    target = conn or session.connection()
+    DailySummary.__table__.create(target, checkfirst=True)
+    _table_ready = True
+    target.execute(text(f"DELETE FROM {SUMMARY_TABLE}"))
+    target.execute(text(f"INSERT INTO {SUMMARY_TABLE} (day, {', '.join(COUNTERS)}) "
+                        f"SELECT day, {', '.join(COUNTERS)} FROM ({COMPUTE_SQL})"))
+    days = target.execute(text(f"SELECT COUNT(*) FROM {SUMMARY_TABLE}")).scalar()
+    if conn is None:
+        session.commit()
+    return days
+
+
+def check():
+    """
+    Compare the summary table with totals computed from scratch.
+
+    :return: A list of mismatching days as dicts with ``day``, ``expected`` and ``actual``
+        (None for a missing or surplus row). Empty if the table is consistent.
+    """
+    ensure_table()
+    columns = ", ".join(COUNTERS)
+    expected = {row[0]: tuple(row[1:]) for row in session.execute(text(f"SELECT day, {columns} FROM ({COMPUTE_SQL})"))}
+    actual = {row[0]: tuple(row[1:]) for row in session.execute(text(f"SELECT day, {columns} FROM {SUMMARY_TABLE}"))}
+    problems = []
+    for day in sorted(expected.keys() | actual.keys()):
+        if expected.get(day) != actual.get(day):
+            problems.append({
+                "day": day,
+                "expected": dict(zip(COUNTERS, expected[day])) if day in expected else None,
+                "actual": dict(zip(COUNTERS, actual[day])) if day in actual else None,
+            })
+    return problems
@@ -0,0 +1,319 @@
+"""
+Incremental sync between journal instances over the change feed (see changelog.py).
+
+Two journals sync by swapping bundles: a header line followed by the changes the
+other side has not seen, as JSON lines. Each journal remembers, per peer, the last
+``seq`` of the peer's feed it has applied (``seen``) and the last ``seq`` of its own
+feed the peer has confirmed (``acked``); every header carries the sender's ``seen``
+for the receiver, which becomes the receiver's ``acked``. A bundle therefore holds
+only the changes made since the previous exchange, and building it is one range
+scan of the ``changes`` table, whatever the size of the journal.
+
+Conflicts are resolved per field on the change time: each field a received change
+sets (an entry's title, mood or content; a to-do as a whole) is applied only if the
+change is newer than the latest change logged here that set that field (ties go to
+the higher node ID), and a deletion only if it is newer than all of them. Edits of
+different fields on two sides are therefore both kept, and both sides converge
+whatever order bundles arrive in. Applying a change twice is harmless, which makes
+re-sending a bundle safe.
+
+Bundles travel as files (``export``/``import``) or over a TCP connection (``serve``
+on one machine, ``connect`` from the other), which exchanges both directions at once.
+"""
+import json
+import socket
+from datetime import datetime
+from sqlalchemy import select
+from init import session
+from models.change import Change, SyncState
+from models.entry import Entry, UNCHANGED
+from models.todo import Todo
+import changelog
+
+DEFAULT_PORT = 8765
+BATCH_SIZE = 1000
+
+
+def _get(key, default=0):
+    state = session.get(SyncState, key)
+    return int(state.value) if state else default
+
+
+def _raise(key, value):
+    """
+    Store ``value`` under ``key`` unless a higher number is already stored.
+    """
+    state = session.get(SyncState, key)
+    if state is None:
+        session.add(SyncState(key=key, value=str(value)))
+    elif int(state.value) < value:
+        state.value = str(value)
+
+
+def status(peer=None):
+    """
+    :return: This journal's node ID and feed position, and for ``peer`` how far each
+        side has seen the other's feed.
+    """
+    result = {"node": changelog.node_id(), "last_seq": changelog.last_seq()}
+    if peer:
+        result.update(peer=peer, seen=_get(f"seen:{peer}"), acked=_get(f"acked:{peer}"))
+    session.commit()
+    return result
+
+
+def outgoing(peer=None):
+    """
+    The bundle for ``peer``: the changes after the last one it confirmed, except its own.
+
+    :return: (header dict, iterator of change dicts).
+    """
+    since = _get(f"acked:{peer}") if peer else 0
+    header = {"node": changelog.node_id(), "since": since, "last_seq": changelog.last_seq(),
+              "seen": _get(f"seen:{peer}") if peer else 0}
+    session.commit()
+
+    def changes():
+        query = select(Change).where(Change.seq > since, Change.seq <= header["last_seq"]).order_by(Change.seq)
+        if peer:
+            query = query.where(Change.origin != peer)
+        for change in session.scalars(query.execution_options(yield_per=BATCH_SIZE)):
+            yield {"origin": change.origin, "kind": change.kind, "uid": change.uid, "op": change.op,
+                   "changed_at": change.changed_at.isoformat(),
+                   "data": json.loads(change.data) if change.data is not None else None}
+        session.commit()
+
+    return header, changes()
+
+
+ENTRY_FIELDS = ("title", "mood", "content")
+
+
+def _fields(kind, data):
+    """
+    The fields a change sets: those an entry update lists as changed, otherwise all of
+    them (a new entry, a deletion, a whole to-do).
+    """
+    if kind == "todo":
+        return ("todo",)
+    if data is not None and "changed" in data:
+        return tuple(data["changed"])
+    return ENTRY_FIELDS
+
+
+def _newer_fields(change, changed_at):
+    """
+    :return: The fields of ``change`` that are newer here than the latest logged
+        change setting each of them.
+    """
+    fields = _fields(change["kind"], change["data"])
+    latest = {}
+    rows = session.execute(
+        select(Change.changed_at, Change.origin, Change.data)
+        .where(Change.kind == change["kind"], Change.uid == change["uid"])
+    )
+    for logged_at, origin, data in rows:
+        for field in _fields(change["kind"], json.loads(data) if data is not None else None):
+            if field not in latest or (logged_at, origin) > latest[field]:
+                latest[field] = (logged_at, origin)
+    stamp = (changed_at, change["origin"])
+    return [field for field in fields if field not in latest or stamp > latest[field]]
+
+
+def _apply_entry(uid, data, fields):
+    entry = session.query(Entry).filter_by(uid=uid).first()
+    if data is None:
+        if entry:
+            Entry.delete_entry(entry.id)
+    elif entry is None:
+        Entry.add_entry(data["title"], data["content"], data["mood"],
+                        timestamp=datetime.fromisoformat(data["timestamp"]), uid=uid)
+    else:
+        # Only the fields that won: a title change must not rewrite the content
+        Entry.update_entry(entry.id,
+                           title=data["title"] if "title" in fields else None,
+                           content=data["content"] if "content" in fields else None,
+                           mood=data["mood"] if "mood" in fields else UNCHANGED)
+
+
+def _todo_entry(data):
+    """
+    The local entry a to-do change belongs to, or None if it is not here.
+    """
+    if not data["entry_uid"]:
+        return None
+    return session.query(Entry).filter_by(uid=data["entry_uid"]).first()
+
+
+def _apply_todo(uid, data, entry):
+    todo = session.query(Todo).filter_by(uid=uid).first()
+    if data is None:
+        if todo:
+            Todo.delete_todo(todo.id)
+    elif todo is None:
+        Todo.add_todo(data["task"], entry.id, status=data["status"], uid=uid)
+    else:
+        Todo.update_todo(todo.id, task=data["task"], status=data["status"], entry_id=entry.id)
+
+
+def apply_change(change):
+    """
+    Apply the fields of one received change that are newer than what this journal has
+    for them, and log it (with its origin and time) so that it is passed on to other peers.
+
+    :return: ``"applied"``; ``"skipped"`` if the local version won; or ``"conflict"``
+        for a to-do whose entry was deleted here, which is neither applied nor logged.
+    """
+    if change["origin"] == changelog.node_id():
+        return "skipped"
+    changed_at = datetime.fromisoformat(change["changed_at"])
+    data = change["data"]
+    fields = _newer_fields(change, changed_at)
+    # An update applies the fields it won; a deletion must win them all
+    if not fields or (data is None and len(fields) < len(_fields(change["kind"], None))):
+        return "skipped"
+    entry = None
+    if change["kind"] == "todo" and data is not None:
+        entry = _todo_entry(data)
+        if entry is None:
+            session.commit()
+            return "conflict"
+    session.add(Change(origin=change["origin"], kind=change["kind"], uid=change["uid"], op=change["op"],
+                       changed_at=changed_at,
+                       data=json.dumps(data, ensure_ascii=False) if data is not None else None))
+    with changelog.replaying():
+        if change["kind"] == "entry":
+            _apply_entry(change["uid"], data, fields)
+        else:
+            _apply_todo(change["uid"], data, entry)
+    session.commit()
+    return "applied"
+
+
+def incoming(header, changes):
+    """
+    Apply a bundle from a peer and remember how far the two feeds have been exchanged.
+
+    :return: A dict with the peer and the counts of applied and skipped changes, and of
+        conflicts (to-do changes for entries deleted here).
+    """
+    peer = header["node"]
+    result = {"peer": peer, "received": 0, "applied": 0, "skipped": 0, "conflict": 0}
+    for change in changes:
+        result["received"] += 1
+        result[apply_change(change)] += 1
+    _raise(f"seen:{peer}", header["last_seq"])
+    _raise(f"acked:{peer}", header["seen"])
+    session.commit()
+    return result
+
+
+# ======== TRANSPORTS ========
+
+def _write_bundle(stream, header, changes):
+    stream.write((json.dumps(header) + "\n").encode("utf-8"))
+    count = 0
+    for change in changes:
+        stream.write((json.dumps(change, ensure_ascii=False) + "\n").encode("utf-8"))
+        count += 1
+    stream.write((json.dumps({"end": count}) + "\n").encode("utf-8"))
+    stream.flush()
+    return count
+
+
+def _read_bundle(stream):
+    """
+    :return: (header dict, iterator of change dicts); the iterator stops at the end marker.
+    """
+    line = stream.readline()
+    if not line:
+        raise ValueError("The sync bundle is empty.")
+    header = json.loads(line)
+
+    def changes():
+        for line in iter(stream.readline, b""):
+            record = json.loads(line)
+            if "end" in record:
+                return
+            yield record
+        raise ValueError("The sync bundle was cut short.")
+
+    return header, changes()
+
+
+def export_bundle(path, peer=None):
+    """
+    Write the changes ``peer`` has not confirmed (all of them without a peer) to a file.
+    """
+    header, changes = outgoing(peer)
+    with open(path, "wb") as f:
+        count = _write_bundle(f, header, changes)
+    return {"path": path, "changes": count, "since": header["since"], "last_seq": header["last_seq"]}
+
+
+def import_bundle(path):
+    """
+    Apply a bundle file written by ``export_bundle`` on another journal.
+    """
+    with open(path, "rb") as f:
+        header, changes = _read_bundle(f)
+        return incoming(header, changes)
+
+
+def _exchange(stream, initiator):
+    """
+    Swap bundles over a connection: the initiator sends first, then receives the
+    reply, which already reflects what the other side has just applied.
+    """
+    mine = changelog.node_id()
+    session.commit()
+    if initiator:
+        stream.write((json.dumps({"node": mine}) + "\n").encode("utf-8"))
+        stream.flush()
+    peer = json.loads(stream.readline())["node"]
+    if not initiator:
+        stream.write((json.dumps({"node": mine}) + "\n").encode("utf-8"))
+        stream.flush()
+
+    if initiator:
+        sent = _write_bundle(stream, *outgoing(peer))
+        received = incoming(*_read_bundle(stream))
+    else:
+        received = incoming(*_read_bundle(stream))
+        sent = _write_bundle(stream, *outgoing(peer))
+    return dict(received, sent=sent)
+
+
+def connect(address, timeout=60):
+    """
+    Sync with a journal running ``serve`` at ``host:port``, in both directions.
+    """
+    host, _, port = address.rpartition(":")
+    with socket.create_connection((host or "localhost", int(port or DEFAULT_PORT)), timeout=timeout) as sock:
+        with sock.makefile("rwb") as stream:
+            return _exchange(stream, initiator=True)
+
+
+def serve(host="127.0.0.1", port=DEFAULT_PORT, once=False):
+    """
+    Accept sync connections from peers, one at a time.
+
+    :param once: Return after the first sync instead of serving forever.
+    """
+    with socket.create_server((host, port)) as server:
+        print(f"Serving sync on {host}:{port} as node {changelog.node_id()}")
+        session.commit()
+        result = None
+        while True:
+            conn, address = server.accept()
+            with conn, conn.makefile("rwb") as stream:
+                try:
+                    result = _exchange(stream, initiator=False)
+                    print(f"Synced with {result['peer']} at {address[0]}: "
+                          f"{result['applied']} applied, {result['skipped']} skipped, {result['conflict']} conflicts, "
+                          f"{result['sent']} sent")
+                except (OSError, ValueError) as e:
+                    session.rollback()
+                    print(f"Sync with {address[0]} failed: {e}")
+            if once:
+                return result
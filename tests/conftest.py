@@ -0,0 +1,55 @@
+"""
+Every test runs against a fresh journal: an empty database and ``entries/`` folder in
+a temporary directory.
+"""
+import os
+import sys
+import tempfile
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# init.py reads these on import, so they are set before any journal module is imported.
+DB_PATH = os.path.join(tempfile.mkdtemp(prefix="journal-tests-"), "journal.db")
+os.environ["JOURNAL_DB_URL"] = "sqlite:///" + DB_PATH
+os.environ["JOURNAL_STORAGE"] = "file"
+
+
+@pytest.fixture(autouse=True)
+def journal(tmp_path, monkeypatch):
+    """
+    Start each test on an empty, migrated database with empty caches, in ``tmp_path``.
+    """
+    from init import engine, session
+    from storage import CasStorage, FileStorage, LogStorage
+    import storage
+    import cache
+    import changelog
+    import fuzzy
+    import migrate
+    import search
+    import summary
+
+    monkeypatch.chdir(tmp_path)
+    session.remove()
+    engine.dispose()
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(DB_PATH + suffix):
+            os.remove(DB_PATH + suffix)
+
+    # Forget what the modules learnt about the previous test's database
+    changelog._node_id = None
+    fuzzy._ready.clear()
+    search._index_ready = False
+    summary._table_ready = False
+    FileStorage._recovered = False
+    # The log and pack backends keep files of the previous test's directory open
+    monkeypatch.setattr(LogStorage, "_default", None)
+    monkeypatch.setattr(storage, "_cas_storage", CasStorage())
+    cache.entry_cache.clear()
+    cache.content_cache.clear()
+
+    migrate.upgrade()
+    yield tmp_path
+    session.remove()
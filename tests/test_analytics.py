@@ -0,0 +1,50 @@
+from datetime import date, datetime
+
+import pytest
+
+import analytics
+from models.entry import Entry
+
+
+@pytest.fixture(autouse=True)
+def entries():
+    for timestamp, mood in [
+        ("2024-03-01T08:00:00", 2), ("2024-03-01T21:00:00", 4),
+        ("2024-03-02T08:00:00", 5), ("2024-03-02T09:00:00", None),
+        ("2024-03-04T23:30:00", 1),
+        ("2024-03-10T07:00:00", 4),
+    ]:
+        Entry.add_entry("Day", "Text", mood, timestamp=datetime.fromisoformat(timestamp))
+
+
+def test_daily_moods():
+    rows = analytics.daily_moods(window=3)
+    assert [(row["day"], row["entries"], row["rated"], row["min_mood"], row["max_mood"], row["avg_mood"],
+             row["rolling_avg"]) for row in rows] == [
+        ("2024-03-01", 2, 2, 2, 4, 3.0, 3.0),
+        ("2024-03-02", 2, 1, 5, 5, 5.0, 3.667),
+        ("2024-03-04", 1, 1, 1, 1, 1.0, 3.0),  # 03-02 to 03-04
+        ("2024-03-10", 1, 1, 4, 4, 4.0, 4.0),
+    ]
+    assert [row["day"] for row in analytics.daily_moods(start="2024-03-02", end="2024-03-04")] == [
+        "2024-03-02", "2024-03-04"]
+
+
+def test_streaks():
+    result = analytics.streaks(good_mood=4, today=date(2024, 3, 11))
+    assert result["journaling"] == {
+        "longest": {"days": 2, "start": "2024-03-01", "end": "2024-03-02"},
+        "current": {"days": 1, "start": "2024-03-10", "end": "2024-03-10"},
+    }
+    assert result["good_mood"]["longest"] == {"days": 1, "start": "2024-03-02", "end": "2024-03-02"}
+    assert analytics.streaks(today=date(2024, 3, 12))["journaling"]["current"]["days"] == 0
+
+
+def test_streaks_count_today_in_utc(monkeypatch):
+    class Clock(datetime):
+        @classmethod
+        def utcnow(cls):
+            return datetime(2024, 3, 11, 0, 30)  # local clocks may be on another date
+
+    monkeypatch.setattr(analytics, "datetime", Clock)
+    assert analytics.streaks()["journaling"]["current"]["end"] == "2024-03-10"
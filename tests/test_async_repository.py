@@ -0,0 +1,73 @@
+import asyncio
+
+from async_repository import AsyncJournal
+
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+
+async def _with_journal(fn):
+    journal = AsyncJournal()
+    try:
+        return await fn(journal)
+    finally:
+        await journal.close()
+
+
+def test_entries_round_trip():
+    async def scenario(journal):
+        entry = await journal.entries.add_entry("Morning run", "Ran along the river", mood=4)
+        await journal.entries.add_entry("Evening", "Read a book", mood=3)
+
+        found = await journal.entries.find_by_id(entry.id)
+        assert (found.title, found.mood) == ("Morning run", 4)
+        assert "Ran along the river" in await journal.entries.get_content(entry.id)
+        assert [e.title for e, _, _ in await journal.entries.search("river")] == ["Morning run"]
+
+        await journal.entries.update_entry(entry.id, title="Morning swim", mood=5)
+        found = await journal.entries.find_by_id(entry.id)
+        assert (found.title, found.mood) == ("Morning swim", 5)
+        assert "Title     : Morning swim" in await journal.entries.get_content(entry.id)
+
+        titles = [e.title async for e in journal.entries.iter_entries(batch_size=1)]
+        assert sorted(titles) == ["Evening", "Morning swim"]
+
+        await journal.entries.delete_entry(entry.id)
+        assert not await journal.entries.exists(entry.id)
+        assert await journal.entries.get_content(entry.id) is None
+
+    run(_with_journal(scenario))
+
+
+def test_todos_round_trip():
+    async def scenario(journal):
+        entry = await journal.entries.add_entry("Chores", "Things to do", mood=2)
+        todo = await journal.todos.add_todo("Buy milk", entry.id)
+        await journal.todos.add_todo("Walk the dog", entry.id)
+
+        assert [t.task for t in await journal.entries.get_todos(entry.id)] == ["Buy milk", "Walk the dog"]
+
+        await journal.todos.update_todo(todo.id, status="done")
+        assert (await journal.todos.find_by_id(todo.id)).status == "done"
+        assert "Buy milk" in await journal.entries.get_content(entry.id)
+
+        tasks = [t.task async for t in journal.todos.iter_todos(batch_size=1)]
+        assert tasks == ["Buy milk", "Walk the dog"]
+
+        await journal.todos.delete_todo(todo.id)
+        assert await journal.todos.find_by_id(todo.id) is None
+        assert [t.task for t in await journal.todos.get_all_todos()] == ["Walk the dog"]
+
+    run(_with_journal(scenario))
+
+
+def test_concurrent_writes():
+    async def scenario(journal):
+        entries = await asyncio.gather(*[
+            journal.entries.add_entry(f"Entry {i}", f"Text {i}", mood=i % 5 + 1) for i in range(20)
+        ])
+        assert len({entry.id for entry in entries}) == 20
+        assert len(await journal.entries.get_all_entries()) == 20
+
+    run(_with_journal(scenario))
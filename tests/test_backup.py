@@ -0,0 +1,79 @@
+import os
+import sqlite3
+
+import pytest
+
+from conftest import DB_PATH
+from init import session
+from models.entry import Entry
+import backup
+
+
+def _titles(db_path):
+    connection = sqlite3.connect(db_path)
+    try:
+        return sorted(title for (title,) in connection.execute("SELECT title FROM entries"))
+    finally:
+        connection.close()
+
+
+@pytest.fixture
+def snapshot():
+    Entry.add_entry("Morning", "Went for a run", mood=4)
+    Entry.add_entry("Evening", "Read a book", mood=3)
+    session.remove()
+    return backup.backup()["snapshot"]
+
+
+def test_restore_into_another_directory(snapshot, tmp_path):
+    stats = backup.restore(snapshot, target=str(tmp_path / "copy"))
+    assert stats["files"] == 2
+    # Named like the database that was backed up
+    assert _titles(str(tmp_path / "copy" / os.path.basename(DB_PATH))) == ["Evening", "Morning"]
+    assert sorted(os.listdir(tmp_path / "copy" / "entries")) == sorted(os.listdir("entries"))
+
+
+def test_second_snapshot_stores_only_changed_files(snapshot):
+    Entry.add_entry("Night", "Slept", mood=2)
+    session.remove()
+    stats = backup.backup()
+    assert (stats["files"], stats["stored"]) == (3, 1)
+
+
+def test_restore_replaces_the_configured_database(snapshot):
+    Entry.add_entry("Night", "Slept", mood=2)
+    session.remove()
+
+    backup.restore(snapshot, force=True)
+
+    assert _titles(DB_PATH) == ["Evening", "Morning"]
+    assert not os.path.exists(backup.DB_FILE)
+    assert len(os.listdir("entries")) == 2
+    assert sorted(entry.title for entry in Entry.get_all_entries()) == ["Evening", "Morning"]
+
+
+def test_failed_swap_keeps_the_journal(snapshot, monkeypatch):
+    Entry.add_entry("Night", "Slept", mood=2)
+    session.remove()
+    files = sorted(os.listdir("entries"))
+
+    replace = os.replace
+
+    def fail_on_database(source, destination):
+        if source.endswith(".restore"):
+            raise OSError("disk full")
+        replace(source, destination)
+    monkeypatch.setattr(os, "replace", fail_on_database)
+
+    with pytest.raises(OSError):
+        backup.restore(snapshot, force=True)
+
+    assert _titles(DB_PATH) == ["Evening", "Morning", "Night"]
+    assert sorted(os.listdir("entries")) == files
+    assert not [name for name in os.listdir(".") if "restore" in name]
+    assert not [name for name in os.listdir(os.path.dirname(DB_PATH)) if "restore" in name]
+
+
+def test_restore_refuses_to_overwrite_without_force(snapshot):
+    with pytest.raises(ValueError):
+        backup.restore(snapshot)
@@ -0,0 +1,78 @@
+import cache
+import helpers
+from init import session
+from instrumentation import count_queries
+from models.entry import Entry
+from models.todo import Todo
+
+
+def content(entry_id):
+    return Entry.get_content(Entry.info(entry_id))
+
+
+def test_todo_changes_invalidate_cached_content():
+    # IDs typed into the menu arrive as strings; the cache is keyed by int
+    first = Entry.add_entry("Chores", "Things to do", mood=3).id
+    second = Entry.add_entry("Errands", "More things", mood=3).id
+    assert "Buy milk" not in content(first)
+
+    todo = Todo.add_todo("Buy milk", str(first))
+    assert "Buy milk" in content(first)
+
+    Todo.update_todo(todo.id, status="done")
+    assert "Status : Done" in content(first)
+
+    assert "Buy milk" not in content(second)
+    Todo.update_todo(todo.id, entry_id=str(second))
+    assert "Buy milk" in content(second)
+
+    Todo.delete_todo(todo.id)
+    assert "Deleted" in content(second)
+
+    Todo.add_todo("Post letter", first)
+    Todo.bulk_update_status("done", entry_id=first)
+    assert content(first).count("Status : Done") >= 2
+
+
+def test_entry_changes_invalidate_both_caches():
+    entry_id = Entry.add_entry("Morning", "Went for a run", mood=3).id
+    assert Entry.info(str(entry_id)).mood == 3
+    assert "Went for a run" in content(entry_id)
+
+    Entry.update_entry(entry_id, mood=5, content="Went for a swim")
+    assert Entry.info(entry_id).mood == 5
+    assert "Went for a swim" in content(entry_id)
+
+    Entry.delete_entry(entry_id)
+    assert Entry.info(entry_id) is None
+    assert cache.content_cache.get(entry_id) is None
+
+
+def test_viewer_serves_rendered_content_from_the_cache(monkeypatch, capsys):
+    monkeypatch.setattr("storage.storage_backend", "cas")
+    entry_id = Entry.add_entry("Morning", "Went for a run", mood=3).id
+    session.remove()
+    cache.entry_cache.clear()
+    cache.content_cache.clear()
+
+    def view():
+        monkeypatch.setattr("builtins.input", lambda prompt="": str(entry_id))
+        helpers.view_entry_details()
+        return capsys.readouterr().out
+
+    def lookups():
+        return [(c.hits, c.misses) for c in (cache.entry_cache, cache.content_cache)]
+
+    before = lookups()
+    with count_queries() as first:
+        assert "Went for a run" in view()
+    after = lookups()
+    assert [(hits - h, misses - m) for (hits, misses), (h, m) in zip(after, before)] == [(0, 1), (0, 1)]
+
+    with count_queries() as again:
+        assert "Went for a run" in view()
+    assert [(hits - h, misses - m) for (hits, misses), (h, m) in zip(lookups(), after)] == [(1, 0), (1, 0)]
+    assert again.count == 0 < first.count
+
+    Entry.update_entry(entry_id, content="Went for a swim")
+    assert "Went for a swim" in view()
@@ -0,0 +1,149 @@
+"""
+Crash-consistency of entry file writes.
+
+For every write operation and every crash point, runs the operation in a child process
+that is killed (``os._exit``) at that point, then runs ``fsck --repair`` and checks that
+the database and the ``entries/`` directory agree again:
+
+* every entry row has its file, and the file's content matches the search index;
+* no ``.tmp`` files, orphan files or pending file intents are left behind.
+
+The crash is injected by patching the storage module in the child process.
+"""
+import json
+import os
+import shutil
+import subprocess
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CLI = os.path.join(ROOT, "cli.py")
+
+CRASH_POINTS = [None, "before_commit", "mid_apply", "after_commit"]
+
+OPERATIONS = {
+    "add": ["add", "--title", "Second entry", "--mood", "3", "--content", "Brand new text"],
+    "update-content": ["update", "1", "--content", "Rewritten text"],
+    "update-title": ["update", "1", "--title", "Renamed entry"],
+    "update-mood": ["update", "1", "--mood", "1"],
+    "delete": ["delete", "1"],
+    "add-todo": ["todo", "add", "1", "Water the plants"],
+}
+# Operations that append to the entry file in place, staging no file operations to crash in
+APPENDS = {"add-todo"}
+SCENARIOS = [(operation, crash_at) for operation in OPERATIONS for crash_at in CRASH_POINTS
+             if crash_at is None or operation not in APPENDS]
+
+# Runs a CLI command, killing the process at the crash point given as the first argument
+CRASH = """
+import os
+import sys
+import storage
+
+
+def crash(*args):
+    os._exit(137)
+
+
+point = sys.argv[1]
+if point == "before_commit":
+    # Once the file writes are staged, before the transaction recording them commits
+    from sqlalchemy import event
+    from sqlalchemy.orm import Session
+    event.listen(Session, "before_commit", lambda sess: sess.info.get("file_ops") and crash())
+elif point == "after_commit":
+    # After the commit, before any staged file is moved into place
+    storage._apply_file_ops = crash
+elif point == "mid_apply":
+    # After the first staged file operation
+    apply_file_op = storage.apply_file_op
+
+    def apply_then_crash(op, source, target):
+        apply_file_op(op, source, target)
+        crash()
+
+    storage.apply_file_op = apply_then_crash
+
+import cli
+sys.exit(cli.main(sys.argv[2:]))
+"""
+
+# Runs ``fsck --repair``, then prints the problems still left as a JSON list
+REPAIR_AND_VERIFY = """
+import json, os, sys
+import cli
+if cli.main(["fsck", "--repair"]):
+    sys.exit("fsck --repair failed")
+
+from init import session
+from sqlalchemy import text
+from models.entry import Entry
+from models.todo import Todo
+from models.file_intent import FileIntent
+from entry_format import parse_entry_body
+import search
+
+problems = []
+paths = set()
+for entry in session.query(Entry):
+    paths.add(os.path.normpath(entry.content_path))
+    if not os.path.exists(entry.content_path):
+        problems.append(f"entry {entry.id}: file missing")
+        continue
+    with open(entry.content_path, encoding="utf-8") as f:
+        body = parse_entry_body(f.read())
+    indexed = session.execute(
+        text(f"SELECT content FROM {search.FTS_TABLE} WHERE rowid = :id"), {"id": entry.id}).scalar()
+    if indexed is not None and body != indexed:
+        problems.append(f"entry {entry.id}: file has {body!r}, database has {indexed!r}")
+for name in os.listdir("entries"):
+    path = os.path.join("entries", name)
+    if not os.path.isfile(path):
+        continue
+    if name.endswith(".tmp"):
+        problems.append(f"stale temp file {name}")
+    elif os.path.normpath(path) not in paths:
+        problems.append(f"orphan file {name}")
+if session.query(FileIntent).count():
+    problems.append("pending file intents left")
+print(json.dumps(problems))
+"""
+
+
+def _run(args, cwd):
+    env = dict(os.environ, PYTHONPATH=ROOT, JOURNAL_STORAGE="file")
+    env.pop("JOURNAL_DB_URL", None)  # the child uses the journal in its working directory
+    return subprocess.run([sys.executable] + args, cwd=cwd, env=env, capture_output=True, text=True,
+                          stdin=subprocess.DEVNULL)
+
+
+@pytest.fixture(scope="module")
+def template(tmp_path_factory):
+    """
+    A journal with one entry and one to-do, copied for each scenario.
+    """
+    path = tmp_path_factory.mktemp("template")
+    for args in (["migrate"],
+                 ["add", "--title", "First entry", "--mood", "4", "--content", "Original text"],
+                 ["todo", "add", "1", "Buy milk"]):
+        result = _run([CLI] + args, path)
+        assert result.returncode == 0, result.stderr
+    return path
+
+
+@pytest.mark.parametrize("operation, crash_at", SCENARIOS)
+def test_recovers_from_crash(template, tmp_path, operation, crash_at):
+    workdir = tmp_path / "journal"
+    shutil.copytree(template, workdir)
+
+    result = _run(["-c", CRASH, crash_at or "-"] + OPERATIONS[operation], workdir)
+    if crash_at is None:
+        assert result.returncode == 0, result.stderr
+    else:
+        assert result.returncode == 137, f"never reached {crash_at}: {result.stdout}{result.stderr}"
+
+    verify = _run(["-c", REPAIR_AND_VERIFY], workdir)
+    assert verify.returncode == 0, verify.stderr
+    assert json.loads(verify.stdout.splitlines()[-1]) == []
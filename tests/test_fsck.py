@@ -0,0 +1,91 @@
+import os
+
+import pytest
+
+import commands
+import fsck
+import search
+import verify
+from init import session
+from models.entry import Entry
+from models.todo import Todo
+
+
+def _path(entry_id):
+    return Entry.info(entry_id).content_path
+
+
+@pytest.fixture(params=["fsck", "verify"])
+def repair(request):
+    """
+    Run one of the two checkers with repair on.
+    """
+    def run():
+        session.remove()
+        if request.param == "fsck":
+            return fsck.check(repair=True)
+        return verify.verify(repair=True, workers=2)
+    return run
+
+
+def test_orphans_with_the_same_name_are_all_kept(repair):
+    os.makedirs("entries", exist_ok=True)
+    for text in ("first", "second"):
+        with open(os.path.join("entries", "stray.txt"), "w", encoding="utf-8") as f:
+            f.write(text)
+        assert repair()["orphans"] == [os.path.join("entries", "stray.txt")]
+
+    kept = sorted(os.listdir(fsck.LOST_AND_FOUND))
+    assert kept == ["stray-1.txt", "stray.txt"]
+    contents = set()
+    for name in kept:
+        with open(os.path.join(fsck.LOST_AND_FOUND, name), encoding="utf-8") as f:
+            contents.add(f.read())
+    assert contents == {"first", "second"}
+
+
+def test_missing_file_is_regenerated_from_the_index(repair):
+    entry_id = Entry.add_entry("Morning", "Went for a run", mood=4).id
+    Todo.add_todo("Stretch", entry_id)
+    os.remove(_path(entry_id))
+
+    report = repair()
+
+    assert report["regenerated"] == [entry_id] and report["unrecoverable"] == []
+    with open(_path(entry_id), encoding="utf-8") as f:
+        text = f.read()
+    assert "Went for a run" in text and "Stretch" in text
+
+
+def test_missing_file_without_indexed_content_is_reported(repair):
+    entry_id = Entry.add_entry("Morning", "Went for a run", mood=4).id
+    search.remove_entry(entry_id)
+    session.commit()
+    path = _path(entry_id)
+    os.remove(path)
+
+    report = repair()
+
+    assert report["unrecoverable"] == [entry_id] and report["regenerated"] == []
+    assert not os.path.exists(path)
+
+
+def test_repair_command_fails_when_an_entry_cannot_be_rebuilt():
+    entry_id = Entry.add_entry("Morning", "Went for a run", mood=4).id
+    search.remove_entry(entry_id)
+    session.commit()
+    os.remove(_path(entry_id))
+    with pytest.raises(commands.CommandError):
+        commands.fsck(repair=True)
+
+
+def test_stale_temp_file_is_deleted(repair):
+    entry_id = Entry.add_entry("Morning", "Went for a run", mood=4).id
+    stale = _path(entry_id).replace(".txt", "-other.txt.tmp")
+    with open(stale, "w", encoding="utf-8") as f:
+        f.write("half written")
+
+    report = repair()
+
+    assert report["stale_tmp"] == [stale]
+    assert not os.path.exists(stale)
@@ -0,0 +1,58 @@
+import pytest
+
+from models.entry import Entry
+from models.todo import Todo
+import fuzzy
+import helpers
+
+
+@pytest.fixture
+def answers(monkeypatch):
+    def feed(*replies):
+        replies = iter(replies)
+        monkeypatch.setattr("builtins.input", lambda prompt="": next(replies))
+    return feed
+
+
+@pytest.mark.parametrize("query, title", [
+    ("mxlk", "Milk"),  # 2 trigrams, 1 edit tolerated
+    ("milc", "Buy milk"),
+    ("brexd", "Bread"),
+    ("grocries", "Buy groceries"),  # 6 trigrams, 2 edits tolerated
+])
+def test_short_query_with_typo(query, title):
+    entry = Entry.add_entry(title, "Text", mood=3)
+    Entry.add_entry("Something else", "Text", mood=3)
+    assert [(hit.id, distance) for hit, distance in Entry.find_by_title_fuzzy(query)] == [
+        (entry.id, fuzzy.edit_distance(query, title.lower()))]
+
+
+def test_short_task_with_typo_and_filters():
+    entry = Entry.add_entry("Shopping", "Text", mood=3)
+    other = Entry.add_entry("Chores", "Text", mood=3)
+    wanted = Todo.add_todo("Milk", entry.id)
+    Todo.add_todo("Milk", other.id)
+    Todo.add_todo("Eggs", entry.id)
+    assert [(todo.id, distance) for todo, distance in Todo.find_by_task_fuzzy("mxlk", entry_id=entry.id)] == [
+        (wanted.id, 1)]
+
+
+def test_limit_keeps_the_closest():
+    close = [Entry.add_entry("Weekly groceries", "Text", mood=3).id for _ in range(3)]
+    for _ in range(5):
+        Entry.add_entry("Weekly grocries", "Text", mood=3)
+    hits = Entry.find_by_title_fuzzy("weekly groceries", limit=3)
+    assert sorted(entry.id for entry, _ in hits) == close
+    assert {distance for _, distance in hits} == {0}
+    assert len(Entry.find_by_title_fuzzy("weekly groceries", limit=100)) == 8
+
+
+def test_menu_lists_every_substring_match_then_typos(answers, capsys):
+    for i in range(25):
+        Entry.add_entry(f"Milk run {i}", "Text", mood=3)
+    Entry.add_entry("Milc", "Text", mood=3)
+    answers("milk")
+    helpers.find_entry_by_title()
+    lines = capsys.readouterr().out.splitlines()[1:]
+    assert len(lines) == 26
+    assert "Milc" in lines[-1] and "typo" in lines[-1]
@@ -0,0 +1,73 @@
+import csv
+import json
+
+import pytest
+
+import importer
+from models.entry import Entry
+from models.todo import Todo
+
+
+def write_csv(path, rows):
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=["title", "content", "mood", "timestamp", "todos"])
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def test_csv_row_with_malformed_todos_is_skipped(tmp_path, capsys):
+    path = tmp_path / "entries.csv"
+    write_csv(path, [
+        {"title": "First", "content": "One", "mood": 3, "timestamp": "2024-01-01T08:00:00",
+         "todos": '[{"task": "Buy milk"}]'},
+        {"title": "Broken", "content": "Two", "mood": 3, "timestamp": "2024-01-02T08:00:00",
+         "todos": '[{"task": "Unclosed"'},
+        {"title": "Third", "content": "Three", "mood": "", "timestamp": "2024-01-03T08:00:00",
+         "todos": '["Walk the dog", {"task": "Stretch", "status": "done"}]'},
+    ])
+
+    stats = importer.import_path(str(path))
+
+    assert (stats["entries"], stats["todos"], stats["skipped"]) == (2, 3, 1)
+    assert "Skipping row 2: Invalid to-do list" in capsys.readouterr().out
+    assert sorted(entry.title for entry in Entry.get_all_entries()) == ["First", "Third"]
+    assert sorted(todo.task for todo in Todo.get_all_todos()) == ["Buy milk", "Stretch", "Walk the dog"]
+
+
+def test_csv_round_trip_through_split_by_year(tmp_path, capsys):
+    path = tmp_path / "entries.csv"
+    write_csv(path, [
+        {"title": "Old", "content": "2019", "mood": 2, "timestamp": "2019-05-01T08:00:00", "todos": '["Task"]'},
+        {"title": "Bad", "content": "x", "mood": 2, "timestamp": "2020-05-01T08:00:00", "todos": "{oops"},
+        {"title": "New", "content": "2021", "mood": 4, "timestamp": "2021-05-01T08:00:00", "todos": ""},
+    ])
+
+    files, skipped = importer.split_by_year(importer.read_rows(str(path)), str(tmp_path))
+
+    assert sorted(files) == [2019, 2021] and skipped == 1
+    assert importer.import_path(files[2019])["todos"] == 1
+
+
+@pytest.mark.parametrize("bad, message", [
+    ({"title": 42}, "Entry title must be text"),
+    ({"content": {"text": "Two"}}, "Entry content must be text"),
+    ({"mood": 2.5}, "Mood must be an integer"),
+    ({"todos": {"task": "Buy milk"}}, "The to-do list must be a list"),
+    ({"todos": [42]}, "A to-do must be a task"),
+    ({"todos": [{"task": ["Buy", "milk"]}]}, "A to-do task must be text"),
+    ({"todos": [{"task": "Buy milk", "status": 1}]}, "A to-do status must be text"),
+])
+def test_jsonl_row_with_wrong_types_is_skipped(tmp_path, capsys, bad, message):
+    rows = [
+        {"title": "First", "content": "One", "mood": 3, "timestamp": "2024-01-01T08:00:00", "todos": ["Walk"]},
+        dict({"title": "Broken", "content": "Two", "timestamp": "2024-01-02T08:00:00"}, **bad),
+        {"title": "Third", "content": "Three", "timestamp": "2024-01-03T08:00:00"},
+    ]
+    path = tmp_path / "entries.jsonl"
+    path.write_text("".join(json.dumps(row) + "\n" for row in rows), encoding="utf-8")
+
+    stats = importer.import_path(str(path))
+
+    assert (stats["entries"], stats["todos"], stats["skipped"]) == (2, 1, 1)
+    assert f"Skipping row 2: {message}" in capsys.readouterr().out
+    assert sorted(entry.title for entry in Entry.get_all_entries()) == ["First", "Third"]
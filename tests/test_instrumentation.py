@@ -0,0 +1,33 @@
+"""
+SQL timing of the opt-in metrics.
+"""
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+from init import session
+from instrumentation import metrics
+
+
+@pytest.fixture
+def enabled():
+    metrics.enable()
+    yield metrics
+    metrics.disable()
+    metrics.reset()
+
+
+def test_failed_statement_is_timed_on_its_own(enabled):
+    with pytest.raises(OperationalError):
+        with enabled.action("broken"):
+            session.execute(text("SELECT * FROM no_such_table"))
+    session.rollback()
+    with enabled.action("probe"):
+        session.execute(text("SELECT 1"))
+        session.execute(text("SELECT 2"))
+
+    totals = enabled.to_dict()
+    assert totals["broken"]["errors"] == 1
+    assert totals["broken"]["sql_statements"] == 1
+    assert totals["probe"]["sql_statements"] == 2
+    assert 0 < totals["probe"]["sql_seconds"] <= totals["probe"]["seconds"]
@@ -0,0 +1,69 @@
+import pytest
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from init import session
+from models.entry import Entry
+from storage import LogStorage
+
+
+@pytest.fixture(autouse=True)
+def log(monkeypatch):
+    monkeypatch.setattr("storage.storage_backend", "log")
+
+
+@pytest.fixture
+def fail_next_commit():
+    """
+    Call to make the next commit fail.
+    """
+    def fail(sess):
+        event.remove(Session, "before_commit", fail)
+        raise RuntimeError("commit failed")
+    yield lambda: event.listen(Session, "before_commit", fail)
+    if event.contains(Session, "before_commit", fail):
+        event.remove(Session, "before_commit", fail)
+
+
+def _content(entry_id):
+    session.remove()
+    info = Entry.info(entry_id)
+    return info.title, Entry.get_content(info)
+
+
+def test_failed_delete_keeps_the_log_record(fail_next_commit):
+    entry_id = Entry.add_entry("Walk", "Along the river", mood=3).id
+    fail_next_commit()
+    with pytest.raises(RuntimeError):
+        Entry.delete_entry(entry_id)
+    session.rollback()
+    assert "Along the river" in _content(entry_id)[1]
+
+
+def test_failed_update_keeps_the_log_record(fail_next_commit):
+    entry_id = Entry.add_entry("Walk", "Along the river", mood=3).id
+    fail_next_commit()
+    with pytest.raises(RuntimeError):
+        Entry.update_entry(entry_id, title="Run", content="Up the hill")
+    session.rollback()
+    title, content = _content(entry_id)
+    assert title == "Walk"
+    assert "Title     : Walk" in content and "Along the river" in content
+
+
+def test_update_is_appended_after_the_commit():
+    entry_id = Entry.add_entry("Walk", "Along the river", mood=3).id
+    Entry.update_entry(entry_id, title="Run", content="Up the hill")
+    title, content = _content(entry_id)
+    assert title == "Run"
+    assert "Title     : Run" in content and "Up the hill" in content
+
+
+def test_storage_failure_is_raised(monkeypatch):
+    entry_id = Entry.add_entry("Walk", "Along the river", mood=3).id
+
+    def broken(self, key, payload):
+        raise OSError("disk full")
+    monkeypatch.setattr(LogStorage, "_append_now", broken)
+    with pytest.raises(OSError):
+        Entry.delete_entry(entry_id)
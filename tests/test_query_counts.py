@@ -0,0 +1,96 @@
+"""
+Query budgets of the listing and viewer paths: each issues a fixed number of statements
+however many rows it shows, so an N+1 regression fails here.
+"""
+import contextlib
+import io
+
+import pytest
+
+import commands
+import helpers
+import importer
+from init import session
+from instrumentation import max_queries
+
+ENTRIES = 45  # more than two pages
+TODOS_PER_ENTRY = 3
+
+
+@pytest.fixture(autouse=True)
+def journal_rows(journal):
+    importer.import_entries([
+        {"title": f"Entry {i}", "content": "A line of text.\n" * 60, "mood": i % 5 + 1,
+         "timestamp": f"2024-01-{i % 28 + 1:02d}T10:{i:02d}:00",
+         "todos": [{"task": f"Task {i}.{j}"} for j in range(TODOS_PER_ENTRY)]}
+        for i in range(ENTRIES)
+    ])
+    session.remove()
+
+
+@pytest.fixture
+def answers(monkeypatch):
+    """
+    Feed the menu prompts from a list.
+    """
+    def feed(*replies):
+        replies = iter(replies)
+        monkeypatch.setattr("builtins.input", lambda prompt="": next(replies))
+    return feed
+
+
+@pytest.fixture(autouse=True)
+def quiet():
+    with contextlib.redirect_stdout(io.StringIO()):
+        yield
+
+
+def test_list_todos():
+    with max_queries(1):
+        todos = commands.list_todos()
+    assert len(todos) == ENTRIES * TODOS_PER_ENTRY
+
+
+def test_list_todos_of_entry():
+    with max_queries(2):
+        assert len(commands.list_todos(entry_id=3)) == TODOS_PER_ENTRY
+
+
+def test_list_todos_menu_pages(answers):
+    answers("n", "n", "p", "q")
+    with max_queries(4):  # one per page shown, entries included
+        helpers.list_todos()
+
+
+def test_todo_report():
+    with max_queries(2):
+        report = commands.todo_report()
+    assert sum(len(entry["todos"]) for entry in report) == ENTRIES * TODOS_PER_ENTRY
+
+
+def test_list_entries():
+    with max_queries(1):
+        assert len(commands.list_entries()) == ENTRIES
+
+
+def test_list_entries_menu_pages(answers):
+    answers("n", "n", "p", "q")
+    with max_queries(4):
+        helpers.list_entries()
+
+
+def test_show_entry():
+    with max_queries(1):
+        assert "A line of text." in commands.show_entry(4)["content"]
+
+
+def test_viewer_pages(answers):
+    answers("5", "n", "n", "p", "t", "q")
+    with max_queries(1):  # the content is read from storage, not the database
+        helpers.view_entry_details()
+
+
+def test_entry_todos_menu(answers):
+    answers("6")
+    with max_queries(2):
+        helpers.get_entry_todos()
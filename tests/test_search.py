@@ -0,0 +1,32 @@
+import pytest
+
+from init import session
+from models.entry import Entry
+import search
+
+
+@pytest.mark.parametrize("query", ['"unbalanced', "title:", "run)", "(run"])
+def test_invalid_syntax_is_searched_as_terms(query):
+    entry = Entry.add_entry("Morning run", "Ran along the river", mood=4)
+    hits = search.search(query)
+    assert [entry_id for entry_id, _, _ in hits] == ([entry.id] if "run" in query else [])
+
+
+def test_invalid_syntax_keeps_pending_work():
+    Entry.add_entry("Morning run", "Ran along the river", mood=4)
+    entry = Entry(title="Unsaved", content_path="entries/unsaved.txt")
+    session.add(entry)
+    session.flush()
+
+    search.search('"unbalanced')
+
+    assert entry in session
+    session.commit()
+    assert Entry.find_by_id(entry.id).title == "Unsaved"
+
+
+def test_exact_phrase_and_prefix():
+    first = Entry.add_entry("Morning run", "Ran along the river bank", mood=4)
+    Entry.add_entry("Evening", "Read about a river", mood=3)
+    assert [entry_id for entry_id, _, _ in search.search('"river bank"')] == [first.id]
+    assert len(search.search("riv*")) == 2
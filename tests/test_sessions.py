@@ -0,0 +1,39 @@
+import gc
+import threading
+import weakref
+
+from init import session, unit_of_work
+from models.entry import Entry
+
+
+def in_thread(fn):
+    result = []
+    thread = threading.Thread(target=lambda: result.append(fn()))
+    thread.start()
+    thread.join()
+    return result[0]
+
+
+def test_dead_thread_session_is_not_reused():
+    def leave_uncommitted_work():
+        session.add(Entry(title="Uncommitted", content_path="entries/uncommitted.txt"))
+        session.flush()
+        return weakref.ref(session())
+
+    dead = in_thread(leave_uncommitted_work)
+    gc.collect()
+    assert dead() is None  # dropped with its thread
+
+    # Later threads (which may get the same ident) start clean
+    for _ in range(5):
+        assert in_thread(lambda: (len(session.new), session.query(Entry).count())) == (0, 0)
+
+
+def test_threads_and_scopes_get_their_own_sessions():
+    main = session()
+    assert in_thread(session) is not main
+    with unit_of_work():
+        scoped = session()
+        assert scoped is not main
+    assert session() is main
+    assert session() is not scoped
@@ -0,0 +1,90 @@
+"""
+Two journals editing the same entry and swapping bundles until they agree.
+
+Each journal lives in its own directory and is driven through the CLI in a child
+process, since a process works on one database.
+"""
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+from entry_format import parse_entry_body
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CLI = os.path.join(ROOT, "cli.py")
+
+CLEAR_MOOD = """
+import sys
+from models.entry import Entry
+from models.todo import Todo
+Entry.update_entry(int(sys.argv[1]), mood=None)
+"""
+
+
+def _run(cwd, *args):
+    env = dict(os.environ, PYTHONPATH=ROOT, JOURNAL_STORAGE="file")
+    env.pop("JOURNAL_DB_URL", None)  # each child uses the journal in its working directory
+    result = subprocess.run([sys.executable] + list(args), cwd=cwd, env=env, capture_output=True, text=True,
+                            stdin=subprocess.DEVNULL)
+    assert result.returncode == 0, result.stdout + result.stderr
+    return result.stdout
+
+
+def cli(cwd, *args):
+    return _run(cwd, CLI, *args)
+
+
+def show(cwd, entry_id=1):
+    entry = json.loads(cli(cwd, "show", str(entry_id), "--json"))
+    return entry["title"], entry["mood"], parse_entry_body(entry["content"]).strip()
+
+
+def swap(a, b):
+    """
+    Export both journals' changes, then have each import the other's bundle.
+    """
+    cli(a, "sync", "export", "to-b.bundle")
+    cli(b, "sync", "export", "to-a.bundle")
+    cli(a, "sync", "import", os.path.join(b, "to-a.bundle"))
+    cli(b, "sync", "import", os.path.join(a, "to-b.bundle"))
+
+
+@pytest.fixture
+def journals(tmp_path):
+    """
+    Two journals sharing one entry.
+    """
+    a, b = str(tmp_path / "a"), str(tmp_path / "b")
+    for path in (a, b):
+        os.mkdir(path)
+        cli(path, "migrate")
+    cli(a, "add", "--title", "Orig", "--mood", "3", "--content", "Orig-body")
+    swap(a, b)
+    assert show(b) == ("Orig", 3, "Orig-body")
+    return a, b
+
+
+def test_concurrent_edits_of_different_fields_are_both_kept(journals):
+    a, b = journals
+    cli(a, "update", "1", "--title", "A-title")
+    cli(b, "update", "1", "--content", "B-body")
+    swap(a, b)
+    assert show(a) == show(b) == ("A-title", 3, "B-body")
+
+
+def test_concurrent_edits_of_one_field_keep_the_newest(journals):
+    a, b = journals
+    cli(a, "update", "1", "--title", "A-title")
+    cli(b, "update", "1", "--title", "B-title")
+    swap(a, b)
+    assert show(a) == show(b) == ("B-title", 3, "Orig-body")
+
+
+def test_cleared_mood_is_cleared_on_the_peer(journals):
+    a, b = journals
+    _run(a, "-c", CLEAR_MOOD, "1")
+    swap(a, b)
+    assert show(a) == show(b) == ("Orig", None, "Orig-body")
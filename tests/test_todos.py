@@ -0,0 +1,48 @@
+import pytest
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from init import session
+from models.entry import Entry
+from models.todo import Todo
+
+
+@pytest.fixture
+def cas(monkeypatch):
+    monkeypatch.setattr("storage.storage_backend", "cas")
+
+
+@pytest.fixture
+def commits():
+    """
+    Count the commits of the scoped session.
+    """
+    count = []
+    listener = lambda sess: count.append(sess)  # noqa: E731
+    event.listen(Session, "after_commit", listener)
+    yield count
+    event.remove(Session, "after_commit", listener)
+
+
+def test_bulk_status_commits_once_for_all_entries(cas, commits):
+    entry_ids = [Entry.add_entry(f"Entry {i}", "Text", mood=3).id for i in range(5)]
+    for entry_id in entry_ids:
+        Todo.add_todo("Task", entry_id)
+    commits.clear()
+
+    assert Todo.bulk_update_status("done", current_status="pending") == 5
+
+    assert len(commits) == 2  # the rows, then the events of every entry file
+    session.remove()
+    for entry_id in entry_ids:
+        assert "Status : Done" in Entry.get_content(Entry.info(entry_id))
+
+
+def test_todo_events_are_committed(cas):
+    entry_id = Entry.add_entry("Chores", "Text", mood=3).id
+    todo_id = Todo.add_todo("Buy milk", entry_id).id
+    Todo.update_todo(todo_id, task="Buy oat milk")
+    session.remove()
+
+    content = Entry.get_content(Entry.info(entry_id))
+    assert "Buy milk" in content and "Buy oat milk" in content
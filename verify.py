@@ -0,0 +1,230 @@
+"""
+Parallel integrity scan of the entry files against the database.
+
+``fsck`` checks each entry with its own ``os.path.exists`` call; this scanner is built
+for journals with millions of files. It lists ``entries/`` once with ``os.scandir``,
+streams every ``content_path`` from the database in one query, and reads, checksums
+and parses the files in a thread (or process) pool. It reports:
+
+* entries whose file is missing, and files no entry points to (orphans);
+* stale ``.tmp`` files and committed file operations that were never applied;
+* header problems: files still carrying the short header the old ``update_entry``
+  wrote, and headers whose title, mood or timestamp disagree with the database.
+
+With ``repair=True`` unapplied operations are rolled forward and stale temp files
+deleted. A missing file is restored from its staged ``.tmp``, or from an orphan whose
+header names the same entry (a rename that never happened), or else regenerated from
+the database (see ``fsck``; an entry with no indexed content is reported as
+unrecoverable). Remaining orphans go to ``entries/lost+found/``, and bad headers are
+rewritten from the database, keeping the content and to-do blocks.
+"""
+import hashlib
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from sqlalchemy import func, select
+from init import session
+from models.entry import Entry
+from models.file_intent import FileIntent
+from entry_format import MOOD_MAP, entry_body_span, format_entry_file, parse_entry_header
+from fsck import ENTRIES_DIR, _regenerate, move_to_lost_and_found
+from storage import CasStorage, LogStorage, recover_file_ops
+
+CHUNK_SIZE = 500
+DEFAULT_WORKERS = 8
+
+
+def header_problems(header, expected):
+    """
+    Compare a parsed header with the one the entry's row calls for.
+
+    :param expected: (title, mood, timestamp) as ``format_entry_file`` writes them.
+    :return: A list of problem names (empty if the header is fine).
+    """
+    fmt = header[0]
+    if fmt != "entry":
+        return [f"{fmt} header"]
+    return [name for name, found, wanted in zip(("title", "mood", "timestamp"), header[1:], expected)
+            if found != wanted]
+
+
+def inspect_files(items):
+    """
+    Read, checksum and check the header of each file (runs in a worker).
+
+    :param items: (path, expected header) pairs; the expected header is None for an orphan.
+    :return: A list of (path, sha256 hex digest, result) tuples, where the result is the
+        list of header problems, or for an orphan its (title, timestamp). The digest is
+        None if the file could not be read.
+    """
+    results = []
+    for path, expected in items:
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            header = parse_entry_header(data.decode("utf-8"))
+        except (OSError, UnicodeDecodeError):
+            results.append((path, None, None))
+            continue
+        result = header_problems(header, expected) if expected else (header[1], header[3])
+        results.append((path, hashlib.sha256(data).hexdigest(), result))
+    return results
+
+
+def _scan_directory():
+    """
+    List the regular files directly under ``entries/`` (subdirectories belong to the
+    other backends and lost+found).
+    """
+    if not os.path.isdir(ENTRIES_DIR):
+        return set()
+    with os.scandir(ENTRIES_DIR) as it:
+        return {entry.path for entry in it if entry.is_file(follow_symlinks=False)}
+
+
+def _inspect_all(items, workers, processes):
+    """
+    Yield ``inspect_files`` results for ``items``, keeping a bounded number of chunks in flight.
+    """
+    pool_class = ProcessPoolExecutor if processes else ThreadPoolExecutor
+    with pool_class(max_workers=workers) as pool:
+        pending = deque()
+        for i in range(0, len(items), CHUNK_SIZE):
+            pending.append(pool.submit(inspect_files, items[i:i + CHUNK_SIZE]))
+            if len(pending) >= 2 * workers:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
+
+
+def _write_atomic(path, text):
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(text)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def _rewrite_header(entry):
+    """
+    Rewrite a file's header from the entry, keeping its content and to-do blocks.
+    """
+    with open(entry.content_path, "r", encoding="utf-8") as f:
+        text = f.read()
+    start, end = entry_body_span(text)
+    body = text[start:end].rstrip("\n")
+    _write_atomic(entry.content_path, format_entry_file(entry.title, body, entry.mood, entry.timestamp) + text[end:])
+
+
+def verify(repair=False, workers=DEFAULT_WORKERS, processes=False, checksums=None):
+    """
+    Cross-check the files in ``entries/`` with every entry's ``content_path``.
+
+    :param repair: Fix what is found instead of only reporting it.
+    :param workers: Threads (or processes) reading the files.
+    :param processes: Use a process pool, for CPU-bound parsing on many cores.
+    :param checksums: Optional path of a ``sha256sum``-style listing of every entry file
+        (as found by the scan, before any repair).
+    :return: A dict with the counts and the problems found (and, when repairing, fixed).
+    """
+    start = time.perf_counter()
+    FileIntent.__table__.create(session.connection(), checkfirst=True)
+    report = {"files": 0, "entries": 0, "unapplied_ops": 0, "stale_tmp": [], "missing": [], "orphans": [],
+              "header_mismatches": [], "unreadable": [], "relinked": [], "regenerated": [], "unrecoverable": [],
+              "repaired": repair}
+
+    if repair:
+        report["unapplied_ops"] = recover_file_ops()
+        session.commit()
+    else:
+        report["unapplied_ops"] = session.query(FileIntent).count()
+    pending = {os.path.normpath(intent.source) for intent in session.query(FileIntent) if intent.source}
+
+    files = _scan_directory()
+    report["files"] = len(files)
+
+    # One streamed pass over the entries of the file backend. The timestamp is read as
+    # the text the header shows (SQLite stores "YYYY-MM-DD HH:MM:SS.ffffff").
+    rows = session.execute(
+        select(Entry.id, Entry.title, Entry.mood, func.substr(Entry.timestamp, 1, 19), Entry.content_path)
+        .where(Entry.content_path.notlike(LogStorage.prefix + "%"),
+               Entry.content_path.notlike(CasStorage.prefix + "%"))
+        .execution_options(yield_per=10000)
+    )
+    present = {}  # path -> (entry ID, expected header)
+    missing = []  # (entry ID, path, title, timestamp)
+    for id_, title, mood, timestamp, path in rows:
+        report["entries"] += 1
+        if path not in files:
+            path = os.path.normpath(path)
+        if path in files:
+            files.discard(path)
+            present[path] = (id_, (title, MOOD_MAP.get(mood, "N/A"), timestamp))
+        elif os.path.exists(path):  # stored outside entries/
+            present[path] = (id_, (title, MOOD_MAP.get(mood, "N/A"), timestamp))
+        else:
+            missing.append((id_, path, title, timestamp))
+    session.commit()  # end the read transaction of the streamed query
+
+    stale_tmp = sorted(path for path in files if path.endswith(".tmp") and path not in pending)
+    orphans = sorted(path for path in files if not path.endswith(".tmp"))
+
+    items = [(path, expected) for path, (_, expected) in present.items()] + [(path, None) for path in orphans]
+    out = open(checksums, "w", encoding="utf-8") if checksums else None
+    orphan_headers = {}
+    try:
+        for path, digest, result in _inspect_all(items, workers, processes):
+            if digest is None:
+                report["unreadable"].append(path)
+                continue
+            if out:
+                out.write(f"{digest}  {path}\n")
+            if path not in present:
+                if result[0] is not None:
+                    orphan_headers.setdefault(result, path)
+            elif result:
+                report["header_mismatches"].append({"id": present[path][0], "path": path, "problems": result})
+    finally:
+        if out:
+            out.close()
+
+    relinked = set()
+    for id_, path, title, timestamp in missing:
+        report["missing"].append({"id": id_, "path": path})
+        if not repair:
+            continue
+        tmp = path + ".tmp"
+        source = orphan_headers.get((title, timestamp))
+        if os.path.exists(tmp):
+            os.replace(tmp, path)
+            if os.path.normpath(tmp) in stale_tmp:
+                stale_tmp.remove(os.path.normpath(tmp))
+        elif source and source not in relinked:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            os.replace(source, path)
+            relinked.add(source)
+            report["relinked"].append({"id": id_, "from": source, "to": path})
+        elif _regenerate(session.get(Entry, id_)):
+            report["regenerated"].append(id_)
+        else:
+            report["unrecoverable"].append(id_)
+
+    report["stale_tmp"] = stale_tmp
+    report["orphans"] = [path for path in orphans if path not in relinked]
+    if repair:
+        for path in stale_tmp:
+            os.remove(path)
+        for path in report["orphans"]:
+            move_to_lost_and_found(path)
+        for mismatch in report["header_mismatches"]:
+            _rewrite_header(session.get(Entry, mismatch["id"]))
+
+    report["seconds"] = time.perf_counter() - start
+    return report
+
+
+def is_clean(report):
+    return not (report["unapplied_ops"] or report["stale_tmp"] or report["missing"] or report["orphans"]
+                or report["header_mismatches"] or report["unreadable"])